@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+MedPredict AI - Response Format Benchmark
+
+Compares serialization cost and payload size of the default row-oriented
+JSON responses against the opt-in columnar, msgpack and arrow formats.
+
+Usage:
+    python benchmarks/bench_response_formats.py            # 20x inventory
+    python benchmarks/bench_response_formats.py --scale 100
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import pandas as pd
+from pydantic import TypeAdapter
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.ml.predictor import MedPredictEngine
+from src.api.main import ExpiryRiskResponse, DATA_DIR
+from src.api.formats import (
+    RESPONSE_FORMATS, records_to_columns, frame_to_columns, encode_columns, msgpack, pa
+)
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def expiry_rows_json(risks) -> bytes:
+    """What /api/expiry-risks does today: one Pydantic model per row, then JSON"""
+    models = [
+        ExpiryRiskResponse(
+            medicine_id=r.medicine_id,
+            medicine_name=r.medicine_name,
+            batch_no=r.batch_no,
+            current_quantity=r.current_quantity,
+            expiry_date=r.expiry_date.strftime("%Y-%m-%d"),
+            days_to_expiry=r.days_to_expiry,
+            predicted_consumption=r.predicted_consumption,
+            quantity_at_risk=r.quantity_at_risk,
+            risk_score=r.risk_score,
+            risk_level=r.risk_level,
+            recommendation=r.recommendation,
+            potential_loss=r.potential_loss
+        )
+        for r in risks
+    ]
+    payload = TypeAdapter(List[ExpiryRiskResponse]).dump_python(models, mode="json")
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def available_formats() -> List[str]:
+    formats = [f for f in RESPONSE_FORMATS if f != "json"]
+    if msgpack is None:
+        formats.remove("msgpack")
+    if pa is None:
+        formats.remove("arrow")
+    return formats
+
+
+def report(title: str, rows: int, results: List[tuple]):
+    print(f"\n{title} ({rows:,} rows)")
+    print(f"  {'format':<12}{'ms':>10}{'bytes':>14}{'vs json':>10}")
+    baseline = results[0][2]
+    for name, ms, size in results:
+        print(f"  {name:<12}{ms:>10.2f}{size:>14,}{size / baseline:>9.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20, help="Replicate inventory batches N times")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best of N)")
+    args = parser.parse_args()
+
+    consumption_df = pd.read_csv(DATA_DIR / "consumption_log.csv")
+    inventory_df = pd.read_csv(DATA_DIR / "current_inventory.csv")
+    medicines_df = pd.read_csv(DATA_DIR / "medicines_master.csv")
+    inventory_df = pd.concat([inventory_df] * args.scale, ignore_index=True)
+
+    engine = MedPredictEngine(consumption_df, inventory_df, medicines_df)
+    risks = engine.calculate_expiry_risks()
+
+    # Expiry risks: Pydantic rows vs columns built from the risk records
+    fields = list(ExpiryRiskResponse.model_fields)
+    date_fmt = {"expiry_date": lambda d: d.strftime("%Y-%m-%d")}
+    build_ms = timed(lambda: records_to_columns(risks, fields, date_fmt), args.repeat)
+    columns = records_to_columns(risks, fields, date_fmt)
+
+    results = [("json", timed(lambda: expiry_rows_json(risks), args.repeat), len(expiry_rows_json(risks)))]
+    for fmt in available_formats():
+        results.append((fmt, timed(lambda: encode_columns(columns, fmt), args.repeat),
+                        len(encode_columns(columns, fmt))))
+    report("/api/expiry-risks", len(risks), results)
+    print(f"  (one-off column build per snapshot: {build_ms:.2f} ms)")
+
+    # Inventory: DataFrame.to_dict(orient='records') vs columns straight from the frame
+    inventory = engine.inventory_df.copy()
+    inventory["expiry_date"] = inventory["expiry_date"].dt.strftime("%Y-%m-%d")
+
+    def inventory_json() -> bytes:
+        return json.dumps(inventory.to_dict(orient="records"), ensure_ascii=False).encode("utf-8")
+
+    results = [("json", timed(inventory_json, args.repeat), len(inventory_json()))]
+    for fmt in available_formats():
+        results.append((fmt, timed(lambda: encode_columns(frame_to_columns(inventory), fmt), args.repeat),
+                        len(encode_columns(frame_to_columns(inventory), fmt))))
+    report("/api/inventory", len(inventory), results)
+
+
+if __name__ == "__main__":
+    main()
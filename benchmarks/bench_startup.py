@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MedPredict AI - Startup Time Benchmark
+
+Starts the ML service with uvicorn several times and measures:
+- import: time to import src.api.main in a fresh interpreter
+- live: time until /api/health answers (the server accepts traffic)
+- ready: time until /api/ready returns 200 (data and first snapshot loaded;
+  builds without /api/ready use the first successful dashboard response)
+
+Usage:
+    python benchmarks/bench_startup.py              # 5 runs
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.api.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def status_of(url: str) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def measure_server(timeout: float) -> Dict[str, float]:
+    """Milliseconds from process start until live and until ready"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    result: Dict[str, float] = {}
+    try:
+        while time.perf_counter() - start < timeout:
+            if "live" not in result and status_of(f"{base}/api/health") == 200:
+                result["live"] = (time.perf_counter() - start) * 1000
+            if "live" in result:
+                ready = status_of(f"{base}/api/ready")
+                if ready == 404:
+                    # Builds without a readiness endpoint: first served dashboard
+                    ready = status_of(f"{base}/api/dashboard/summary")
+                if ready == 200:
+                    result["ready"] = (time.perf_counter() - start) * 1000
+                    break
+            time.sleep(0.02)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    if "ready" not in result:
+        raise RuntimeError(f"Service was not ready within {timeout}s")
+    return result
+
+
+def summarize(name: str, values: List[float]):
+    print(f"{name:<8} best {min(values):8.0f} ms   median {statistics.median(values):8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    imports, live, ready = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        server = measure_server(args.timeout)
+        live.append(server["live"])
+        ready.append(server["ready"])
+
+    print(f"Startup over {args.runs} runs")
+    summarize("import", imports)
+    summarize("live", live)
+    summarize("ready", ready)
+
+
+if __name__ == "__main__":
+    main()
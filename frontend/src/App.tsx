@@ -24,12 +24,8 @@ import { SupplierIntelligence } from './components/SupplierIntelligence';
 import { AIFeaturesShowcase } from './components/AIFeaturesShowcase';
 import { LandingPage } from './components/LandingPage';
 
-import { 
-  fetchDashboardSummary, 
-  fetchExpiryRisks, 
-  fetchStockoutRisks,
-  fetchAlerts 
-} from './services/api';
+import { fetchAlerts, fetchDashboardBundle } from './services/api';
+import { useAlertStream } from './hooks/useAlertStream';
 
 import type { RiskLevel } from './types';
 
@@ -85,32 +81,28 @@ function Dashboard({ onLogout }: DashboardProps) {
     }
   }, [hasSeenTour]);
 
-  // Queries
-  const { data: summary, isLoading: summaryLoading, error: summaryError, refetch: refetchSummary } = useQuery({
-    queryKey: ['dashboard-summary'],
-    queryFn: fetchDashboardSummary,
-  });
-
-  const { data: expiryRisks = [], refetch: refetchExpiry } = useQuery({
-    queryKey: ['expiry-risks', riskFilter],
-    queryFn: () => fetchExpiryRisks(riskFilter === 'ALL' ? undefined : riskFilter),
-  });
-
-  const { data: stockoutRisks = [], refetch: refetchStockout } = useQuery({
-    queryKey: ['stockout-risks', riskFilter],
-    queryFn: () => fetchStockoutRisks(riskFilter === 'ALL' ? undefined : riskFilter),
+  // Queries (summary, risks and alerts arrive in one batched request)
+  const { data: bundle, isLoading: summaryLoading, error: summaryError, refetch: refetchDashboard } = useQuery({
+    queryKey: ['dashboard-bundle', riskFilter],
+    queryFn: () => fetchDashboardBundle(riskFilter === 'ALL' ? undefined : riskFilter),
+    placeholderData: (previous) => previous,
   });
 
-  const { data: alertsData } = useQuery({
+  const summary = bundle?.summary;
+  const expiryRisks = bundle?.expiryRisks ?? [];
+  const stockoutRisks = bundle?.stockoutRisks ?? [];
+  // Kept current by the alert stream; the bundle's copy covers the first render
+  useAlertStream();
+  const { data: liveAlerts } = useQuery({
     queryKey: ['alerts'],
     queryFn: fetchAlerts,
+    staleTime: Infinity,
   });
+  const alertsData = liveAlerts ?? bundle?.alerts;
 
   const handleRefresh = useCallback(() => {
-    refetchSummary();
-    refetchExpiry();
-    refetchStockout();
-  }, [refetchSummary, refetchExpiry, refetchStockout]);
+    refetchDashboard();
+  }, [refetchDashboard]);
 
   // Format currency
   const formatCurrency = (value: number) => {
@@ -146,7 +138,7 @@ function Dashboard({ onLogout }: DashboardProps) {
             {summaryError instanceof Error ? summaryError.message : 'Unknown error'}
           </p>
           <button 
-            onClick={() => refetchSummary()}
+            onClick={() => refetchDashboard()}
             className="btn-primary"
           >
             Retry Connection
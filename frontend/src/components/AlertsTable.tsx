@@ -78,6 +78,7 @@ export function AlertsTable({ expiryRisks, stockoutRisks, activeTab, onTabChange
           data={exportData}
           filename={activeTab === 'expiry' ? 'expiry_alerts' : 'stockout_alerts'}
           title="Export"
+          fullExport={activeTab === 'expiry' ? 'expiry-risks' : undefined}
         />
       </div>
 
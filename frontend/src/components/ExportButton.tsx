@@ -1,13 +1,17 @@
 import { useState } from 'react';
-import { Download, FileSpreadsheet, FileText, Loader } from 'lucide-react';
+import { Download, FileSpreadsheet, FileText, Loader, Database } from 'lucide-react';
+import { getExportUrl } from '../services/api';
+import type { ExportResource } from '../services/api';
 
 interface ExportButtonProps {
   data: any[];
   filename: string;
   title?: string;
+  /** Server-side streaming export covering the full dataset, not just the visible rows */
+  fullExport?: ExportResource;
 }
 
-export function ExportButton({ data, filename, title = 'Export' }: ExportButtonProps) {
+export function ExportButton({ data, filename, title = 'Export', fullExport }: ExportButtonProps) {
   const [isExporting, setIsExporting] = useState(false);
   const [showMenu, setShowMenu] = useState(false);
 
@@ -114,6 +118,19 @@ export function ExportButton({ data, filename, title = 'Export' }: ExportButtonP
                 <p className="text-xs text-slate-500">Raw data format</p>
               </div>
             </button>
+            {fullExport && (
+              <a
+                href={getExportUrl(fullExport, 'csv')}
+                onClick={() => setShowMenu(false)}
+                className="w-full flex items-center gap-3 px-4 py-3 text-left text-slate-300 hover:bg-slate-700 hover:text-white transition-colors border-t border-slate-700"
+              >
+                <Database className="w-4 h-4 text-amber-400" />
+                <div>
+                  <p className="font-medium">Full dataset (CSV)</p>
+                  <p className="text-xs text-slate-500">Streamed from server</p>
+                </div>
+              </a>
+            )}
           </div>
         </>
       )}
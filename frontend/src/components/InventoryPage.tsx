@@ -156,6 +156,7 @@ export function InventoryPage({ onMedicineClick }: InventoryPageProps) {
           }))}
           filename="inventory"
           title="Export Inventory"
+          fullExport="inventory"
         />
       </div>
 
@@ -19,10 +19,11 @@ export function NotificationPanel({ onNavigateToAlerts }: NotificationPanelProps
   const [isOpen, setIsOpen] = useState(false);
   const panelRef = useRef<HTMLDivElement>(null);
 
+  // Updated in place by useAlertStream (mounted by the dashboard), so it never goes stale
   const { data: alertsData, isLoading, refetch } = useQuery({
     queryKey: ['alerts'],
     queryFn: fetchAlerts,
-    staleTime: 30000,
+    staleTime: Infinity,
   });
 
   const criticalCount = alertsData?.critical_count || 0;
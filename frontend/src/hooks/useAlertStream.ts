@@ -0,0 +1,60 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { alertStreamUrl } from '../services/api';
+import type { Alert, AlertsResponse } from '../types';
+
+type StreamedAlert = Alert & { id: string };
+
+interface AlertSummary {
+  total_alerts: number;
+  critical_count: number;
+  high_count: number;
+}
+
+const SEVERITY_ORDER: Record<string, number> = { CRITICAL: 0, HIGH: 1 };
+
+/**
+ * Alert stream hook - keeps the ['alerts'] query current from server-sent events
+ * The server only sends changes, when a new risk snapshot adds, changes or removes
+ * alerts; the dashboard bundle is refetched at the same time. Mount once per page.
+ */
+export function useAlertStream(): void {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(alertStreamUrl);
+    const alerts = new Map<string, StreamedAlert>();
+    let received = false;
+
+    const publish = (summary: AlertSummary) => {
+      const list = [...alerts.values()].sort(
+        (a, b) => (SEVERITY_ORDER[a.severity] ?? 2) - (SEVERITY_ORDER[b.severity] ?? 2)
+      );
+      queryClient.setQueryData<AlertsResponse>(['alerts'], { ...summary, alerts: list });
+      // The first list is what the page just loaded; anything after means the risks changed
+      if (received) {
+        queryClient.invalidateQueries({ queryKey: ['dashboard-bundle'] });
+      }
+      received = true;
+    };
+
+    // Whole list: on connect and after the server restarts
+    source.addEventListener('alerts', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      alerts.clear();
+      for (const alert of data.alerts as StreamedAlert[]) alerts.set(alert.id, alert);
+      publish(data);
+    });
+
+    source.addEventListener('delta', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      for (const alert of data.upserted as StreamedAlert[]) alerts.set(alert.id, alert);
+      for (const id of data.removed as string[]) alerts.delete(id);
+      publish(data.summary);
+    });
+
+    return () => source.close();
+  }, [queryClient]);
+}
@@ -64,6 +64,66 @@ export const fetchAlerts = async (): Promise<AlertsResponse> => {
   return response.data;
 };
 
+// Alerts - live changes (Server-Sent Events, see hooks/useAlertStream)
+export const alertStreamUrl = `${API_BASE_URL}/alerts/stream`;
+
+// Batch: several GET endpoints in one round trip, all read from the same risk snapshot
+export interface BatchSubRequest {
+  id: string;
+  path: string;
+  params?: Record<string, string | number>;
+}
+
+export interface BatchResult<T = unknown> {
+  id: string;
+  path: string;
+  status: number;
+  body?: T;
+  error?: string;
+}
+
+export const fetchBatch = async (requests: BatchSubRequest[]): Promise<Record<string, BatchResult>> => {
+  const response = await apiClient.post('/batch', { requests });
+  const results: BatchResult[] = response.data.results;
+  return Object.fromEntries(results.map((result) => [result.id, result]));
+};
+
+export interface DashboardBundle {
+  summary: DashboardSummary;
+  expiryRisks: ExpiryRisk[];
+  stockoutRisks: StockoutRisk[];
+  alerts?: AlertsResponse;
+}
+
+// Everything the dashboard needs on load, in one request
+export const fetchDashboardBundle = async (
+  riskLevel?: string,
+  limit: number = 50
+): Promise<DashboardBundle> => {
+  const riskParams: Record<string, string | number> = { limit };
+  if (riskLevel && riskLevel !== 'ALL') {
+    riskParams.risk_level = riskLevel;
+  }
+  
+  const results = await fetchBatch([
+    { id: 'summary', path: '/api/dashboard/summary' },
+    { id: 'expiry', path: '/api/expiry-risks', params: riskParams },
+    { id: 'stockout', path: '/api/stockout-risks', params: riskParams },
+    { id: 'alerts', path: '/api/alerts' },
+  ]);
+  
+  const summary = results.summary;
+  if (summary.status !== 200) {
+    throw new Error(`Dashboard summary failed with status ${summary.status}`);
+  }
+  return {
+    summary: summary.body as DashboardSummary,
+    expiryRisks: results.expiry.status === 200 ? (results.expiry.body as ExpiryRisk[]) : [],
+    stockoutRisks: results.stockout.status === 200 ? (results.stockout.body as StockoutRisk[]) : [],
+    alerts: results.alerts.status === 200 ? (results.alerts.body as AlertsResponse) : undefined,
+  };
+};
+
 // Medicines - List with search & filter
 export interface MedicineSearchParams {
   search?: string;
@@ -135,6 +195,22 @@ export const fetchRecommendations = async (): Promise<RecommendationsResponse> =
   return response.data;
 };
 
+// Streaming Exports - returns a URL the browser downloads directly,
+// so large exports never have to be held in memory by the app
+export type ExportResource = 'inventory' | 'expiry-risks' | 'consumption';
+
+export const getExportUrl = (
+  resource: ExportResource,
+  format: 'csv' | 'ndjson' = 'csv',
+  params?: Record<string, string | number | undefined>
+): string => {
+  const searchParams = new URLSearchParams({ format });
+  Object.entries(params ?? {}).forEach(([key, value]) => {
+    if (value !== undefined && value !== '') searchParams.append(key, value.toString());
+  });
+  return `${API_BASE_URL}/export/${resource}?${searchParams}`;
+};
+
 // Health Check
 export const checkHealth = async (): Promise<{ status: string; message: string; data_loaded: boolean }> => {
   const response = await apiClient.get('/health');
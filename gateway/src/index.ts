@@ -9,13 +9,25 @@ const app = express();
 const PORT = process.env.PORT || 3001;
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
 
+const FRONTEND_URL = process.env.FRONTEND_URL || 'http://localhost:5173';
+
 // Middleware
 app.use(cors({
-  origin: process.env.FRONTEND_URL || 'http://localhost:5173',
+  origin: FRONTEND_URL,
   credentials: true,
+  exposedHeaders: [
+    'ETag', 'X-Snapshot-Age', 'X-Snapshot-Computed-At', 'X-Snapshot-Stale',
+    'X-Next-Cursor', 'X-Total-Count', 'Server-Timing',
+  ],
 }));
 app.use(express.json());
 
+// Let the frontend read Server-Timing entries through the Resource Timing API
+app.use((_req: Request, res: Response, next: NextFunction) => {
+  res.set('Timing-Allow-Origin', FRONTEND_URL);
+  next();
+});
+
 // Request logging middleware
 app.use((req: Request, _res: Response, next: NextFunction) => {
   console.log(`[${new Date().toISOString()}] ${req.method} ${req.path}`);
@@ -42,26 +54,146 @@ app.get('/api/health', async (_req: Request, res: Response) => {
   }
 });
 
+// Readiness (503 with loading progress until the ML Service has its data)
+app.get('/api/ready', (req: Request, res: Response) => {
+  proxyToMLService(req, res, '/api/ready');
+});
+
+// Conditional GET / snapshot headers passed through in each direction
+const FORWARDED_REQUEST_HEADERS = ['if-none-match'];
+const FORWARDED_RESPONSE_HEADERS = [
+  'etag',
+  'cache-control',
+  'x-snapshot-age',
+  'x-snapshot-computed-at',
+  'x-snapshot-stale',
+  'x-next-cursor',
+  'x-total-count',
+];
+
+// Append the gateway's own proxy span to the ML Service's Server-Timing header
+const setServerTiming = (res: Response, upstream: unknown, startedAt: bigint) => {
+  const ms = Number(process.hrtime.bigint() - startedAt) / 1e6;
+  const proxySpan = `gateway.proxy;dur=${ms.toFixed(1)}`;
+  res.set('Server-Timing', upstream ? `${upstream}, ${proxySpan}` : proxySpan);
+};
+
 // Proxy routes to ML Service
 const proxyToMLService = async (req: Request, res: Response, endpoint: string) => {
+  const startedAt = process.hrtime.bigint();
   try {
     const url = `${ML_SERVICE_URL}${endpoint}`;
     const queryString = new URLSearchParams(req.query as Record<string, string>).toString();
     const fullUrl = queryString ? `${url}?${queryString}` : url;
     
+    const headers: Record<string, string> = {
+      'Content-Type': 'application/json',
+    };
+    for (const name of FORWARDED_REQUEST_HEADERS) {
+      const value = req.get(name);
+      if (value) headers[name] = value;
+    }
+    
     const response = await axios({
       method: req.method as any,
       url: fullUrl,
       data: req.body,
-      headers: {
-        'Content-Type': 'application/json',
-      },
+      headers,
+      // 304 Not Modified is a normal answer to a conditional GET
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
     });
     
+    for (const name of FORWARDED_RESPONSE_HEADERS) {
+      const value = response.headers[name];
+      if (value) res.set(name, String(value));
+    }
+    setServerTiming(res, response.headers['server-timing'], startedAt);
+    
+    if (response.status === 304) {
+      res.status(304).end();
+      return;
+    }
+    
     res.json(response.data);
   } catch (error) {
     const axiosError = error as AxiosError;
     console.error(`Error proxying to ${endpoint}:`, axiosError.message);
+    setServerTiming(res, axiosError.response?.headers['server-timing'], startedAt);
+    
+    if (axiosError.response) {
+      res.status(axiosError.response.status).json(axiosError.response.data);
+    } else {
+      res.status(503).json({
+        error: 'ML Service Unavailable',
+        message: 'The prediction service is currently unavailable. Please try again later.',
+      });
+    }
+  }
+};
+
+// Stream a response (NDJSON / CSV exports, bulk forecasts) from the ML Service without buffering it
+const streamFromMLService = async (req: Request, res: Response, endpoint: string) => {
+  const startedAt = process.hrtime.bigint();
+  try {
+    const queryString = new URLSearchParams(req.query as Record<string, string>).toString();
+    const url = `${ML_SERVICE_URL}${endpoint}${queryString ? `?${queryString}` : ''}`;
+    
+    const response = await axios({
+      method: req.method as any,
+      url,
+      data: req.method === 'GET' ? undefined : req.body,
+      responseType: 'stream',
+    });
+    
+    for (const name of ['content-type', 'content-disposition', ...FORWARDED_RESPONSE_HEADERS]) {
+      const value = response.headers[name];
+      if (value) res.set(name, String(value));
+    }
+    // Covers the time until the first byte; the body is still streaming
+    setServerTiming(res, response.headers['server-timing'], startedAt);
+    
+    // Stop pulling from the ML Service if the client goes away
+    req.on('close', () => response.data.destroy());
+    response.data.pipe(res);
+  } catch (error) {
+    const axiosError = error as AxiosError;
+    console.error(`Error streaming from ${endpoint}:`, axiosError.message);
+    
+    if (axiosError.response) {
+      res.status(axiosError.response.status).json({
+        error: 'Export failed',
+        message: `The prediction service returned ${axiosError.response.status}`,
+      });
+    } else {
+      res.status(503).json({
+        error: 'ML Service Unavailable',
+        message: 'The prediction service is currently unavailable. Please try again later.',
+      });
+    }
+  }
+};
+
+// Forward a raw request body (CSV uploads) to the ML Service as a stream
+const uploadToMLService = async (req: Request, res: Response, endpoint: string) => {
+  const startedAt = process.hrtime.bigint();
+  try {
+    const queryString = new URLSearchParams(req.query as Record<string, string>).toString();
+    const url = `${ML_SERVICE_URL}${endpoint}${queryString ? `?${queryString}` : ''}`;
+    
+    const response = await axios({
+      method: 'POST',
+      url,
+      data: req,
+      headers: { 'Content-Type': req.get('content-type') || 'text/csv' },
+      maxBodyLength: Infinity,
+      maxContentLength: Infinity,
+    });
+    
+    setServerTiming(res, response.headers['server-timing'], startedAt);
+    res.json(response.data);
+  } catch (error) {
+    const axiosError = error as AxiosError;
+    console.error(`Error uploading to ${endpoint}:`, axiosError.message);
     
     if (axiosError.response) {
       res.status(axiosError.response.status).json(axiosError.response.data);
@@ -74,6 +206,169 @@ const proxyToMLService = async (req: Request, res: Response, endpoint: string) =
   }
 };
 
+// ============================================================================
+// Alert stream: one upstream SSE connection to the ML Service, fanned out to
+// every connected client. The gateway applies the deltas to its own copy of
+// the alert list, so a new client gets the full list without another upstream
+// request; deltas are relayed verbatim.
+// ============================================================================
+interface StreamedAlert {
+  id: string;
+  [field: string]: unknown;
+}
+
+interface AlertSummary {
+  total_alerts: number;
+  critical_count: number;
+  high_count: number;
+}
+
+const ALERT_STREAM_RETRY_MS = 3000;
+const ALERT_STREAM_KEEPALIVE_MS = 15000;
+
+const alertClients = new Set<Response>();
+const alertList = new Map<string, StreamedAlert>();
+let alertSummary: AlertSummary | null = null;
+let alertDataVersion: number | null = null;
+let alertEventId = '';
+// Full-list event, encoded once per change
+let alertListEvent: string | null = null;
+let alertUpstream: (NodeJS.ReadableStream & { destroy: () => void }) | null = null;
+let alertConnecting = false;
+let alertReconnectTimer: NodeJS.Timeout | null = null;
+
+const encodeAlertListEvent = (): string => {
+  if (alertListEvent === null) {
+    const data = { data_version: alertDataVersion, ...alertSummary, alerts: [...alertList.values()] };
+    alertListEvent = `event: alerts\nid: ${alertEventId}\ndata: ${JSON.stringify(data)}\n\n`;
+  }
+  return alertListEvent;
+};
+
+const broadcastAlertEvent = (event: string) => {
+  for (const client of alertClients) client.write(event);
+};
+
+// Apply one upstream event ("alerts" replaces the list, "delta" patches it) and relay it
+const handleAlertEvent = (raw: string) => {
+  let event = 'message';
+  let id = '';
+  const data: string[] = [];
+  for (const line of raw.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('id:')) id = line.slice(3).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+  }
+  if (data.length === 0) return;  // retry / keepalive lines
+  const payload = JSON.parse(data.join('\n'));
+  
+  if (event === 'alerts') {
+    alertList.clear();
+    for (const alert of payload.alerts as StreamedAlert[]) alertList.set(alert.id, alert);
+    alertSummary = {
+      total_alerts: payload.total_alerts,
+      critical_count: payload.critical_count,
+      high_count: payload.high_count,
+    };
+  } else if (event === 'delta') {
+    for (const alert of payload.upserted as StreamedAlert[]) alertList.set(alert.id, alert);
+    for (const removed of payload.removed as string[]) alertList.delete(removed);
+    alertSummary = payload.summary;
+  } else {
+    return;
+  }
+  alertDataVersion = payload.data_version;
+  alertEventId = id;
+  alertListEvent = null;
+  broadcastAlertEvent(event === 'alerts' ? encodeAlertListEvent() : `${raw}\n\n`);
+};
+
+const scheduleAlertReconnect = () => {
+  if (alertClients.size === 0 || alertReconnectTimer) return;
+  alertReconnectTimer = setTimeout(() => {
+    alertReconnectTimer = null;
+    connectAlertUpstream();
+  }, ALERT_STREAM_RETRY_MS);
+};
+
+const connectAlertUpstream = async () => {
+  if (alertUpstream || alertConnecting || alertClients.size === 0) return;
+  alertConnecting = true;
+  try {
+    const response = await axios({
+      method: 'GET',
+      url: `${ML_SERVICE_URL}/api/alerts/stream`,
+      responseType: 'stream',
+      // Every reconnect starts from the full list: ML Service workers number events independently
+      headers: { Accept: 'text/event-stream' },
+    });
+    const stream = response.data;
+    if (alertClients.size === 0) {
+      stream.destroy();
+      return;
+    }
+    alertUpstream = stream;
+    const onClosed = () => {
+      if (alertUpstream !== stream) return;  // closed on purpose or already replaced
+      alertUpstream = null;
+      scheduleAlertReconnect();
+    };
+    let buffer = '';
+    stream.setEncoding('utf8');
+    stream.on('data', (chunk: string) => {
+      buffer += chunk.replace(/\r\n/g, '\n');
+      let end = buffer.indexOf('\n\n');
+      while (end !== -1) {
+        const raw = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        try {
+          handleAlertEvent(raw);
+        } catch (error) {
+          console.error('Bad alert stream event:', (error as Error).message);
+        }
+        end = buffer.indexOf('\n\n');
+      }
+    });
+    stream.on('end', onClosed);
+    stream.on('error', onClosed);
+  } catch (error) {
+    console.error('Alert stream unavailable:', (error as AxiosError).message);
+    scheduleAlertReconnect();
+  } finally {
+    alertConnecting = false;
+  }
+};
+
+// Alerts - live updates (Server-Sent Events)
+app.get('/api/alerts/stream', (req: Request, res: Response) => {
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no',
+  });
+  res.flushHeaders();
+  res.write(`retry: ${ALERT_STREAM_RETRY_MS}\n\n`);
+  if (alertSummary !== null) res.write(encodeAlertListEvent());
+  
+  alertClients.add(res);
+  connectAlertUpstream();
+  const keepalive = setInterval(() => res.write(': keepalive\n\n'), ALERT_STREAM_KEEPALIVE_MS);
+  
+  req.on('close', () => {
+    clearInterval(keepalive);
+    alertClients.delete(res);
+    // Last client gone: close the upstream stream; the list is refetched on the next connect
+    if (alertClients.size === 0 && alertUpstream) {
+      alertUpstream.destroy();
+      alertUpstream = null;
+      alertSummary = null;
+      alertList.clear();
+      alertListEvent = null;
+    }
+  });
+});
+
 // Dashboard Summary
 app.get('/api/dashboard/summary', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/dashboard/summary');
@@ -99,6 +394,11 @@ app.get('/api/medicines', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/medicines');
 });
 
+// Medicines - Typeahead search
+app.get('/api/medicines/search', (req: Request, res: Response) => {
+  proxyToMLService(req, res, '/api/medicines/search');
+});
+
 // Medicines - Detail
 app.get('/api/medicines/:id', (req: Request, res: Response) => {
   proxyToMLService(req, res, `/api/medicines/${req.params.id}`);
@@ -109,6 +409,16 @@ app.get('/api/inventory', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/inventory');
 });
 
+// Inventory - Weekly expiry calendar
+app.get('/api/inventory/expiry-calendar', (req: Request, res: Response) => {
+  proxyToMLService(req, res, '/api/inventory/expiry-calendar');
+});
+
+// Inventory CSV upload (streamed through, applied as a delta)
+app.post('/api/inventory/upload', (req: Request, res: Response) => {
+  uploadToMLService(req, res, '/api/inventory/upload');
+});
+
 // Consumption Trends
 app.get('/api/consumption/trends', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/consumption/trends');
@@ -129,6 +439,11 @@ app.get('/api/forecast/summary', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/forecast/summary');
 });
 
+// Bulk forecast (large results arrive as streamed NDJSON)
+app.post('/api/forecast/batch', (req: Request, res: Response) => {
+  streamFromMLService(req, res, '/api/forecast/batch');
+});
+
 app.get('/api/forecast/:id', (req: Request, res: Response) => {
   proxyToMLService(req, res, `/api/forecast/${req.params.id}`);
 });
@@ -143,6 +458,24 @@ app.get('/api/trends/:id', (req: Request, res: Response) => {
   proxyToMLService(req, res, `/api/trends/${req.params.id}`);
 });
 
+// Streaming Exports (NDJSON / CSV)
+app.get('/api/export/inventory', (req: Request, res: Response) => {
+  streamFromMLService(req, res, '/api/export/inventory');
+});
+
+app.get('/api/export/expiry-risks', (req: Request, res: Response) => {
+  streamFromMLService(req, res, '/api/export/expiry-risks');
+});
+
+app.get('/api/export/consumption', (req: Request, res: Response) => {
+  streamFromMLService(req, res, '/api/export/consumption');
+});
+
+// Batch (several GET endpoints in one round trip, one shared risk snapshot)
+app.post('/api/batch', (req: Request, res: Response) => {
+  proxyToMLService(req, res, '/api/batch');
+});
+
 // Reload Data
 app.post('/api/reload-data', (req: Request, res: Response) => {
   proxyToMLService(req, res, '/api/reload-data');
@@ -177,16 +510,24 @@ app.listen(PORT, () => {
 ║                                                               ║
 ║   Endpoints:                                                  ║
 ║   • GET  /api/health             - Health check               ║
+║   • GET  /api/ready              - Readiness & load progress  ║
 ║   • GET  /api/dashboard/summary  - Dashboard stats            ║
 ║   • GET  /api/expiry-risks       - Expiry predictions         ║
 ║   • GET  /api/stockout-risks     - Stockout predictions       ║
 ║   • GET  /api/alerts             - Active alerts              ║
+║   • GET  /api/alerts/stream      - Live alert changes (SSE)   ║
 ║   • GET  /api/medicines          - Medicine list              ║
+║   • GET  /api/medicines/search   - Medicine name typeahead    ║
 ║   • GET  /api/medicines/:id      - Medicine detail            ║
 ║   • GET  /api/inventory          - Inventory batches          ║
+║   • GET  /api/inventory/expiry-calendar - Expiry per week     ║
+║   • POST /api/inventory/upload   - Upload inventory CSV       ║
 ║   • GET  /api/consumption/trends - Consumption trends         ║
 ║   • GET  /api/categories         - Category list              ║
 ║   • GET  /api/recommendations    - Action recommendations     ║
+║   • GET  /api/export/*           - Streaming NDJSON/CSV export║
+║   • POST /api/forecast/batch     - Bulk forecasts             ║
+║   • POST /api/batch              - Batched GET requests       ║
 ║   • POST /api/reload-data        - Reload data                ║
 ║                                                               ║
 ╚═══════════════════════════════════════════════════════════════╝
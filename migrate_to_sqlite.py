@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+MedPredict AI - CSV to SQLite Migration
+
+Bulk-loads the data directory's consumption log into the SQLite storage
+backend (see src/ml/storage.py), reading it in chunks so it never has to fit
+in memory at once. A log already loaded from the same file content is skipped
+unless --force is given.
+
+Point the ML service at the result with MEDPREDICT_SQLITE_PATH.
+
+Usage:
+    python migrate_to_sqlite.py                          # data/ -> data/medpredict.db
+    python migrate_to_sqlite.py --db /srv/medpredict.db --force
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from src.api.data_state import DATASET_FILES, file_signature
+from src.api.schema import iter_dataset_csv
+from src.ml.storage import TABLES, SQLiteStorage
+
+ROOT_DIR = Path(__file__).parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--data-dir", type=Path, default=ROOT_DIR / "data")
+    parser.add_argument("--db", type=Path, default=ROOT_DIR / "data" / "medpredict.db")
+    parser.add_argument("--chunk-rows", type=int, default=200_000,
+                        help="CSV rows parsed and inserted at a time")
+    parser.add_argument("--force", action="store_true", help="Reload datasets that are up to date")
+    args = parser.parse_args()
+
+    storage = SQLiteStorage(args.db)
+    for name in TABLES:
+        path = args.data_dir / DATASET_FILES[name]
+        digest = file_signature(path).digest
+        if not args.force and storage.digest(name) == digest:
+            print(f"{name:<12} up to date")
+            continue
+        started = time.perf_counter()
+        first_id, last_id = storage.replace(name, iter_dataset_csv(name, path, args.chunk_rows), digest)
+        rows = last_id - first_id + 1
+        print(f"{name:<12} {rows:>10,} rows in {time.perf_counter() - started:6.2f} s")
+
+    print(f"Wrote {args.db}")
+
+
+if __name__ == "__main__":
+    main()
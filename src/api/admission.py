@@ -0,0 +1,131 @@
+"""
+MedPredict AI - Admission Control
+
+Endpoints are grouped into classes (e.g. heavy analytics vs. light lookups),
+each with its own concurrency limit and wait queue, so a burst of slow
+requests cannot take every worker thread from the cheap ones:
+
+- up to `concurrency` requests of a class run at once
+- up to `max_queue` more wait, first come first served, for at most
+  `max_wait_seconds`
+- anything beyond that is shed at once with 503 and a Retry-After estimated
+  from the class's recent service times
+
+Limits are per process (per uvicorn worker). All bookkeeping happens on the
+event loop, so no locks are needed.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+
+# Weight of the newest service time in the moving average
+SERVICE_TIME_SMOOTHING = 0.2
+
+RETRY_AFTER_MIN_SECONDS = 1
+RETRY_AFTER_MAX_SECONDS = 60
+
+
+class Overloaded(Exception):
+    """A request was not admitted (reason: "queue_full" or "timeout")"""
+
+    def __init__(self, admission_class: str, reason: str, retry_after: int):
+        super().__init__(f"{admission_class} requests are over capacity ({reason})")
+        self.admission_class = admission_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionClass:
+    """
+    Concurrency limit and bounded FIFO queue for one class of endpoints
+
+    Args:
+        name: Class label (metrics, logs)
+        concurrency: Requests served at once
+        max_queue: Requests allowed to wait for a slot
+        max_wait_seconds: Longest wait before giving up with 503
+        initial_service_seconds: Service time assumed before any was measured
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int,
+                 max_wait_seconds: float, initial_service_seconds: float = 1.0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_seconds = max_wait_seconds
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.service_seconds = initial_service_seconds
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue is likely to have drained"""
+        estimate = self.service_seconds * (self.queued + 1) / self.concurrency
+        return int(min(RETRY_AFTER_MAX_SECONDS, max(RETRY_AFTER_MIN_SECONDS, math.ceil(estimate))))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected[reason] += 1
+        return Overloaded(self.name, reason, self.retry_after())
+
+    async def _acquire(self) -> float:
+        """Take a slot, waiting in line if needed; returns the seconds waited"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait_seconds)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended: pass it on
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject("timeout") from None
+            raise
+        return time.perf_counter() - started
+
+    def _release(self):
+        # Hand the slot straight to the next live waiter, so none can jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """
+        Hold one of the class's slots for the duration of the block
+
+        Yields the seconds spent waiting; raises Overloaded if not admitted.
+        """
+        waited = await self._acquire()
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            elapsed = time.perf_counter() - started
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (elapsed - self.service_seconds)
+            self._release()
@@ -0,0 +1,163 @@
+"""
+MedPredict AI - Alert Stream
+
+Server-sent events for the alert list. The alerts of each new risk snapshot
+are compared once with the previous ones; when they differ, one "delta" event
+is encoded and queued for every subscriber:
+
+    event: delta
+    id: 5f0c9a2e-7
+    data: {"data_version": 3, "summary": {...}, "upserted": [...], "removed": [...]}
+
+A new subscriber first gets the whole list as an "alerts" event (skipped
+when it reconnects with the latest Last-Event-ID). Event ids carry a
+per-process prefix, since each worker numbers its own events. Alerts are
+identified by type, medicine and batch. Subscribers that stop reading are
+dropped once their queue is full; EventSource reconnects and starts from the
+full list.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+
+# Events held for a subscriber that is not reading
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Comment line sent when nothing happened, so proxies keep the connection open
+KEEPALIVE_SECONDS = 15.0
+
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 3000
+
+
+def alert_id(alert: Dict) -> str:
+    return f"{alert['type']}:{alert['medicine']}:{alert['batch'] or ''}"
+
+
+def encode_event(event: str, event_id: str, data: Dict) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\nid: {event_id}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def _summary(alerts: List[Dict]) -> Dict:
+    return {
+        "total_alerts": len(alerts),
+        "critical_count": sum(1 for a in alerts if a["severity"] == "CRITICAL"),
+        "high_count": sum(1 for a in alerts if a["severity"] == "HIGH"),
+    }
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def offer(self, event: bytes):
+        """Queue an event (on the subscriber's loop); a full queue ends the stream"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class AlertStream:
+    """Alert deltas fanned out to server-sent event subscribers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[_Subscriber] = set()
+        self._id_prefix = uuid.uuid4().hex[:8]
+        self.events_published = 0
+        self.data_version: Optional[int] = None
+        # alert id -> alert, in /api/alerts order
+        self._alerts: Dict[str, Dict] = {}
+        self._full_event: Optional[bytes] = None
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def event_id(self) -> str:
+        return f"{self._id_prefix}-{self.events_published}"
+
+    def publish(self, data_version: int, alerts: List[Dict]):
+        """
+        Publish the alerts of a new snapshot (any thread)
+
+        Subscribers get an event only when an alert was added, changed or removed.
+        """
+        current = {alert_id(a): a for a in alerts}
+        with self._lock:
+            upserted = [dict(a, id=k) for k, a in current.items() if self._alerts.get(k) != a]
+            removed = [k for k in self._alerts if k not in current]
+            first = self.data_version is None
+            self.data_version = data_version
+            if not (upserted or removed or first):
+                return
+            self.events_published += 1
+            self._alerts = current
+            self._full_event = None
+            event = encode_event("delta", self.event_id, {
+                "data_version": data_version,
+                "summary": _summary(alerts),
+                "upserted": upserted,
+                "removed": removed,
+            })
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, event)
+            except RuntimeError:  # loop closed
+                self._discard(subscriber)
+
+    def _full(self) -> bytes:
+        """The whole alert list as one event, encoded once per change (lock held)"""
+        if self._full_event is None:
+            alerts = list(self._alerts.values())
+            self._full_event = encode_event("alerts", self.event_id, {
+                "data_version": self.data_version,
+                **_summary(alerts),
+                "alerts": [dict(a, id=k) for k, a in self._alerts.items()],
+            })
+        return self._full_event
+
+    def _discard(self, subscriber: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    async def events(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Event stream for one client
+
+        Args:
+            last_event_id: Last-Event-ID sent by a reconnecting EventSource
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+            up_to_date = self.data_version is not None and last_event_id == self.event_id
+            first = None if self.data_version is None or up_to_date else self._full()
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode("ascii")
+            if first is not None:
+                yield first
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    self.dropped += 1
+                    return
+                yield event
+        finally:
+            self._discard(subscriber)
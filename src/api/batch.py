@@ -0,0 +1,117 @@
+"""
+MedPredict AI - Batch Requests
+
+Runs several GET sub-requests through the application in-process and
+combines their JSON bodies into one response. Sub-responses are spliced in
+as raw bytes, so each body is serialized exactly once.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from pydantic import BaseModel
+
+
+# Upper bound on sub-requests per batch call
+MAX_BATCH_REQUESTS = 20
+
+# Paths that cannot be used inside a batch (recursion, streaming downloads and
+# the server-sent event stream)
+BATCH_EXCLUDED_PREFIXES = ("/api/batch", "/api/export/", "/api/alerts/stream")
+
+# Content types of open-ended streams: a sub-request answering with one is cut off
+STREAMING_CONTENT_TYPES = ("text/event-stream",)
+
+
+class BatchSubRequest(BaseModel):
+    path: str
+    params: Dict[str, Any] = {}
+    id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+
+def validate_sub_request(sub: BatchSubRequest) -> Optional[str]:
+    """Return an error message if the sub-request cannot be run in a batch"""
+    if not sub.path.startswith("/api/"):
+        return "Only /api/ paths can be batched"
+    if sub.path.startswith(BATCH_EXCLUDED_PREFIXES):
+        return f"{sub.path} cannot be batched"
+    return None
+
+
+async def dispatch_get(app, path: str, params: Dict[str, Any],
+                       headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Run a GET request through the ASGI app without a network round trip
+
+    A response that turns out to be an endless stream (server-sent events)
+    is disconnected right after its headers; its body is returned empty.
+
+    Returns:
+        Tuple of (status code, response headers, body bytes)
+    """
+    query = urlencode(
+        [(key, v) for key, value in params.items() if value is not None
+         for v in (value if isinstance(value, list) else [value])]
+    )
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": query.encode("utf-8"),
+        "headers": list(headers or []),
+        "client": ("batch", 0),
+        "server": ("batch", 0),
+    }
+
+    request_sent = False
+
+    async def receive():
+        # The (empty) request body once, then the client is gone
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = 500
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+    streaming = False
+
+    async def send(message):
+        nonlocal status, streaming
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(
+                (k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in message.get("headers", [])
+            )
+            streaming = response_headers.get("content-type", "").startswith(STREAMING_CONTENT_TYPES)
+        elif message["type"] == "http.response.body" and not streaming:
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+def batch_item(sub: BatchSubRequest, status: int, body: Optional[bytes] = None,
+               etag: Optional[str] = None, error: Optional[str] = None) -> bytes:
+    """Encode one result entry, splicing a JSON sub-response body in unchanged"""
+    head = {"id": sub.id, "path": sub.path, "status": status}
+    if etag:
+        head["etag"] = etag
+    if error is not None:
+        head["error"] = error
+    encoded = json.dumps(head, ensure_ascii=False, separators=(",", ":"))
+    if body is None:
+        return encoded.encode("utf-8")
+    return encoded[:-1].encode("utf-8") + b',"body":' + body + b"}"
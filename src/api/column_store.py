@@ -0,0 +1,201 @@
+"""
+MedPredict AI - Shared Column Store
+
+With several uvicorn workers every process would parse the CSVs and keep
+its own copy of the data. Instead, the first worker to load a file writes
+the parsed columns once, one .npy file per column, into a generation
+directory named after the file's content hash:
+
+    <root>/consumption-<digest>-v1/meta.json, 0.npy, 1.npy, ...
+
+Generations are written to a temporary directory and renamed into place,
+so a generation is either complete or absent. Every worker then opens the
+numeric, date and categorical (codes) columns with np.load(mmap_mode="r"):
+the frames are read-only views of the same pages (under /dev/shm, of the
+same memory), not private copies. Text columns are small (names, batch
+numbers) and are materialized per worker. Files are parsed with their
+declared schema (see schema.py).
+
+A new file content means a new generation; superseded generations are
+removed once the new one is published. Workers still holding the old
+mapping keep it until they reload.
+
+Without /dev/shm the generations live in the temp directory; on disk they
+persist across restarts and are still shared through the page cache. The
+store also remembers each CSV's size, modification time and hash, so a
+restart with unchanged files neither parses nor hashes them. A generation
+that cannot be read (e.g. files removed by a temp cleaner) is written again;
+if that fails too, DataStore falls back to parsing the CSV.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.api.schema import read_dataset_csv
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers may parse concurrently, the rename keeps it safe
+    fcntl = None
+
+
+# Bump when the on-disk layout changes; older generations are then ignored
+FORMAT_VERSION = 2
+
+# dtype kinds stored as raw arrays and memory-mapped
+MAPPED_KINDS = "biufM"
+
+
+def default_root() -> Path:
+    """/dev/shm where it exists (Linux), otherwise the temp directory"""
+    shm = Path("/dev/shm")
+    return (shm if shm.is_dir() else Path(tempfile.gettempdir())) / "medpredict-columns"
+
+
+class ColumnStore:
+    """
+    Parsed datasets shared between processes as memory-mapped columns
+
+    Args:
+        root: Directory holding the generations (created if missing)
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def generation_dir(self, name: str, digest: str) -> Path:
+        return self.root / f"{name}-{digest}-v{FORMAT_VERSION}"
+
+    def load(self, name: str, csv_path: Path, digest: str) -> pd.DataFrame:
+        """
+        Get a dataset, writing its generation first if no worker has yet
+
+        Args:
+            name: Dataset name
+            csv_path: CSV to parse if the generation is missing
+            digest: Content hash of the CSV
+        """
+        directory = self.generation_dir(name, digest)
+        if (directory / "meta.json").exists():
+            try:
+                return self._read(directory)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Column store generation {directory.name} is unreadable, writing it again: {e}")
+        with self._lock(name):
+            if not self._readable(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+                self._write(name, read_dataset_csv(name, csv_path), directory)
+                self._remove_superseded(name, directory)
+        return self._read(directory)
+
+    def known_signature(self, path: Path) -> Optional[Tuple[int, int, str]]:
+        """(size, mtime_ns, digest) of a file when it was last loaded"""
+        try:
+            entry = json.loads((self.root / "signatures.json").read_text())[str(path.resolve())]
+            return int(entry["size"]), int(entry["mtime_ns"]), str(entry["digest"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def remember_signatures(self, signatures: Dict[Path, Tuple[int, int, str]]):
+        """Record the files' signatures for the next start"""
+        path = self.root / "signatures.json"
+        with self._lock("signatures"):
+            try:
+                known = json.loads(path.read_text())
+            except (OSError, ValueError):
+                known = {}
+            updated = {
+                **known,
+                **{str(path.resolve()): {"size": size, "mtime_ns": mtime_ns, "digest": digest}
+                   for path, (size, mtime_ns, digest) in signatures.items()}
+            }
+            if updated != known:
+                tmp = self.root / f".signatures.{uuid.uuid4().hex}.tmp"
+                tmp.write_text(json.dumps(updated))
+                os.replace(tmp, path)
+
+    @contextmanager
+    def _lock(self, name: str) -> Iterator[None]:
+        self.root.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(self.root / f".{name}.lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write(self, name: str, frame: pd.DataFrame, directory: Path):
+        tmp = self.root / f".{directory.name}.{uuid.uuid4().hex}.tmp"
+        tmp.mkdir()
+        try:
+            columns = []
+            for i, column in enumerate(frame.columns):
+                values = frame[column]
+                entry = {"name": column, "dtype": str(values.dtype)}
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    entry["kind"] = "category"
+                    np.save(tmp / f"{i}.npy", values.cat.codes.to_numpy())
+                    np.save(tmp / f"{i}.categories.npy", values.cat.categories.to_numpy(dtype=str))
+                elif values.dtype.kind in MAPPED_KINDS:
+                    entry["kind"] = "array"
+                    np.save(tmp / f"{i}.npy", values.to_numpy())
+                elif pd.api.types.is_string_dtype(values):
+                    entry["kind"] = "text"
+                    missing = values.isna().to_numpy()
+                    text = values.astype(object).where(~missing, "").astype(str).to_numpy(dtype=str)
+                    np.save(tmp / f"{i}.npy", text)
+                    np.save(tmp / f"{i}.missing.npy", missing)
+                else:
+                    raise TypeError(f"Column '{column}' of {name} has mixed types ({values.dtype})")
+                entry["file"] = f"{i}.npy"
+                columns.append(entry)
+            meta = {"format": FORMAT_VERSION, "dataset": name, "rows": len(frame), "columns": columns}
+            (tmp / "meta.json").write_text(json.dumps(meta))
+            os.rename(tmp, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not (directory / "meta.json").exists():
+                raise
+
+    def _remove_superseded(self, name: str, keep: Path):
+        for path in self.root.glob(f"{name}-*"):
+            if path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+        for path in self.root.glob(f".{name}-*.tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _readable(self, directory: Path) -> bool:
+        try:
+            self._read(directory)
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    @staticmethod
+    def _read(directory: Path) -> pd.DataFrame:
+        meta = json.loads((directory / "meta.json").read_text())
+        if meta["format"] != FORMAT_VERSION:
+            raise ValueError(f"format {meta['format']}, expected {FORMAT_VERSION}")
+        data: Dict[str, object] = {}
+        for entry in meta["columns"]:
+            if entry["kind"] == "array":
+                data[entry["name"]] = np.asarray(np.load(directory / entry["file"], mmap_mode="r"))
+            elif entry["kind"] == "category":
+                codes = np.asarray(np.load(directory / entry["file"], mmap_mode="r"))
+                categories = np.load(directory / entry["file"].replace(".npy", ".categories.npy"))
+                data[entry["name"]] = pd.Categorical.from_codes(codes, categories.astype(object))
+            else:
+                text = np.load(directory / entry["file"]).astype(object)
+                text[np.load(directory / entry["file"].replace(".npy", ".missing.npy"))] = np.nan
+                data[entry["name"]] = pd.Series(text, dtype=entry["dtype"])
+        frame = pd.DataFrame(data, copy=False)
+        if len(frame) != meta["rows"]:
+            raise ValueError(f"{len(frame)} rows, expected {meta['rows']}")
+        return frame
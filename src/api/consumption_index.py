@@ -0,0 +1,161 @@
+"""
+MedPredict AI - Consumption Date Index
+
+Per-day totals of the consumption log, built once per data state, so trend
+queries never touch the raw rows. Days are the sorted distinct log dates; a
+date window is found by binary search and its totals come from prefix sums:
+
+    total(window) = cumulative[end] - cumulative[start]
+
+Prefix sums are kept per medicine and per category, for quantity dispensed,
+patient count and the number of log rows (a day only appears in a filtered
+trend if it has rows for the filter).
+
+When the log is in date order, the cumulative row counts are also each day's
+first row, so row_range() turns a date window into a slice of the log.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _prefix_sums(values: np.ndarray) -> np.ndarray:
+    """Cumulative sums along days, with a leading row of zeros"""
+    out = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+class ConsumptionIndex:
+    """
+    Daily consumption totals with O(window) range queries
+
+    Args:
+        consumption_df: Consumption log (date as datetime, medicine_id,
+            quantity_dispensed, patient_count)
+        medicines_df: Medicine master (medicine_id, category)
+    """
+
+    FIELDS = ("quantity_dispensed", "patient_count")
+
+    def __init__(self, consumption_df: pd.DataFrame, medicines_df: pd.DataFrame):
+        dates = consumption_df['date'].to_numpy(dtype='datetime64[D]')
+        day_codes, self.dates = pd.factorize(dates, sort=True)
+        self.dates = np.asarray(self.dates, dtype='datetime64[D]')
+        med_codes, med_ids = pd.factorize(consumption_df['medicine_id'], sort=True)
+        self.medicine_ids = np.asarray(med_ids)
+        self._medicine_column = {int(m): i for i, m in enumerate(self.medicine_ids)}
+
+        # Monday of each day's week (pandas 'W' periods end on Sunday)
+        weekday = (self.dates.astype('datetime64[D]').view('int64') + 3) % 7
+        self.week_starts = self.dates - weekday.astype('timedelta64[D]')
+
+        shape = (len(self.dates), len(self.medicine_ids))
+        per_medicine = {}
+        for field in self.FIELDS:
+            daily = np.zeros(shape, dtype=np.int64)
+            np.add.at(daily, (day_codes, med_codes), consumption_df[field].to_numpy(dtype=np.int64))
+            per_medicine[field] = daily
+        rows = np.zeros(shape, dtype=np.int64)
+        np.add.at(rows, (day_codes, med_codes), 1)
+        per_medicine["rows"] = rows
+
+        self._medicine_sums = {name: _prefix_sums(daily) for name, daily in per_medicine.items()}
+        self._total_sums = {name: _prefix_sums(daily.sum(axis=1)) for name, daily in per_medicine.items()}
+        # First row of each day (and the row count at the end), if the log is in date order
+        self._day_rows = self._total_sums["rows"] if bool(np.all(dates[1:] >= dates[:-1])) else None
+
+        self._categories = dict(zip(medicines_df['medicine_id'].astype(int), medicines_df['category']))
+        self._category_sums: Dict[str, Dict[str, np.ndarray]] = {}
+        for category, ids in medicines_df.groupby('category')['medicine_id']:
+            columns = [self._medicine_column[i] for i in ids.astype(int) if i in self._medicine_column]
+            self._category_sums[category] = {
+                name: _prefix_sums(daily[:, columns].sum(axis=1))
+                for name, daily in per_medicine.items()
+            }
+
+    def row_range(self, start: Optional[np.datetime64], end: Optional[np.datetime64]) -> Optional[Tuple[int, int]]:
+        """
+        Log rows [first, last) dated on the days from start to end (inclusive)
+
+        Returns None when the log is not in date order. Bounds with a time of
+        day cover their whole day, so callers still filter the exact bounds.
+        """
+        if self._day_rows is None:
+            return None
+        first_day = 0 if start is None else int(np.searchsorted(self.dates, start.astype('datetime64[D]'), side='left'))
+        last_day = len(self.dates) if end is None else int(np.searchsorted(self.dates, end.astype('datetime64[D]'), side='right'))
+        if last_day <= first_day:
+            return 0, 0
+        return int(self._day_rows[first_day]), int(self._day_rows[last_day])
+
+    def _sums(self, medicine_id: Optional[int], category: Optional[str]) -> Optional[Dict[str, np.ndarray]]:
+        """Prefix sums for a filter (None when nothing can match)"""
+        if medicine_id is not None:
+            column = self._medicine_column.get(medicine_id)
+            if column is None or (category is not None and self._categories.get(medicine_id) != category):
+                return None
+            return {name: sums[:, column] for name, sums in self._medicine_sums.items()}
+        if category is not None:
+            return self._category_sums.get(category)
+        return self._total_sums
+
+    def trends(self, days: int, medicine_id: Optional[int] = None,
+               category: Optional[str] = None) -> Dict:
+        """
+        Daily and weekly totals over the last `days` days of the log
+
+        Args:
+            days: Window length, ending at the last logged date
+            medicine_id: Only this medicine
+            category: Only medicines of this category
+        """
+        empty = {"daily": [], "weekly": [], "summary": {
+            "total_dispensed": 0, "total_patients": 0,
+            "avg_daily_dispensed": 0.0, "avg_daily_patients": 0.0
+        }}
+        sums = self._sums(medicine_id, category)
+        if sums is None or len(self.dates) == 0:
+            return empty
+
+        start_date = self.dates[-1] - np.timedelta64(days, 'D')
+        start = int(np.searchsorted(self.dates, start_date, side='left'))
+        end = len(self.dates)
+        if start >= end:
+            return empty
+
+        window = {name: np.diff(s[start:end + 1]) for name, s in sums.items()}
+        present = np.flatnonzero(window["rows"] > 0)
+        if len(present) == 0:
+            return empty
+        quantity = window["quantity_dispensed"][present]
+        patients = window["patient_count"][present]
+        dates = self.dates[start:end][present]
+
+        weeks = self.week_starts[start:end][present]
+        week_bounds = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+        weekly_quantity = np.add.reduceat(quantity, week_bounds)
+        weekly_patients = np.add.reduceat(patients, week_bounds)
+
+        total_dispensed = int(quantity.sum())
+        total_patients = int(patients.sum())
+        date_labels = np.datetime_as_string(dates, unit='D').tolist()
+        week_labels = np.datetime_as_string(weeks[week_bounds], unit='D').tolist()
+        return {
+            "daily": [
+                {"date": d, "quantity_dispensed": q, "patient_count": p}
+                for d, q, p in zip(date_labels, quantity.tolist(), patients.tolist())
+            ],
+            "weekly": [
+                {"week": w, "quantity_dispensed": q, "patient_count": p}
+                for w, q, p in zip(week_labels, weekly_quantity.tolist(), weekly_patients.tolist())
+            ],
+            "summary": {
+                "total_dispensed": total_dispensed,
+                "total_patients": total_patients,
+                "avg_daily_dispensed": round(total_dispensed / len(present), 1),
+                "avg_daily_patients": round(total_patients / len(present), 1)
+            }
+        }
@@ -0,0 +1,450 @@
+"""
+MedPredict AI - Versioned Data State
+
+The prediction engines and the data they were built from live together in one
+immutable DataState. Reloads build a complete new state off the request path
+and publish it with a single reference swap, so a request that captured the
+previous state finishes on it and never sees a new engine next to an old one.
+
+Files whose content hash has not changed are not parsed again, and the
+advanced engine is reused when its inputs are unchanged. With a ColumnStore,
+parsed files are shared with the other worker processes as memory-mapped
+columns (see column_store.py). With a SQLiteStorage, the files are mirrored
+into an indexed SQLite database and the engines compute their aggregates
+there (see src/ml/storage.py). apply_file_changes()
+goes further for the data directory watcher: rows appended to the consumption
+log are parsed and applied on their own, and a changed inventory file only
+has the affected medicines' batches re-evaluated.
+"""
+
+import copy
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.ml.storage import ConsumptionRows, SQLiteStorage, StorageConflict
+from src.ml.predictor import MedPredictEngine
+from src.ml.advanced_predictor import AdvancedPredictor
+from src.ml.timing import span
+from src.api.column_store import ColumnStore
+from src.api.schema import read_dataset_csv
+from src.api.search import MedicineSearchIndex
+from src.api.consumption_index import ConsumptionIndex
+
+
+# Dataset name -> CSV file in the data directory
+DATASET_FILES = {
+    "consumption": "consumption_log.csv",
+    "inventory": "current_inventory.csv",
+    "medicines": "medicines_master.csv",
+}
+
+# Datasets the advanced engine is built from
+ADVANCED_ENGINE_INPUTS = {"consumption", "medicines"}
+
+# Datasets that normally only grow at the end
+APPEND_ONLY_DATASETS = {"consumption"}
+
+
+@dataclass(frozen=True)
+class FileSignature:
+    """Size, modification time and content hash of a data file"""
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+def file_signature(path: Path, previous: Optional[FileSignature] = None) -> FileSignature:
+    """
+    Hash a file's content
+
+    The previous signature is reused without reading the file when size and
+    modification time are unchanged.
+    """
+    stat = path.stat()
+    if previous is not None and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+        return previous
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return FileSignature(stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+
+def appended_signature(path: Path, previous: FileSignature) -> Optional[FileSignature]:
+    """
+    Check whether a file only had bytes appended since `previous`
+
+    Reads the file once, hashing the old length as a prefix along the way.
+
+    Returns:
+        The new signature if the first previous.size bytes are unchanged and
+        ended on a line break, otherwise None
+    """
+    stat = path.stat()
+    if stat.st_size <= previous.size:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = previous.size
+    last_byte = b""
+    with open(path, "rb") as f:
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                return None
+            digest.update(block)
+            remaining -= len(block)
+            last_byte = block[-1:]
+        if digest.hexdigest() != previous.digest or last_byte != b"\n":
+            return None
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return FileSignature(stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+
+def read_appended_rows(path: Path, offset: int, frame: pd.DataFrame) -> pd.DataFrame:
+    """Parse the lines after `offset` using the columns and dtypes of `frame`"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    rows = pd.read_csv(io.BytesIO(data), header=None, names=list(frame.columns))
+    return rows.astype(frame.dtypes.to_dict())
+
+
+@dataclass(frozen=True)
+class DataState:
+    """One consistent generation of engines and the data behind them"""
+    version: int
+    engine: MedPredictEngine
+    advanced_engine: Optional[AdvancedPredictor]
+    # Parsed CSVs and their signatures, by dataset name
+    frames: Dict[str, pd.DataFrame]
+    signatures: Dict[str, FileSignature]
+    loaded_at: float
+    # Inventory was changed by uploads since the files were loaded
+    has_uploads: bool = False
+    # Name search over the medicine master
+    search_index: Optional[MedicineSearchIndex] = None
+    # Daily consumption totals for trend queries
+    consumption_index: Optional[ConsumptionIndex] = None
+
+
+class DataStore:
+    """
+    Holds the current DataState and builds new ones
+
+    Readers call `current` once per request and use that state throughout.
+    Writers (reloads, inventory uploads) are serialized and publish a new state
+    only once it is complete.
+    """
+
+    def __init__(self, data_dir: Path, column_store: Optional[ColumnStore] = None,
+                 storage: Optional[SQLiteStorage] = None):
+        self.data_dir = data_dir
+        self.column_store = column_store
+        self.storage = storage
+        self._state: Optional[DataState] = None
+        self._lock = threading.Lock()
+
+    def read_dataset(self, name: str, signature: FileSignature) -> pd.DataFrame:
+        """Parse a data file with its schema, through the shared column store when there is one"""
+        path = self.data_dir / DATASET_FILES[name]
+        if self.column_store is not None:
+            try:
+                return self.column_store.load(name, path, signature.digest)
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Column store unavailable for {name}, reading the CSV: {e}")
+        return read_dataset_csv(name, path)
+
+    def _stored_signature(self, name: str) -> Optional[FileSignature]:
+        """Signature recorded by the column store at the last load (skips hashing on restart)"""
+        if self.column_store is None:
+            return None
+        known = self.column_store.known_signature(self.data_dir / DATASET_FILES[name])
+        return FileSignature(*known) if known is not None else None
+
+    def _store_signatures(self, signatures: Dict[str, FileSignature]):
+        if self.column_store is None:
+            return
+        try:
+            self.column_store.remember_signatures({
+                self.data_dir / DATASET_FILES[name]: (s.size, s.mtime_ns, s.digest)
+                for name, s in signatures.items()
+            })
+        except OSError as e:
+            print(f"Could not record data file signatures: {e}")
+
+    def _sync_storage(self, frames: Dict[str, pd.DataFrame],
+                      signatures: Dict[str, FileSignature]) -> Optional[ConsumptionRows]:
+        """
+        Load the consumption log into the storage backend, unless it holds this version already
+
+        Returns:
+            The consumption rows for the engines, or None (engines use the
+            frames) when there is no backend or it failed
+        """
+        if self.storage is None:
+            return None
+        try:
+            with span("storage_sync"):
+                first_id, last_id = self.storage.load(
+                    "consumption", frames["consumption"], signatures["consumption"].digest
+                )
+            return self.storage.consumption(first_id, last_id)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Storage backend unavailable, computing from the frames: {e}")
+            return None
+
+    def _collect_storage(self):
+        """Delete consumption rows of versions no state (in any process) still reads"""
+        if self.storage is None:
+            return
+        try:
+            self.storage.collect()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not clean up the storage backend: {e}")
+
+    def _update_storage(self, previous: DataState, appended: Optional[pd.DataFrame],
+                        frames: Dict[str, pd.DataFrame],
+                        signatures: Dict[str, FileSignature]) -> Optional[ConsumptionRows]:
+        """
+        Apply appended consumption rows to the storage backend
+
+        Returns:
+            The consumption rows for the engines (None: use the frames)
+        """
+        try:
+            if appended is None:
+                return previous.engine.storage
+            first_id, last_id = self.storage.append(
+                "consumption", appended, previous.signatures["consumption"].digest,
+                signatures["consumption"].digest
+            )
+            return self.storage.consumption(first_id, last_id)
+        except StorageConflict:
+            return self._sync_storage(frames, signatures)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Storage backend unavailable, computing from the frames: {e}")
+            return None
+
+    @property
+    def current(self) -> Optional[DataState]:
+        return self._state
+
+    @property
+    def version(self) -> int:
+        state = self._state
+        return state.version if state is not None else 0
+
+    def reload(self) -> Dict:
+        """
+        Rebuild the engines from the data directory and publish them
+
+        Returns:
+            Dict with the resulting version, the datasets that were re-parsed
+            and the engines that were rebuilt
+        """
+        with self._lock:
+            previous = self._state
+            self._collect_storage()
+            signatures: Dict[str, FileSignature] = {}
+            frames: Dict[str, pd.DataFrame] = {}
+            reparsed: List[str] = []
+
+            for name, filename in DATASET_FILES.items():
+                path = self.data_dir / filename
+                old = previous.signatures.get(name) if previous is not None else None
+                signature = file_signature(path, old or self._stored_signature(name))
+                signatures[name] = signature
+                if old is not None and signature.digest == old.digest:
+                    frames[name] = previous.frames[name]
+                else:
+                    with span(f"parse_{name}"):
+                        frames[name] = self.read_dataset(name, signature)
+                    reparsed.append(name)
+            self._store_signatures(signatures)
+
+            if previous is not None and not reparsed and not previous.has_uploads:
+                self._state = replace(previous, signatures=signatures)
+                return {"version": previous.version, "reparsed": [], "rebuilt": []}
+
+            storage_rows = self._sync_storage(frames, signatures)
+            rebuilt = ["engine"]
+            engine = MedPredictEngine(frames["consumption"], frames["inventory"], frames["medicines"],
+                                      storage=storage_rows)
+            if (previous is not None and previous.advanced_engine is not None
+                    and not ADVANCED_ENGINE_INPUTS.intersection(reparsed)):
+                advanced_engine = previous.advanced_engine
+            else:
+                advanced_engine = AdvancedPredictor(frames["consumption"], frames["medicines"],
+                                                    storage=storage_rows)
+                rebuilt.append("advanced_engine")
+
+            if previous is not None and previous.search_index is not None and "medicines" not in reparsed:
+                search_index = previous.search_index
+            else:
+                with span("search_index"):
+                    search_index = MedicineSearchIndex(frames["medicines"])
+                rebuilt.append("search_index")
+
+            with span("consumption_index"):
+                consumption_index = ConsumptionIndex(engine.consumption_df, frames["medicines"])
+
+            state = DataState(
+                version=self.version + 1,
+                engine=engine,
+                advanced_engine=advanced_engine,
+                frames=frames,
+                signatures=signatures,
+                loaded_at=time.time(),
+                search_index=search_index,
+                consumption_index=consumption_index
+            )
+            self._state = state
+            return {"version": state.version, "reparsed": reparsed, "rebuilt": rebuilt}
+
+    def changed_datasets(self) -> List[str]:
+        """Datasets whose files differ from the current state (size or mtime)"""
+        state = self._state
+        if state is None:
+            return list(DATASET_FILES)
+        changed = []
+        for name, filename in DATASET_FILES.items():
+            old = state.signatures.get(name)
+            try:
+                stat = (self.data_dir / filename).stat()
+            except FileNotFoundError:
+                continue
+            if old is None or old.size != stat.st_size or old.mtime_ns != stat.st_mtime_ns:
+                changed.append(name)
+        return changed
+
+    def apply_file_changes(self) -> Optional[Dict]:
+        """
+        Bring the current state up to date with the data directory using deltas
+
+        - consumption log grew at the end: only the new rows are parsed and
+          appended; the advanced engine recomputes just those medicines
+        - inventory file changed: swapped in without recomputing consumption
+          statistics; the medicines whose batches differ are reported
+        - anything else (medicine master changed, log rewritten): full reload
+
+        Returns:
+            Dict describing what was applied, or None if nothing changed
+        """
+        while True:
+            with self._lock:
+                previous = self._state
+                if previous is None:
+                    return None
+
+                signatures = dict(previous.signatures)
+                frames = dict(previous.frames)
+                appended: Optional[pd.DataFrame] = None
+                modified: List[str] = []
+
+                for name, filename in DATASET_FILES.items():
+                    path = self.data_dir / filename
+                    old = previous.signatures[name]
+                    if name in APPEND_ONLY_DATASETS:
+                        grown = appended_signature(path, old)
+                        if grown is not None:
+                            appended = read_appended_rows(path, old.size, previous.frames[name])
+                            frames[name] = pd.concat([previous.frames[name], appended], ignore_index=True)
+                            signatures[name] = grown
+                            continue
+                    signature = file_signature(path, old)
+                    signatures[name] = signature
+                    if signature.digest != old.digest:
+                        modified.append(name)
+
+                if appended is None and not modified:
+                    self._state = replace(previous, signatures=signatures)
+                    return None
+
+            if set(modified) - {"inventory"}:
+                result = self.reload()
+                result["mode"] = "full"
+                return result
+
+            with self._lock:
+                if self._state is not previous:
+                    # Another writer published in the meantime; start over from its state
+                    continue
+
+                engine = copy.copy(previous.engine)
+                advanced_engine = previous.advanced_engine
+                result: Dict = {"mode": "delta", "appended_rows": 0, "inventory_medicines": []}
+
+                if "inventory" in modified:
+                    frames["inventory"] = self.read_dataset("inventory", signatures["inventory"])
+
+                storage_rows = None
+                if self.storage is not None and previous.engine.storage is not None:
+                    storage_rows = self._update_storage(previous, appended, frames, signatures)
+
+                if appended is not None:
+                    engine.append_consumption(appended, storage=storage_rows)
+                    if advanced_engine is not None:
+                        advanced_engine = copy.copy(advanced_engine)
+                        result["consumption_medicines"] = advanced_engine.append_consumption(
+                            appended, storage=storage_rows
+                        )
+                    result["appended_rows"] = len(appended)
+
+                if "inventory" in modified:
+                    result["inventory_medicines"] = engine.replace_inventory(frames["inventory"])
+
+                consumption_index = previous.consumption_index
+                if appended is not None:
+                    consumption_index = ConsumptionIndex(engine.consumption_df, frames["medicines"])
+
+                state = DataState(
+                    version=previous.version + 1,
+                    engine=engine,
+                    advanced_engine=advanced_engine,
+                    frames=frames,
+                    signatures=signatures,
+                    loaded_at=time.time(),
+                    has_uploads=previous.has_uploads and "inventory" not in modified,
+                    search_index=previous.search_index,
+                    consumption_index=consumption_index
+                )
+                self._state = state
+                self._store_signatures(signatures)
+                result["version"] = state.version
+                result["previous_version"] = previous.version
+                return result
+
+    def apply_inventory_delta(self, delta: pd.DataFrame) -> Tuple[Optional[DataState], DataState, List[int]]:
+        """
+        Publish a new state with inventory rows upserted
+
+        The engine is copied first, so requests holding the previous state keep
+        the previous inventory.
+
+        Returns:
+            Tuple of (previous state, new state, affected medicine ids)
+        """
+        with self._lock:
+            previous = self._state
+            engine = copy.copy(previous.engine)
+            affected = engine.apply_inventory_delta(delta)
+            if not affected:
+                return previous, previous, []
+            state = replace(
+                previous,
+                version=previous.version + 1,
+                engine=engine,
+                loaded_at=time.time(),
+                has_uploads=True
+            )
+            self._state = state
+            return previous, state, affected
@@ -0,0 +1,98 @@
+"""
+MedPredict AI - Data Directory Watcher
+
+Optional background poller for the data directory. When dataset files change
+it waits for writes to settle (debounce), then applies the change to the
+engines as a delta via DataStore.apply_file_changes().
+
+Polling file stats keeps this dependency-free and works the same on every
+platform and on network or container volumes, where change notifications are
+often unreliable.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from src.api.data_state import DATASET_FILES, DataStore
+
+
+class DataDirWatcher:
+    """
+    Applies data file changes once they stop changing
+
+    Args:
+        data_store: Store whose data directory is watched
+        on_change: Called with the result of each applied change
+        poll_seconds: Interval between file stat checks
+        debounce_seconds: How long files must stay unchanged before applying
+    """
+
+    def __init__(self, data_store: DataStore, on_change: Callable[[Dict], None],
+                 poll_seconds: float = 2.0, debounce_seconds: float = 2.0):
+        self._store = data_store
+        self._on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.debounce_seconds = debounce_seconds
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.applied_count = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="data-dir-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _stat_files(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for name, filename in DATASET_FILES.items():
+            try:
+                stat = (self._store.data_dir / filename).stat()
+                stats[name] = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                stats[name] = (-1, 0)
+        return stats
+
+    def _run(self):
+        last_seen = None
+        changed_at = 0.0
+        failed = None
+
+        while not self._stopped.wait(self.poll_seconds):
+            if self._store.current is None or not self._store.changed_datasets():
+                last_seen = None
+                continue
+
+            # Debounce: wait until a burst of writes is over
+            stats = self._stat_files()
+            if stats != last_seen:
+                last_seen, changed_at = stats, time.monotonic()
+                continue
+            if time.monotonic() - changed_at < self.debounce_seconds or stats == failed:
+                continue
+
+            try:
+                result = self._store.apply_file_changes()
+            except Exception as e:
+                # Don't retry the same broken files until they change again
+                failed = stats
+                self.last_error = str(e)
+                print(f"Error applying data file changes: {e}")
+                continue
+
+            failed = None
+            self.last_error = None
+            if result is not None:
+                self.applied_count += 1
+                self._on_change(result)
@@ -0,0 +1,110 @@
+"""
+MedPredict AI - Streaming Exports
+
+Generators that turn columnar data into newline-delimited JSON or CSV a
+chunk of rows at a time, so exports of any size are produced in constant
+memory instead of materializing the full response body.
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.api.formats import Columns, column_count
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Rows encoded per yielded chunk
+EXPORT_CHUNK_ROWS = 5000
+
+# Selects rows from one chunk of columns (returns a boolean mask)
+ChunkFilter = Callable[[Columns], np.ndarray]
+
+
+def validate_export_format(fmt: Optional[str]) -> str:
+    fmt = (fmt or "ndjson").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    return fmt
+
+
+def _chunk_values(values: np.ndarray) -> list:
+    """Native Python values for one chunk (dates as ISO strings, NaN as None)"""
+    if values.dtype.kind == "M":
+        return np.datetime_as_string(values, unit="D").tolist()
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def iter_chunks(columns: Columns, chunk_filter: Optional[ChunkFilter] = None,
+                chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, list]]:
+    """
+    Walk columns in fixed-size slices
+
+    Slicing NumPy arrays creates views, so only one chunk of Python values
+    exists at a time.
+    """
+    total = column_count(columns)
+    for start in range(0, total, chunk_rows):
+        chunk = {name: values[start:start + chunk_rows] for name, values in columns.items()}
+        if chunk_filter is not None:
+            mask = chunk_filter(chunk)
+            if not mask.any():
+                continue
+            chunk = {name: values[mask] for name, values in chunk.items()}
+        yield {name: _chunk_values(values) for name, values in chunk.items()}
+
+
+def iter_ndjson(columns: Columns, chunk_filter: Optional[ChunkFilter] = None) -> Iterator[bytes]:
+    names = list(columns)
+    for chunk in iter_chunks(columns, chunk_filter):
+        lines = [
+            json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(",", ":"))
+            for row in zip(*(chunk[name] for name in names))
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_csv(columns: Columns, chunk_filter: Optional[ChunkFilter] = None) -> Iterator[bytes]:
+    names = list(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(names)
+    for chunk in iter_chunks(columns, chunk_filter):
+        writer.writerows(zip(*(chunk[name] for name in names)))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def ndjson_response(columns: Columns, headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream columns as newline-delimited JSON (inline, not as a download)"""
+    return StreamingResponse(iter_ndjson(columns), media_type=EXPORT_MEDIA_TYPES["ndjson"], headers=headers)
+
+
+def export_response(columns: Columns, fmt: str, filename: str,
+                    chunk_filter: Optional[ChunkFilter] = None,
+                    headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream columns as an NDJSON or CSV download"""
+    body = iter_csv(columns, chunk_filter) if fmt == "csv" else iter_ndjson(columns, chunk_filter)
+    headers = dict(headers or {})
+    headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[fmt], headers=headers)
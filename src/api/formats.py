@@ -0,0 +1,157 @@
+"""
+MedPredict AI - Response Formats
+
+Opt-in alternatives to row-oriented JSON for large result sets. Rows are kept
+as one NumPy array per field and encoded without building a dict or Pydantic
+model per row:
+- columnar: JSON object with one array per field
+- msgpack:  the same columnar layout encoded with MessagePack
+- arrow:    Arrow IPC stream (requires pyarrow)
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Response
+
+from src.ml.timing import span
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+
+RESPONSE_FORMATS = ("json", "columnar", "msgpack", "arrow")
+
+MEDIA_TYPES = {
+    "columnar": "application/json",
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+Columns = Dict[str, np.ndarray]
+
+
+def validate_format(fmt: Optional[str]) -> str:
+    """Normalize the `format` query parameter, rejecting unknown or unavailable formats"""
+    fmt = (fmt or "json").lower()
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{fmt}'. Use one of: {', '.join(RESPONSE_FORMATS)}"
+        )
+    if fmt == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=400, detail="msgpack format requires the 'msgpack' package")
+    if fmt == "arrow" and pa is None:
+        raise HTTPException(status_code=400, detail="arrow format requires the 'pyarrow' package")
+    return fmt
+
+
+# ============================================================================
+# BUILDING COLUMNS
+# ============================================================================
+def records_to_columns(records: Sequence[Any], names: Sequence[str],
+                       converters: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Columns:
+    """
+    Transpose a list of dataclass records into one array per field
+
+    Args:
+        records: Dataclass instances (e.g. ExpiryRisk)
+        names: Attribute names to extract, in output order
+        converters: Optional per-field value conversion (e.g. date formatting)
+    """
+    converters = converters or {}
+    columns = {}
+    for name in names:
+        convert = converters.get(name)
+        if convert is None:
+            values = [getattr(r, name) for r in records]
+        else:
+            values = [convert(getattr(r, name)) for r in records]
+        columns[name] = np.asarray(values) if values else np.asarray([], dtype=object)
+    return columns
+
+
+def frame_to_columns(df: pd.DataFrame, date_format: str = "%Y-%m-%d") -> Columns:
+    """Extract a DataFrame's columns as arrays, formatting datetime columns as strings"""
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime(date_format)
+        columns[str(name)] = series.to_numpy()
+    return columns
+
+
+def take_columns(columns: Columns, index: np.ndarray) -> Columns:
+    """Select rows (by position or boolean mask) from every column"""
+    return {name: values[index] for name, values in columns.items()}
+
+
+def column_count(columns: Columns) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+def _to_list(values: np.ndarray) -> list:
+    """Convert an array to native Python values, mapping NaN to None"""
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def encode_columns(columns: Columns, fmt: str, extra: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Encode columns in the requested format
+
+    Args:
+        columns: One array per field
+        fmt: "columnar", "msgpack" or "arrow"
+        extra: Response-level fields (totals etc.) sent alongside the columns
+    """
+    extra = extra or {}
+
+    if fmt == "arrow":
+        table = pa.table({
+            name: pa.array(values, from_pandas=True) for name, values in columns.items()
+        })
+        if extra:
+            table = table.replace_schema_metadata(
+                {key: json.dumps(value, default=str) for key, value in extra.items()}
+            )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    payload = {
+        "format": "columnar",
+        "count": column_count(columns),
+        **extra,
+        "columns": {name: _to_list(values) for name, values in columns.items()},
+    }
+    if fmt == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def columnar_response(columns: Columns, fmt: str, extra: Optional[Dict[str, Any]] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Response:
+    """Build an HTTP response for a columnar result set"""
+    with span("encode"):
+        content = encode_columns(columns, fmt, extra)
+    return Response(
+        content=content,
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers
+    )
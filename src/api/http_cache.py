@@ -0,0 +1,49 @@
+"""
+MedPredict AI - HTTP Caching Helpers
+
+Strong ETags for API responses. A response body is fully determined by the
+route, its query parameters, the data version the engines were built from and
+the reference day used for days-to-expiry, so the ETag is derived from those
+alone and can be checked before any computation or serialization happens.
+"""
+
+import hashlib
+import json
+from typing import Iterable, Optional, Tuple
+
+
+def make_etag(path: str, query_params: Iterable[Tuple[str, str]], basis: tuple) -> str:
+    """
+    Build a strong ETag for a request
+
+    Args:
+        path: Request path
+        query_params: (name, value) pairs; order does not matter
+        basis: Data identity, e.g. (data version, reference day)
+    """
+    payload = json.dumps(
+        [path, sorted(query_params), [str(part) for part in basis]],
+        separators=(",", ":")
+    )
+    digest = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+
+    Uses the weak comparison required for If-None-Match, so a W/ prefix added
+    by an intermediary (e.g. a compressing proxy) still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    def _opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    target = _opaque(etag)
+    return any(_opaque(candidate) == target for candidate in if_none_match.split(","))
@@ -0,0 +1,179 @@
+"""
+MedPredict AI - Inventory CSV Upload
+
+Parses an inventory CSV from the request body stream a block of lines at a
+time, validates each row and collects the valid rows into a delta that the
+prediction engine applies to its live inventory.
+"""
+
+import io
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Set, Tuple
+
+import pandas as pd
+from fastapi import HTTPException
+
+
+REQUIRED_COLUMNS = ("medicine_id", "batch_no", "quantity", "expiry_date")
+OPTIONAL_COLUMNS = ("medicine_name", "category", "unit", "received_date", "unit_cost_inr")
+
+# Bytes of CSV parsed per block
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+# Rejected rows listed in the response (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class InventoryUpload:
+    """Validated rows of an upload plus what was rejected"""
+    delta: pd.DataFrame
+    rows_read: int = 0
+    rows_rejected: int = 0
+    errors: List[Dict] = field(default_factory=list)
+
+
+async def iter_csv_blocks(stream: AsyncIterator[bytes],
+                          chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> AsyncIterator[Tuple[bytes, bytes]]:
+    """
+    Split a byte stream into blocks of complete CSV lines
+
+    Yields:
+        Tuples of (header line, block of data lines)
+    """
+    header = None
+    parts: List[bytes] = []
+    size = 0
+    async for data in stream:
+        parts.append(data)
+        size += len(data)
+        if size < chunk_bytes:
+            continue
+        buffer = b"".join(parts)
+        cut = buffer.rfind(b"\n") + 1
+        if cut == 0:
+            parts, size = [buffer], len(buffer)
+            continue
+        block, rest = buffer[:cut], buffer[cut:]
+        parts, size = [rest], len(rest)
+        if header is None:
+            end = block.find(b"\n") + 1
+            header, block = block[:end], block[end:]
+        if block.strip():
+            yield header, block
+
+    block = b"".join(parts)
+    if header is None:
+        end = block.find(b"\n") + 1 or len(block)
+        header, block = block[:end], block[end:]
+    if block.strip():
+        yield header, block
+
+
+def _read_block(header: bytes, block: bytes) -> pd.DataFrame:
+    frame = pd.read_csv(io.BytesIO(header + block), dtype=str, keep_default_na=False,
+                        skip_blank_lines=False)
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    return frame
+
+
+def check_columns(frame: pd.DataFrame):
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required columns: {', '.join(missing)}"
+        )
+
+
+def validate_rows(frame: pd.DataFrame, first_line: int,
+                  known_medicine_ids: Set[int]) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Type-check one block of rows
+
+    Args:
+        frame: Rows as strings
+        first_line: CSV line number of the first row (header is line 1)
+        known_medicine_ids: Medicines in the master list
+
+    Returns:
+        Tuple of (valid typed rows, errors for rejected rows)
+    """
+    columns = [c for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if c in frame.columns]
+    frame = frame[columns].apply(lambda col: col.str.strip())
+    blank = (frame == "").all(axis=1)
+
+    medicine_id = pd.to_numeric(frame["medicine_id"], errors="coerce")
+    quantity = pd.to_numeric(frame["quantity"], errors="coerce")
+    expiry_date = pd.to_datetime(frame["expiry_date"], format="%Y-%m-%d", errors="coerce")
+
+    checks = [
+        ("invalid medicine_id", medicine_id.isna() | (medicine_id % 1 != 0)),
+        ("unknown medicine_id", ~medicine_id.isin(list(known_medicine_ids))),
+        ("missing batch_no", frame["batch_no"] == ""),
+        ("quantity must be a whole number >= 0", quantity.isna() | (quantity < 0) | (quantity % 1 != 0)),
+        ("expiry_date must be YYYY-MM-DD", expiry_date.isna()),
+    ]
+    unit_cost = None
+    if "unit_cost_inr" in frame.columns:
+        unit_cost = pd.to_numeric(frame["unit_cost_inr"].replace("", None), errors="coerce")
+        checks.append(("unit_cost_inr must be a number >= 0",
+                       (frame["unit_cost_inr"] != "") & (unit_cost.isna() | (unit_cost < 0))))
+
+    invalid = pd.Series(False, index=frame.index)
+    reasons = pd.Series("", index=frame.index, dtype=object)
+    for message, failed in checks:
+        failed = failed & ~blank & ~invalid
+        reasons[failed] = message
+        invalid |= failed
+
+    errors = [
+        {"line": first_line + int(i), "error": reasons[i]}
+        for i in frame.index[invalid]
+    ]
+
+    keep = ~invalid & ~blank
+    valid = frame[keep].copy()
+    valid["medicine_id"] = medicine_id[keep].astype("int64")
+    valid["quantity"] = quantity[keep].astype("int64")
+    valid["expiry_date"] = expiry_date[keep]
+    if unit_cost is not None:
+        valid["unit_cost_inr"] = unit_cost[keep]
+    for column in ("medicine_name", "category", "unit", "received_date"):
+        if column in valid.columns:
+            valid[column] = valid[column].replace("", None)
+    return valid, errors
+
+
+async def read_inventory_upload(stream: AsyncIterator[bytes],
+                                known_medicine_ids: Set[int]) -> InventoryUpload:
+    """
+    Parse and validate an inventory CSV without holding the whole body in memory
+
+    Only valid rows are kept (deduplicated by medicine_id + batch_no, last row
+    wins); rejected rows are counted and the first few reported with their
+    line numbers.
+    """
+    result = InventoryUpload(delta=pd.DataFrame(columns=list(REQUIRED_COLUMNS)))
+    blocks = []
+    next_line = 2
+    async for header, block in iter_csv_blocks(stream):
+        frame = _read_block(header, block)
+        check_columns(frame)
+        frame.index = range(len(frame))
+
+        valid, errors = validate_rows(frame, next_line, known_medicine_ids)
+        result.rows_read += len(valid) + len(errors)
+        result.rows_rejected += len(errors)
+        room = MAX_REPORTED_ERRORS - len(result.errors)
+        result.errors.extend(errors[:max(0, room)])
+        next_line += len(frame)
+        blocks.append(valid)
+
+    if result.rows_read == 0:
+        raise HTTPException(status_code=400, detail="Upload contains no inventory rows")
+
+    if blocks:
+        delta = pd.concat(blocks, ignore_index=True)
+        result.delta = delta.drop_duplicates(["medicine_id", "batch_no"], keep="last")
+    return result
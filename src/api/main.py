@@ -8,6 +8,7 @@ REST API for:
 - Inventory upload
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -15,17 +16,57 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 from functools import lru_cache
 import time
+import threading
+from contextvars import ContextVar
 
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 from pydantic import BaseModel
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.ml.predictor import MedPredictEngine, ExpiryRisk, StockoutRisk
+from src.ml.predictor import ExpiryRisk, StockoutRisk
 from src.ml.advanced_predictor import AdvancedPredictor
+from src.ml.timing import add_timing_observer, current_trace, span, start_trace, timed
+from src.api.data_state import DataState, DataStore
+from src.api.column_store import ColumnStore, default_root
+from src.ml.storage import SQLiteStorage
+from src.api.schema import memory_report
+from src.api.scheduler import RiskSnapshot, SnapshotScheduler
+from src.api.readiness import StartupLoader
+from src.api.data_watcher import DataDirWatcher
+from src.api.http_cache import make_etag, etag_matches
+from src.api.response_cache import CachedResponse, ResponseCache
+from src.api.alert_stream import AlertStream
+from src.api.admission import AdmissionClass, Overloaded
+from src.api.formats import (
+    Columns, validate_format, records_to_columns, frame_to_columns,
+    take_columns, columnar_response
+)
+from src.api.pagination import Ordering, SortedIndex
+from src.api.export import validate_export_format, export_response, ndjson_response
+from src.api.inventory_upload import read_inventory_upload
+from src.api.tracing import SpanLog, TracedRoute, finish_request_trace, request_trace_name
+from src.api.profiling import RequestProfiler, SamplingProfiler, check_admin_token, profile_in_thread
+from src.api.metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from src.api.batch import (
+    MAX_BATCH_REQUESTS, BatchRequest, validate_sub_request, dispatch_get, batch_item
+)
+
+class ProfiledRoute(TracedRoute):
+    """TracedRoute whose thread pool endpoints can be profiled per request (see profile_request)"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = profile_in_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,51 +74,709 @@ app = FastAPI(
     description="AI-powered medical supply prediction and expiry management",
     version="1.0.0"
 )
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Every route records request / endpoint / serialize timing spans
+app.router.route_class = ProfiledRoute
 
 # Data paths
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
-# Global engine instances
-engine: Optional[MedPredictEngine] = None
-advanced_engine: Optional[AdvancedPredictor] = None
+# Columnar cache of the parsed data files, memory-mapped by every worker process
+# (default /dev/shm/medpredict-columns, or the temp directory; set to "" to disable)
+COLUMN_STORE_DIR = os.environ.get("MEDPREDICT_COLUMN_STORE_DIR", str(default_root()))
+
+# Indexed SQLite copy of the data files; the engines compute their aggregates
+# there instead of from the frames (unset: no backend). The frames are still
+# loaded in full. Build one ahead of time with migrate_to_sqlite.py, or let the
+# first load fill it.
+SQLITE_PATH = os.environ.get("MEDPREDICT_SQLITE_PATH", "")
+
+# Engines and the data behind them, swapped atomically on reload
+data_store = DataStore(
+    DATA_DIR,
+    ColumnStore(Path(COLUMN_STORE_DIR)) if COLUMN_STORE_DIR else None,
+    SQLiteStorage(Path(SQLITE_PATH)) if SQLITE_PATH else None
+)
+
+# Background snapshot settings
+SNAPSHOT_REFRESH_SECONDS = int(os.environ.get("MEDPREDICT_SNAPSHOT_REFRESH_SECONDS", "300"))
+SNAPSHOT_FORECAST_DAYS = 30
+SNAPSHOT_ANOMALY_DAYS = 30
+
+# Retry-After sent while the data is still loading at startup
+STARTUP_RETRY_AFTER_SECONDS = 2
+
+# Optional data directory watcher (off by default)
+WATCH_DATA_DIR = os.environ.get("MEDPREDICT_WATCH_DATA_DIR", "").lower() in ("1", "true", "yes")
+WATCH_POLL_SECONDS = float(os.environ.get("MEDPREDICT_WATCH_POLL_SECONDS", "2"))
+WATCH_DEBOUNCE_SECONDS = float(os.environ.get("MEDPREDICT_WATCH_DEBOUNCE_SECONDS", "2"))
 
 # ============================================================================
 # SIMPLE IN-MEMORY CACHE
 # ============================================================================
 class SimpleCache:
     """Simple time-based cache for expensive calculations"""
-    def __init__(self, ttl_seconds: int = 60):
+    # Every instance, for the /metrics hit/miss/eviction counters
+    instances: List["SimpleCache"] = []
+    
+    def __init__(self, name: str, ttl_seconds: int = 60):
+        self.name = name
         self.cache: Dict[str, tuple] = {}  # key -> (value, timestamp)
         self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        SimpleCache.instances.append(self)
     
     def get(self, key: str) -> Optional[Any]:
         if key in self.cache:
             value, timestamp = self.cache[key]
             if time.time() - timestamp < self.ttl:
+                self.hits += 1
                 return value
             del self.cache[key]
+            self.evictions += 1
+        self.misses += 1
         return None
     
     def set(self, key: str, value: Any):
         self.cache[key] = (value, time.time())
     
     def clear(self):
+        self.evictions += len(self.cache)
         self.cache.clear()
 
 # Cache instances
-expiry_cache = SimpleCache(ttl_seconds=30)
-stockout_cache = SimpleCache(ttl_seconds=30)
-summary_cache = SimpleCache(ttl_seconds=30)
-medicines_cache = SimpleCache(ttl_seconds=60)
+medicines_cache = SimpleCache("medicines", ttl_seconds=60)
+
+
+# ============================================================================
+# BACKGROUND RISK SNAPSHOTS
+# ============================================================================
+def build_snapshot() -> Optional[RiskSnapshot]:
+    """Compute risks, dashboard, forecast summary and anomalies in one pass"""
+    state = data_store.current
+    if state is None:
+        return None
+    current_engine, current_advanced = state.engine, state.advanced_engine
+    
+    started = time.time()
+    reference_date = datetime.now()
+    expiry_risks = current_engine.calculate_expiry_risks(reference_date)
+    stockout_risks = current_engine.calculate_stockout_risks(reference_date)
+    dashboard = current_engine.get_dashboard_summary(
+        reference_date, expiry_risks=expiry_risks, stockout_risks=stockout_risks
+    )
+    
+    forecast_summary = None
+    anomalies = None
+    if current_advanced is not None:
+        forecast_summary = current_advanced.get_forecast_summary(SNAPSHOT_FORECAST_DAYS)
+        # Keep every severity so any min_severity filter can be served from the snapshot
+        anomalies = current_advanced.detect_all_anomalies(SNAPSHOT_ANOMALY_DAYS, "low")
+    
+    return RiskSnapshot(
+        data_version=state.version,
+        reference_date=reference_date,
+        computed_at=time.time(),
+        compute_seconds=round(time.time() - started, 3),
+        expiry_risks=expiry_risks,
+        stockout_risks=stockout_risks,
+        dashboard=dashboard,
+        forecast_days=SNAPSHOT_FORECAST_DAYS,
+        forecast_summary=forecast_summary,
+        anomaly_days=SNAPSHOT_ANOMALY_DAYS,
+        anomalies=anomalies,
+        state=state
+    )
+
+
+scheduler = SnapshotScheduler(
+    build_fn=build_snapshot,
+    version_fn=lambda: data_store.version,
+    interval_seconds=SNAPSHOT_REFRESH_SECONDS
+)
+
+# Alert changes pushed to /api/alerts/stream subscribers, computed once per snapshot
+alert_stream = AlertStream()
+scheduler.add_listener(
+    lambda snapshot: alert_stream.publish(snapshot.data_version, snapshot_alerts(snapshot))
+)
+
+def build_incremental_snapshot(previous: RiskSnapshot, medicine_ids: List[int],
+                               state: DataState) -> RiskSnapshot:
+    """
+    Recompute risks for the given medicines only and carry everything else over
+    
+    Results are ordered exactly as a full rebuild would order them (expiry risks
+    by score then inventory position, stockout risks by days then medicine id).
+    """
+    started = time.time()
+    engine = state.engine
+    reference_date = previous.reference_date
+    changed = set(medicine_ids)
+    
+    expiry_risks = [r for r in previous.expiry_risks if r.medicine_id not in changed]
+    expiry_risks += engine.calculate_expiry_risks(reference_date, medicine_ids=changed)
+    inventory = engine.inventory_df
+    position = {
+        key: i for i, key in enumerate(zip(inventory['medicine_id'].tolist(), inventory['batch_no'].tolist()))
+    }
+    expiry_risks.sort(key=lambda r: (-r.risk_score, position[(r.medicine_id, r.batch_no)]))
+    
+    stockout_risks = [r for r in previous.stockout_risks if r.medicine_id not in changed]
+    stockout_risks += engine.calculate_stockout_risks(reference_date, medicine_ids=changed)
+    stockout_risks.sort(key=lambda r: (r.days_until_stockout, r.medicine_id))
+    
+    dashboard = engine.get_dashboard_summary(
+        reference_date, expiry_risks=expiry_risks, stockout_risks=stockout_risks
+    )
+    
+    # Forecasts and anomalies only depend on consumption history
+    return RiskSnapshot(
+        data_version=state.version,
+        reference_date=reference_date,
+        computed_at=time.time(),
+        compute_seconds=round(time.time() - started, 3),
+        expiry_risks=expiry_risks,
+        stockout_risks=stockout_risks,
+        dashboard=dashboard,
+        forecast_days=previous.forecast_days,
+        forecast_summary=previous.forecast_summary,
+        anomaly_days=previous.anomaly_days,
+        anomalies=previous.anomalies,
+        state=state
+    )
+
+
+# Set by /api/batch so every sub-request reads the same snapshot
+pinned_snapshot: ContextVar[Optional[RiskSnapshot]] = ContextVar("pinned_snapshot", default=None)
+
+
+def get_state() -> DataState:
+    """Get the current engines (capture once per request and use throughout)"""
+    state = data_store.current
+    if state is None:
+        if startup_loader.loading:
+            raise HTTPException(
+                status_code=503,
+                detail="Data is still loading",
+                headers={"Retry-After": str(STARTUP_RETRY_AFTER_SECONDS)}
+            )
+        raise HTTPException(status_code=500, detail="Data not loaded")
+    return state
+
+
+def get_advanced_engine() -> AdvancedPredictor:
+    state = get_state()
+    if state.advanced_engine is None:
+        raise HTTPException(status_code=500, detail="Advanced engine not loaded")
+    return state.advanced_engine
+
+
+def get_snapshot(response: Optional[Response] = None) -> RiskSnapshot:
+    """Get the latest risk snapshot and mark the response with its age"""
+    get_state()
+    
+    snapshot = pinned_snapshot.get() or scheduler.get()
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Risk snapshot not available")
+    
+    if response is not None:
+        response.headers["X-Snapshot-Age"] = str(int(snapshot.age_seconds))
+        response.headers["X-Snapshot-Computed-At"] = datetime.fromtimestamp(snapshot.computed_at).isoformat()
+        response.headers["X-Snapshot-Stale"] = "true" if scheduler.is_stale(snapshot) else "false"
+    return snapshot
+
+
+# ============================================================================
+# ADMISSION CONTROL (per endpoint class concurrency and queue limits)
+# ============================================================================
+# Analytics that scan the consumption log or build whole tables; they run in
+# the thread pool, at most MEDPREDICT_HEAVY_CONCURRENCY at a time per worker.
+# (A slot is held until the response headers are ready, so streamed exports,
+# which produce their rows afterwards, are not listed.)
+HEAVY_ROUTES = {
+    "/api/forecast/summary", "/api/forecast/{medicine_id}", "/api/forecast/batch",
+    "/api/anomalies", "/api/trends/{medicine_id}", "/api/inventory",
+}
+
+# Probes, metrics and admin tools are always served; batches and event streams
+# do no work of their own (batch sub-requests are admitted one by one)
+UNLIMITED_ROUTES = {"/api/health", "/api/ready", "/metrics", "/api/batch", "/api/alerts/stream"}
+
+admission_classes = {
+    "heavy": AdmissionClass(
+        "heavy",
+        concurrency=int(os.environ.get("MEDPREDICT_HEAVY_CONCURRENCY", "2")),
+        max_queue=int(os.environ.get("MEDPREDICT_HEAVY_QUEUE", "8")),
+        max_wait_seconds=float(os.environ.get("MEDPREDICT_HEAVY_MAX_WAIT_SECONDS", "10")),
+    ),
+    "light": AdmissionClass(
+        "light",
+        concurrency=int(os.environ.get("MEDPREDICT_LIGHT_CONCURRENCY", "32")),
+        max_queue=int(os.environ.get("MEDPREDICT_LIGHT_QUEUE", "256")),
+        max_wait_seconds=float(os.environ.get("MEDPREDICT_LIGHT_MAX_WAIT_SECONDS", "5")),
+        initial_service_seconds=0.01,
+    ),
+}
+
+
+def admission_class(request: Request) -> Optional[AdmissionClass]:
+    """The admission class of a request (None = not limited)"""
+    path = route_template(request)
+    if path in UNLIMITED_ROUTES or path.startswith("/api/admin/") or path == "unmatched":
+        return None
+    return admission_classes["heavy" if path in HEAVY_ROUTES else "light"]
+
+
+# Registered before conditional_get, so it runs inside it: 304s and cached
+# responses are answered without taking a slot
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Limit concurrent requests per endpoint class, shedding with 503 when the queue is full"""
+    admission = admission_class(request)
+    if admission is None:
+        return await call_next(request)
+    try:
+        async with admission.slot() as waited:
+            admission_wait.observe((admission.name,), waited)
+            return await call_next(request)
+    except Overloaded as e:
+        admission_rejections.inc((e.admission_class, e.reason))
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is busy, please retry", "reason": e.reason},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+# ============================================================================
+# CONDITIONAL GET (ETag / If-None-Match)
+# ============================================================================
+# Liveness / readiness probes, event streams and admin tools are never cached
+ETAG_EXCLUDED_PATHS = {"/api/health", "/api/ready", "/api/alerts/stream"}
+ETAG_EXCLUDED_PREFIXES = ("/api/admin/",)
+
+
+def etag_basis() -> tuple:
+    """Identity of the data a GET response is built from"""
+    snapshot = scheduler.snapshot
+    snapshot_key = (
+        (snapshot.data_version, snapshot.reference_date.date().isoformat())
+        if snapshot is not None else None
+    )
+    return (data_store.version, datetime.now().date().isoformat(), snapshot_key)
+
+
+# ============================================================================
+# ENCODED RESPONSE CACHE (polled endpoints)
+# ============================================================================
+# Endpoints the dashboard polls; their final bytes are kept per ETag
+RESPONSE_CACHE_PATHS = {
+    "/api/dashboard/summary", "/api/expiry-risks", "/api/stockout-risks", "/api/alerts",
+    "/api/categories", "/api/recommendations", "/api/forecast/summary", "/api/anomalies",
+}
+
+# Memory for cached bodies and their gzip/br variants (0 = off)
+RESPONSE_CACHE_MB = float(os.environ.get("MEDPREDICT_RESPONSE_CACHE_MB", "32"))
+
+response_cache = ResponseCache("responses", int(RESPONSE_CACHE_MB * 1024 * 1024))
+
+# Recomputed on every hit rather than replayed from the cached response
+_SNAPSHOT_HEADERS = ("x-snapshot-age", "x-snapshot-computed-at", "x-snapshot-stale")
+
+
+def uses_response_cache(request: Request) -> bool:
+    """Whether a GET may be answered from (and stored in) the response cache"""
+    if not response_cache.enabled or request.url.path not in RESPONSE_CACHE_PATHS:
+        return False
+    if wants_profile(request):
+        return False
+    # Batch sub-requests read a pinned snapshot; only share entries while it is the latest
+    pinned = pinned_snapshot.get()
+    return pinned is None or pinned is scheduler.snapshot
+
+
+def cached_response(entry: CachedResponse, etag: str, request: Request) -> Response:
+    """Write a cached entry in the best encoding the client accepts"""
+    encoding, body = entry.encoded(request.headers.get("accept-encoding"))
+    headers = {k: v for k, v in entry.headers.items() if k not in _SNAPSHOT_HEADERS}
+    if any(k in entry.headers for k in _SNAPSHOT_HEADERS):
+        snapshot_headers = Response()
+        get_snapshot(snapshot_headers)
+        headers.update((k, v) for k, v in snapshot_headers.headers.items() if k in _SNAPSHOT_HEADERS)
+    headers["Vary"] = "Accept-Encoding"
+    headers["Cache-Control"] = "no-cache"
+    if encoding is None:
+        headers["ETag"] = etag
+    else:
+        # A compressed body is another representation of the same data
+        headers["ETag"] = f"W/{etag}"
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=entry.status_code, headers=headers)
+
+
+async def store_response(response, etag: str) -> CachedResponse:
+    """Read a response's body and keep it, with its compressed variants, under its ETag"""
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    with span("compress"):
+        entry = await run_in_threadpool(CachedResponse.build, response.status_code, headers, body)
+    response_cache.set(etag, entry)
+    return entry
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """
+    Answer If-None-Match with 304 before the endpoint computes anything
+    
+    Polled endpoints (RESPONSE_CACHE_PATHS) are then answered from the encoded
+    response cache when the same ETag was served before.
+    """
+    path = request.url.path
+    if (request.method != "GET" or not path.startswith("/api/") or path in ETAG_EXCLUDED_PATHS
+            or path.startswith(ETAG_EXCLUDED_PREFIXES)):
+        return await call_next(request)
+    
+    basis = etag_basis()
+    etag = make_etag(path, request.query_params.multi_items(), basis)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    cacheable = uses_response_cache(request)
+    if cacheable:
+        entry = response_cache.get(etag)
+        if entry is not None:
+            return cached_response(entry, etag, request)
+    
+    response = await call_next(request)
+    
+    # Only tag (and keep) successful responses whose data did not change while being built
+    if response.status_code == 200 and etag_basis() == basis:
+        if cacheable:
+            return cached_response(await store_response(response, etag), etag, request)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# ============================================================================
+# METRICS (Prometheus /metrics)
+# ============================================================================
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "medpredict_http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+http_latency = metrics.histogram(
+    "medpredict_http_request_duration_seconds",
+    "Time until the response headers are ready, by route template",
+    ["method", "route"]
+)
+engine_latency = metrics.histogram(
+    "medpredict_engine_call_duration_seconds", "Duration of timed engine calls",
+    ["function"]
+)
+add_timing_observer(lambda name, seconds: engine_latency.observe((name,), seconds))
+admission_wait = metrics.histogram(
+    "medpredict_admission_queue_wait_seconds",
+    "Time requests waited for a slot of their endpoint class", ["class"]
+)
+admission_rejections = metrics.counter(
+    "medpredict_admission_rejected_total",
+    "Requests shed with 503 by endpoint class and reason (queue_full, timeout)", ["class", "reason"]
+)
+
+# (state version, memory_report(...)) of the last measurement
+_dataset_footprint: tuple = (None, [])
+
+
+def dataset_footprint(state: DataState) -> list:
+    """Memory report of the frames behind a state, measured once per version"""
+    global _dataset_footprint
+    version, footprint = _dataset_footprint
+    if version == state.version:
+        return footprint
+    
+    frames = [("files", name, frame) for name, frame in state.frames.items()]
+    frames += [
+        ("engine", "consumption", state.engine.consumption_df),
+        ("engine", "inventory", state.engine.inventory_df),
+        ("engine", "medicines", state.engine.medicines_df),
+    ]
+    if state.advanced_engine is not None:
+        frames += [
+            ("advanced_engine", "consumption", state.advanced_engine.consumption_df),
+            ("advanced_engine", "medicines", state.advanced_engine.medicines_df),
+        ]
+    footprint = memory_report(frames)
+    _dataset_footprint = (state.version, footprint)
+    return footprint
+
+
+def collect_state_metrics():
+    """Gauges read at scrape time: caches, data state and snapshot"""
+    caches = SimpleCache.instances + [response_cache]
+    yield ("medpredict_cache_hits_total", "counter", "SimpleCache lookups served from the cache",
+           [({"cache": c.name}, c.hits) for c in caches])
+    yield ("medpredict_cache_misses_total", "counter", "SimpleCache lookups that found nothing",
+           [({"cache": c.name}, c.misses) for c in caches])
+    yield ("medpredict_cache_evictions_total", "counter", "SimpleCache entries dropped by expiry or clear()",
+           [({"cache": c.name}, c.evictions) for c in caches])
+    yield ("medpredict_cache_entries", "gauge", "Entries currently held by each SimpleCache",
+           [({"cache": c.name}, len(c.cache)) for c in caches])
+    
+    state = data_store.current
+    yield ("medpredict_data_version", "gauge", "Version of the data state being served",
+           [({}, data_store.version)])
+    if state is not None:
+        footprint = dataset_footprint(state)
+        yield ("medpredict_dataset_rows", "gauge", "Rows per loaded dataset",
+               [({"owner": f["owner"], "dataset": f["dataset"]}, f["rows"]) for f in footprint])
+        yield ("medpredict_dataset_memory_bytes", "gauge", "Memory used by each loaded dataset frame",
+               [({"owner": f["owner"], "dataset": f["dataset"]}, f["bytes"]) for f in footprint])
+        yield ("medpredict_dataset_shared_bytes", "gauge",
+               "Part of each frame's memory in memory-mapped columns shared between workers",
+               [({"owner": f["owner"], "dataset": f["dataset"]}, f["shared_bytes"]) for f in footprint])
+    
+    yield ("medpredict_admission_active", "gauge", "Requests holding a slot, by endpoint class",
+           [({"class": c.name}, c.active) for c in admission_classes.values()])
+    yield ("medpredict_admission_queued", "gauge", "Requests waiting for a slot, by endpoint class",
+           [({"class": c.name}, c.queued) for c in admission_classes.values()])
+    
+    yield ("medpredict_alert_stream_subscribers", "gauge", "Open /api/alerts/stream connections",
+           [({}, alert_stream.subscriber_count)])
+    yield ("medpredict_alert_stream_events_total", "counter", "Alert change events published",
+           [({}, alert_stream.events_published)])
+    
+    snapshot = scheduler.snapshot
+    if snapshot is not None:
+        yield ("medpredict_snapshot_age_seconds", "gauge", "Age of the served risk snapshot",
+               [({}, round(snapshot.age_seconds, 3))])
+        yield ("medpredict_snapshot_compute_seconds", "gauge", "Time taken to build the served risk snapshot",
+               [({}, round(snapshot.compute_seconds, 6))])
+
+
+metrics.add_collector(collect_state_metrics)
+
+
+def route_template(request: Request) -> str:
+    """Path template of the route serving a request ("unmatched" if none)"""
+    route = request.scope.get("route")
+    if route is None:
+        # Answered before routing (e.g. 304 from conditional_get)
+        for candidate in app.router.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them, labelled by route template to bound cardinality"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route_path = route_template(request)
+        http_requests.inc((request.method, route_path, str(status)))
+        http_latency.observe((request.method, route_path), time.perf_counter() - start)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# ============================================================================
+# PROFILING (admin only)
+# ============================================================================
+# Admin endpoints and request profiling are disabled unless a token is set
+ADMIN_TOKEN = os.environ.get("MEDPREDICT_ADMIN_TOKEN", "")
+
+# Continuous sampling profiler rate at startup (0 = off)
+SAMPLING_PROFILER_HZ = float(os.environ.get("MEDPREDICT_SAMPLING_PROFILER_HZ", "0"))
+
+request_profiler = RequestProfiler()
+sampling_profiler = SamplingProfiler(hz=SAMPLING_PROFILER_HZ or 10.0)
+
+
+def require_admin(request: Request):
+    """Raise 403 unless the request carries the admin token"""
+    check_admin_token(ADMIN_TOKEN, request.headers.get("x-admin-token"))
+
+
+def wants_profile(request: Request) -> bool:
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    return flag is not None and flag.lower() in ("1", "true", "yes")
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Run a request under cProfile when asked to by an admin
+    
+    The profile covers everything the event loop thread does until the
+    response headers are ready. Endpoints running in the thread pool (the
+    heavy analytics ones) are profiled in their worker thread as well, see
+    ProfiledRoute. The stored profile's id is returned in X-Profile-Id.
+    """
+    if not wants_profile(request):
+        return await call_next(request)
+    try:
+        require_admin(request)
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+    
+    profile = request_profiler.start()
+    if profile is None:
+        return JSONResponse(status_code=409, content={"detail": "Another request is being profiled"})
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        profile_id = request_profiler.finish(
+            profile, request.method, request.url.path, request.url.query,
+            status, time.perf_counter() - start
+        )
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    """Recently profiled requests, newest first"""
+    require_admin(request)
+    return {"profiles": request_profiler.list()}
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(
+    request: Request,
+    profile_id: str,
+    top: int = Query(25, ge=1, le=500),
+    export_format: str = Query("json", alias="format", pattern="^(json|pstats)$")
+):
+    """
+    Hottest functions of a profiled request
+    
+    format=pstats returns the raw profile for pstats / snakeviz.
+    """
+    require_admin(request)
+    if export_format == "pstats":
+        dump = request_profiler.pstats_dump(profile_id)
+        if dump is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return Response(
+            content=dump,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'}
+        )
+    
+    summary = request_profiler.summary(profile_id, top=top)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+
+@app.get("/api/admin/memory")
+async def get_memory_report(request: Request):
+    """
+    Memory of each loaded frame, column by column
+    
+    Frames read from the files and the engines' frames are listed separately;
+    columns mapped from the shared column store are marked "shared" (their
+    pages are shared by all workers and by frames viewing the same column).
+    """
+    require_admin(request)
+    state = get_state()
+    storage = data_store.storage
+    return {
+        "data_version": state.version,
+        "frames": dataset_footprint(state),
+        "storage": {"path": str(storage.path), "rows": storage.row_counts()} if storage is not None else None,
+    }
+
+
+@app.get("/api/admin/profiler")
+async def get_sampling_profiler(request: Request):
+    """Status of the continuous sampling profiler"""
+    require_admin(request)
+    return sampling_profiler.status()
+
+
+@app.post("/api/admin/profiler/start")
+async def start_sampling_profiler(
+    request: Request,
+    hz: float = Query(10.0, gt=0, le=100),
+    reset: bool = False
+):
+    """Start (or re-rate) the continuous sampling profiler"""
+    require_admin(request)
+    if reset:
+        sampling_profiler.reset()
+    sampling_profiler.hz = hz
+    sampling_profiler.start()
+    return sampling_profiler.status()
+
+
+@app.post("/api/admin/profiler/stop")
+async def stop_sampling_profiler(request: Request):
+    """Stop the continuous sampling profiler, keeping its samples"""
+    require_admin(request)
+    await run_in_threadpool(sampling_profiler.stop)
+    return sampling_profiler.status()
+
+
+@app.get("/api/admin/profiler/flamegraph")
+async def get_flamegraph(request: Request):
+    """Aggregated samples as folded stacks (flamegraph.pl / speedscope input)"""
+    require_admin(request)
+    return PlainTextResponse(sampling_profiler.folded_stacks())
+
+
+# ============================================================================
+# TRACING (Server-Timing header, optional span log)
+# ============================================================================
+# JSON-lines file receiving every request's spans (unset = off)
+SPAN_LOG_PATH = os.environ.get("MEDPREDICT_SPAN_LOG", "")
+
+span_log = SpanLog(SPAN_LOG_PATH) if SPAN_LOG_PATH else None
+
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Collect the request's timing spans and report them in Server-Timing"""
+    if current_trace() is not None:
+        # In-process sub-request (POST /api/batch): its spans join the outer trace
+        return await call_next(request)
+    with start_trace(request_trace_name(request)) as trace:
+        response = await call_next(request)
+        finish_request_trace(trace, response, span_log, request)
+    return response
+
+
+# CORS middleware (registered last so it also wraps early 304 responses)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=[
+        "ETag", "X-Snapshot-Age", "X-Snapshot-Computed-At", "X-Snapshot-Stale",
+        "X-Next-Cursor", "X-Total-Count", "X-Profile-Id", "Server-Timing"
+    ],
+)
 
 
 # Pydantic models for API responses
@@ -126,27 +825,284 @@ class HealthResponse(BaseModel):
     data_loaded: bool
 
 
-def load_data():
-    """Load data and initialize prediction engines"""
-    global engine, advanced_engine
+# ============================================================================
+# LIST VIEWS & SORTED INDEXES (format=, sort_by=, cursor=)
+# ============================================================================
+RISK_ORDER = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+# Largest page a list endpoint returns (`limit` above it is rejected with 422)
+MAX_PAGE_SIZE = 1000
+
+EXPIRY_ORDERINGS = {
+    "risk": Ordering("risk_score", descending=True),
+    "expiry": Ordering("days_to_expiry"),
+    "quantity": Ordering("current_quantity", descending=True),
+    "name": Ordering("medicine_name"),
+}
+
+STOCKOUT_ORDERINGS = {
+    "risk": Ordering("days_until_stockout"),
+    "quantity": Ordering("current_stock"),
+    "name": Ordering("medicine_name"),
+}
+
+MEDICINE_ORDERINGS = {
+    "name": Ordering("medicine_name"),
+    "stock": Ordering("quantity"),
+    "consumption": Ordering("avg_daily", descending=True),
+    "risk": Ordering("risk_order"),
+}
+
+INVENTORY_ORDERINGS = {
+    "expiry": Ordering("days_to_expiry"),
+    "risk": Ordering("risk_order"),
+    "quantity": Ordering("quantity", descending=True),
+    "name": Ordering("medicine_name"),
+}
+
+
+def _format_date(value) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+def expiry_risk_columns(snapshot: RiskSnapshot) -> Columns:
+    """Expiry risks as one array per ExpiryRiskResponse field (built once per snapshot)"""
+    return snapshot.get_derived("expiry_columns", lambda snap: records_to_columns(
+        snap.expiry_risks,
+        list(ExpiryRiskResponse.model_fields),
+        converters={"expiry_date": _format_date}
+    ))
+
+
+def stockout_risk_columns(snapshot: RiskSnapshot) -> Columns:
+    """Stockout risks as one array per StockoutRiskResponse field (built once per snapshot)"""
+    return snapshot.get_derived("stockout_columns", lambda snap: records_to_columns(
+        snap.stockout_risks,
+        list(StockoutRiskResponse.model_fields)
+    ))
+
+
+def expiry_risk_index(snapshot: RiskSnapshot) -> SortedIndex:
+    return snapshot.get_derived("expiry_index", lambda snap: SortedIndex(
+        expiry_risk_columns(snap), ["medicine_id", "batch_no"], EXPIRY_ORDERINGS
+    ))
+
+
+def stockout_risk_index(snapshot: RiskSnapshot) -> SortedIndex:
+    return snapshot.get_derived("stockout_index", lambda snap: SortedIndex(
+        stockout_risk_columns(snap), ["medicine_id"], STOCKOUT_ORDERINGS
+    ))
+
+
+def _build_medicine_table(snapshot: RiskSnapshot) -> pd.DataFrame:
+    """Per-medicine stock, consumption and stockout risk level"""
+    engine = snapshot.state.engine
+    # Aggregate stock by medicine
+    stock_by_medicine = engine.inventory_df.groupby('medicine_id').agg({
+        'quantity': 'sum',
+        'medicine_name': 'first',
+        'category': 'first',
+        'unit_cost_inr': 'first'
+    }).reset_index()
     
+    # Get consumption stats
+    result = stock_by_medicine.merge(
+        engine.daily_consumption[['medicine_id', 'avg_daily', 'avg_weekly']],
+        on='medicine_id',
+        how='left'
+    )
+    
+    # Calculate days of stock
+    result['days_of_stock'] = (result['quantity'] / result['avg_daily']).replace([float('inf'), -float('inf')], 999).fillna(999).round(0)
+    result['stock_value'] = result['quantity'] * result['unit_cost_inr']
+    
+    # Get stockout risk levels
+    stockout_risks = {r.medicine_id: r.risk_level for r in snapshot.stockout_risks}
+    result['risk_level'] = result['medicine_id'].map(stockout_risks).fillna('LOW')
+    return result
+
+
+def medicine_table(snapshot: RiskSnapshot) -> pd.DataFrame:
+    return snapshot.get_derived("medicine_table", _build_medicine_table)
+
+
+def medicine_index(snapshot: RiskSnapshot) -> SortedIndex:
+    def build(snap: RiskSnapshot) -> SortedIndex:
+        table = medicine_table(snap)
+        columns = frame_to_columns(table)
+        columns["risk_order"] = table['risk_level'].map(RISK_ORDER).to_numpy()
+        return SortedIndex(columns, ["medicine_id"], MEDICINE_ORDERINGS)
+    return snapshot.get_derived("medicine_index", build)
+
+
+def search_ranks(snapshot: RiskSnapshot, search: str) -> np.ndarray:
+    """Position of each medicine_table row in the search results (-1 if it does not match)"""
+    matched = snapshot.state.search_index.matching_ids(search)
+    ranks = pd.Series(np.arange(len(matched)), index=matched, dtype=np.int64)
+    return medicine_table(snapshot)['medicine_id'].map(ranks).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _build_inventory_table(snapshot: RiskSnapshot) -> pd.DataFrame:
+    """Inventory batches with days to expiry and expiry risk level"""
+    inventory = snapshot.state.engine.inventory_df.copy()
+    inventory['days_to_expiry'] = (inventory['expiry_date'] - snapshot.reference_date).dt.days
+    
+    # Add risk levels from expiry risks (keyed on medicine and batch)
+    risk_columns = expiry_risk_columns(snapshot)
+    risk_levels = pd.DataFrame({
+        'medicine_id': risk_columns['medicine_id'],
+        'batch_no': risk_columns['batch_no'],
+        'risk_level': risk_columns['risk_level']
+    }).drop_duplicates(['medicine_id', 'batch_no'], keep='last')
+    inventory = inventory.merge(risk_levels, on=['medicine_id', 'batch_no'], how='left')
+    inventory['risk_level'] = inventory['risk_level'].fillna('LOW')
+    
+    # Format dates for JSON
+    inventory['expiry_date'] = inventory['expiry_date'].dt.strftime('%Y-%m-%d')
+    return inventory.reset_index(drop=True)
+
+
+def inventory_table(snapshot: RiskSnapshot) -> pd.DataFrame:
+    return snapshot.get_derived("inventory_table", _build_inventory_table)
+
+
+def inventory_index(snapshot: RiskSnapshot) -> SortedIndex:
+    def build(snap: RiskSnapshot) -> SortedIndex:
+        table = inventory_table(snap)
+        columns = frame_to_columns(table)
+        columns["risk_order"] = table['risk_level'].map(RISK_ORDER).to_numpy()
+        return SortedIndex(columns, ["medicine_id", "batch_no"], INVENTORY_ORDERINGS)
+    return snapshot.get_derived("inventory_index", build)
+
+
+NO_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _group_positions(medicine_ids: pd.Series) -> Dict[int, np.ndarray]:
+    """Medicine id -> positions of its rows (in row order)"""
+    return {int(k): v for k, v in medicine_ids.groupby(medicine_ids, sort=False).indices.items()}
+
+
+def _build_medicine_rows(snapshot: RiskSnapshot) -> Dict[str, Dict[int, np.ndarray]]:
+    """Row positions of each medicine in the engine tables (consumption newest first)"""
+    engine = snapshot.state.engine
+    consumption = engine.consumption_df
+    newest_first = np.argsort(-consumption['date'].to_numpy().astype('int64'), kind='stable')
+    by_date = consumption['medicine_id'].iloc[newest_first].reset_index(drop=True)
+    return {
+        "medicines": _group_positions(engine.medicines_df['medicine_id']),
+        "inventory": _group_positions(engine.inventory_df['medicine_id']),
+        "consumption_stats": _group_positions(engine.daily_consumption['medicine_id']),
+        "consumption": {k: newest_first[v] for k, v in _group_positions(by_date).items()},
+    }
+
+
+def medicine_rows(snapshot: RiskSnapshot) -> Dict[str, Dict[int, np.ndarray]]:
+    return snapshot.get_derived("medicine_rows", _build_medicine_rows)
+
+
+def _build_risks_by_medicine(snapshot: RiskSnapshot) -> Dict[str, Dict[int, Any]]:
+    """Expiry risks (list) and stockout risk of each medicine"""
+    expiry: Dict[int, List[ExpiryRisk]] = {}
+    for risk in snapshot.expiry_risks:
+        expiry.setdefault(risk.medicine_id, []).append(risk)
+    return {
+        "expiry": expiry,
+        "stockout": {risk.medicine_id: risk for risk in reversed(snapshot.stockout_risks)},
+    }
+
+
+def risks_by_medicine(snapshot: RiskSnapshot) -> Dict[str, Dict[int, Any]]:
+    return snapshot.get_derived("risks_by_medicine", _build_risks_by_medicine)
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: int):
+    """Expose the next-page cursor and the total match count"""
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
+def public_columns(index: SortedIndex, rows: np.ndarray) -> Columns:
+    """Selected rows of an index, without its internal sort-only columns"""
+    return take_columns(
+        {name: values for name, values in index.columns.items() if name != "risk_order"},
+        rows
+    )
+
+
+@timed("load_data")
+def load_data() -> Optional[Dict]:
+    """
+    Build new prediction engines from the data files and swap them in
+    
+    Unchanged files are not parsed again. Requests keep being served from the
+    previous engines until the new ones are complete.
+    
+    Returns:
+        Reload details, or None if loading failed
+    """
     try:
-        consumption_df = pd.read_csv(DATA_DIR / "consumption_log.csv")
-        inventory_df = pd.read_csv(DATA_DIR / "current_inventory.csv")
-        medicines_df = pd.read_csv(DATA_DIR / "medicines_master.csv")
-        
-        engine = MedPredictEngine(consumption_df, inventory_df, medicines_df)
-        advanced_engine = AdvancedPredictor(consumption_df, medicines_df)
-        return True
+        return data_store.reload()
     except Exception as e:
         print(f"Error loading data: {e}")
-        return False
+        return None
+
+
+def on_data_files_changed(result: Dict):
+    """Update caches and the risk snapshot after the watcher applied file changes"""
+    print(f"Applied data file changes: {result}")
+    medicines_cache.clear()
+    
+    # An inventory-only delta can patch the snapshot; consumption changes move
+    # every medicine's statistics, so those get a full background refresh
+    snapshot = scheduler.snapshot
+    state = data_store.current
+    if (result.get("mode") == "delta" and not result["appended_rows"]
+            and snapshot is not None and state is not None
+            and snapshot.data_version == result["previous_version"]
+            and state.version == result["version"]
+            and snapshot.reference_date.date() == datetime.now().date()):
+        scheduler.install(build_incremental_snapshot(snapshot, result["inventory_medicines"], state))
+    else:
+        scheduler.request_refresh()
+
+
+watcher = DataDirWatcher(
+    data_store,
+    on_change=on_data_files_changed,
+    poll_seconds=WATCH_POLL_SECONDS,
+    debounce_seconds=WATCH_DEBOUNCE_SECONDS
+)
+
+
+def on_startup_loaded(trace):
+    print(f"Startup loading finished: {startup_loader.phase} in {trace.elapsed():.2f}s")
+    if span_log is not None:
+        span_log.write(trace)
+
+
+# Data and the first snapshot load in the background; /api/ready reports progress
+startup_loader = StartupLoader(load_data, scheduler.refresh, on_complete=on_startup_loaded)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Load data on startup"""
-    load_data()
+    """Start loading data in the background and start precomputing risk snapshots"""
+    startup_loader.start()
+    scheduler.start()
+    if WATCH_DATA_DIR:
+        watcher.start()
+    if SAMPLING_PROFILER_HZ > 0:
+        sampling_profiler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background scheduler, data watcher and sampling profiler"""
+    sampling_profiler.stop()
+    watcher.stop()
+    scheduler.stop()
 
 
 @app.get("/", response_model=HealthResponse)
@@ -155,7 +1111,7 @@ async def root():
     return HealthResponse(
         status="healthy",
         message="MedPredict AI is running",
-        data_loaded=engine is not None
+        data_loaded=data_store.current is not None
     )
 
 
@@ -165,24 +1121,26 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         message="MedPredict AI API is operational",
-        data_loaded=engine is not None
+        data_loaded=data_store.current is not None
     )
 
 
+@app.get("/api/ready")
+async def readiness_check(response: Response):
+    """Readiness probe: 503 with loading progress until data and the first snapshot are ready"""
+    status = startup_loader.status()
+    if not status["ready"]:
+        response.status_code = 503
+        response.headers["Retry-After"] = str(STARTUP_RETRY_AFTER_SECONDS)
+    return status
+
+
 @app.get("/api/dashboard/summary", response_model=DashboardSummary)
-async def get_dashboard_summary():
+async def get_dashboard_summary(response: Response):
     """Get dashboard summary with key metrics"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    summary = get_snapshot(response).dashboard
     
-    # Check cache first
-    cached = summary_cache.get("dashboard_summary")
-    if cached:
-        return cached
-    
-    summary = engine.get_dashboard_summary()
-    
-    result = DashboardSummary(
+    return DashboardSummary(
         total_medicines=summary["total_medicines"],
         total_batches=summary["total_batches"],
         total_inventory_value=summary["total_inventory_value"],
@@ -193,117 +1151,117 @@ async def get_dashboard_summary():
         critical_stockout_count=summary["stockout_risk"]["critical_count"],
         high_stockout_count=summary["stockout_risk"]["high_count"]
     )
-    
-    summary_cache.set("dashboard_summary", result)
-    return result
 
 
 @app.get("/api/expiry-risks", response_model=List[ExpiryRiskResponse])
 async def get_expiry_risks(
+    response: Response,
     risk_level: Optional[str] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    sort_by: str = "risk",
+    cursor: Optional[str] = None,
+    response_format: str = Query("json", alias="format")
 ):
     """
     Get expiry risk assessments for all batches
     
     Args:
         risk_level: Filter by risk level (CRITICAL, HIGH, MEDIUM, LOW)
-        limit: Maximum number of results
+        limit: Maximum number of results (page size)
+        sort_by: Sort order (risk, expiry, quantity, name)
+        cursor: X-Next-Cursor value from the previous page
+        format: json (default), columnar, msgpack or arrow
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    fmt = validate_format(response_format)
+    snapshot = get_snapshot(response)
+    index = expiry_risk_index(snapshot)
     
-    # Check cache for base risks (unfiltered)
-    cache_key = "all_expiry_risks"
-    risks = expiry_cache.get(cache_key)
-    if risks is None:
-        risks = engine.calculate_expiry_risks()
-        expiry_cache.set(cache_key, risks)
-    
-    # Filter by risk level if specified
-    if risk_level:
-        risks = [r for r in risks if r.risk_level == risk_level.upper()]
-    
-    # Limit results
-    risks = risks[:limit]
-    
-    return [
-        ExpiryRiskResponse(
-            medicine_id=r.medicine_id,
-            medicine_name=r.medicine_name,
-            batch_no=r.batch_no,
-            current_quantity=r.current_quantity,
-            expiry_date=r.expiry_date.strftime("%Y-%m-%d"),
-            days_to_expiry=r.days_to_expiry,
-            predicted_consumption=r.predicted_consumption,
-            quantity_at_risk=r.quantity_at_risk,
-            risk_score=r.risk_score,
-            risk_level=r.risk_level,
-            recommendation=r.recommendation,
-            potential_loss=r.potential_loss
-        )
-        for r in risks
-    ]
+    rows, next_cursor, total = index.page(
+        sort_by, limit, cursor,
+        filters={"risk_level": risk_level.upper() if risk_level else None}
+    )
+    set_page_headers(response, next_cursor, total)
+    
+    if fmt != "json":
+        return columnar_response(public_columns(index, rows), fmt, headers=dict(response.headers))
+    
+    risks = snapshot.expiry_risks
+    with span("response_models"):
+        return [
+            ExpiryRiskResponse(
+                medicine_id=r.medicine_id,
+                medicine_name=r.medicine_name,
+                batch_no=r.batch_no,
+                current_quantity=r.current_quantity,
+                expiry_date=r.expiry_date.strftime("%Y-%m-%d"),
+                days_to_expiry=r.days_to_expiry,
+                predicted_consumption=r.predicted_consumption,
+                quantity_at_risk=r.quantity_at_risk,
+                risk_score=r.risk_score,
+                risk_level=r.risk_level,
+                recommendation=r.recommendation,
+                potential_loss=r.potential_loss
+            )
+            for r in (risks[i] for i in rows)
+        ]
 
 
 @app.get("/api/stockout-risks", response_model=List[StockoutRiskResponse])
 async def get_stockout_risks(
+    response: Response,
     risk_level: Optional[str] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    sort_by: str = "risk",
+    cursor: Optional[str] = None,
+    response_format: str = Query("json", alias="format")
 ):
     """
     Get stockout risk assessments for all medicines
     
     Args:
         risk_level: Filter by risk level (CRITICAL, HIGH, MEDIUM, LOW)
-        limit: Maximum number of results
+        limit: Maximum number of results (page size)
+        sort_by: Sort order (risk, quantity, name)
+        cursor: X-Next-Cursor value from the previous page
+        format: json (default), columnar, msgpack or arrow
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    fmt = validate_format(response_format)
+    snapshot = get_snapshot(response)
+    index = stockout_risk_index(snapshot)
     
-    # Check cache for base risks (unfiltered)
-    cache_key = "all_stockout_risks"
-    risks = stockout_cache.get(cache_key)
-    if risks is None:
-        risks = engine.calculate_stockout_risks()
-        stockout_cache.set(cache_key, risks)
-    
-    # Filter by risk level if specified
-    if risk_level:
-        risks = [r for r in risks if r.risk_level == risk_level.upper()]
-    
-    # Limit results
-    risks = risks[:limit]
-    
-    return [
-        StockoutRiskResponse(
-            medicine_id=r.medicine_id,
-            medicine_name=r.medicine_name,
-            current_stock=r.current_stock,
-            avg_daily_consumption=r.avg_daily_consumption,
-            predicted_weekly_consumption=r.predicted_weekly_consumption,
-            days_until_stockout=r.days_until_stockout,
-            risk_level=r.risk_level,
-            recommended_order=r.recommended_order,
-            recommendation=r.recommendation
-        )
-        for r in risks
-    ]
+    rows, next_cursor, total = index.page(
+        sort_by, limit, cursor,
+        filters={"risk_level": risk_level.upper() if risk_level else None}
+    )
+    set_page_headers(response, next_cursor, total)
+    
+    if fmt != "json":
+        return columnar_response(public_columns(index, rows), fmt, headers=dict(response.headers))
+    
+    risks = snapshot.stockout_risks
+    with span("response_models"):
+        return [
+            StockoutRiskResponse(
+                medicine_id=r.medicine_id,
+                medicine_name=r.medicine_name,
+                current_stock=r.current_stock,
+                avg_daily_consumption=r.avg_daily_consumption,
+                predicted_weekly_consumption=r.predicted_weekly_consumption,
+                days_until_stockout=r.days_until_stockout,
+                risk_level=r.risk_level,
+                recommended_order=r.recommended_order,
+                recommendation=r.recommendation
+            )
+            for r in (risks[i] for i in rows)
+        ]
 
 
-@app.get("/api/alerts")
-async def get_alerts():
-    """Get all active alerts (critical and high risk items)"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    expiry_risks = engine.calculate_expiry_risks()
-    stockout_risks = engine.calculate_stockout_risks()
-    
+def build_alerts(snapshot: RiskSnapshot) -> List[Dict[str, Any]]:
+    """Critical and high risk items of a snapshot, most severe first"""
     alerts = []
     
     # Expiry alerts
-    for r in expiry_risks:
+    for r in snapshot.expiry_risks:
         if r.risk_level in ["CRITICAL", "HIGH"]:
             alerts.append({
                 "type": "EXPIRY",
@@ -316,7 +1274,7 @@ async def get_alerts():
             })
     
     # Stockout alerts
-    for r in stockout_risks:
+    for r in snapshot.stockout_risks:
         if r.risk_level in ["CRITICAL", "HIGH"]:
             alerts.append({
                 "type": "STOCKOUT",
@@ -331,6 +1289,17 @@ async def get_alerts():
     # Sort by severity
     severity_order = {"CRITICAL": 0, "HIGH": 1}
     alerts.sort(key=lambda x: severity_order.get(x["severity"], 2))
+    return alerts
+
+
+def snapshot_alerts(snapshot: RiskSnapshot) -> List[Dict[str, Any]]:
+    return snapshot.get_derived("alerts", build_alerts)
+
+
+@app.get("/api/alerts")
+async def get_alerts(response: Response):
+    """Get all active alerts (critical and high risk items)"""
+    alerts = snapshot_alerts(get_snapshot(response))
     
     return {
         "total_alerts": len(alerts),
@@ -340,103 +1309,119 @@ async def get_alerts():
     }
 
 
+@app.get("/api/alerts/stream")
+async def stream_alerts(request: Request):
+    """
+    Server-sent events with alert changes
+    
+    The first event ("alerts") holds the whole list; "delta" events follow
+    whenever a new risk snapshot adds, changes or removes alerts.
+    """
+    get_state()
+    return StreamingResponse(
+        alert_stream.events(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/medicines")
 async def get_medicines(
+    response: Response,
     search: Optional[str] = None,
     category: Optional[str] = None,
     sort_by: Optional[str] = "name",
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    response_format: str = Query("json", alias="format")
 ):
     """
     Get list of all medicines with current stock levels
     
     Args:
-        search: Search term for medicine name
+        search: Medicine name search (word prefixes, substrings, typos)
         category: Filter by category
-        sort_by: Sort field (name, stock, consumption)
-        limit: Maximum results
+        sort_by: Sort field (name, stock, consumption, risk; relevance with search)
+        limit: Maximum results (page size)
+        cursor: X-Next-Cursor value from the previous page
+        format: json (default), columnar, msgpack or arrow
     """
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    fmt = validate_format(response_format)
+    snapshot = get_snapshot(response)
+    table = medicine_table(snapshot)
+    index = medicine_index(snapshot)
     
-    # Aggregate stock by medicine
-    stock_by_medicine = engine.inventory_df.groupby('medicine_id').agg({
-        'quantity': 'sum',
-        'medicine_name': 'first',
-        'category': 'first',
-        'unit_cost_inr': 'first'
-    }).reset_index()
+    sort_key = sort_by if sort_by in MEDICINE_ORDERINGS else "name"
+    filters = {"category": category or None}
     
-    # Get consumption stats
-    result = stock_by_medicine.merge(
-        engine.daily_consumption[['medicine_id', 'avg_daily', 'avg_weekly']],
-        on='medicine_id',
-        how='left'
-    )
+    perm = None
+    if search:
+        ranks = search_ranks(snapshot, search)
+        perm = index.permutation(sort_key, filters)
+        perm = perm[ranks[perm] >= 0]
+        if sort_by == "relevance":
+            perm = perm[np.argsort(ranks[perm], kind="stable")]
+            sort_key = "relevance"
     
-    # Calculate days of stock
-    result['days_of_stock'] = (result['quantity'] / result['avg_daily']).replace([float('inf'), -float('inf')], 999).fillna(999).round(0)
-    result['stock_value'] = result['quantity'] * result['unit_cost_inr']
+    rows, next_cursor, total = index.page(sort_key, limit, cursor, filters=filters, perm=perm)
+    set_page_headers(response, next_cursor, total)
     
-    # Get stockout risk levels
-    stockout_risks = {r.medicine_id: r.risk_level for r in engine.calculate_stockout_risks()}
-    result['risk_level'] = result['medicine_id'].map(stockout_risks).fillna('LOW')
+    if fmt != "json":
+        return columnar_response(public_columns(index, rows), fmt, headers=dict(response.headers))
     
-    # Apply filters
-    if search:
-        result = result[result['medicine_name'].str.contains(search, case=False, na=False)]
-    
-    if category:
-        result = result[result['category'] == category]
-    
-    # Apply sorting
-    if sort_by == "stock":
-        result = result.sort_values('quantity', ascending=True)
-    elif sort_by == "consumption":
-        result = result.sort_values('avg_daily', ascending=False)
-    elif sort_by == "risk":
-        risk_order = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
-        result['risk_order'] = result['risk_level'].map(risk_order)
-        result = result.sort_values('risk_order')
-    else:
-        result = result.sort_values('medicine_name')
+    return table.iloc[rows].to_dict(orient='records')
+
+
+@app.get("/api/medicines/search")
+async def search_medicines(
+    q: str,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Typeahead search over medicine names, best matches first
     
-    return result.head(limit).to_dict(orient='records')
+    Args:
+        q: Query (word prefixes, substrings; typos when nothing matches exactly)
+        limit: Maximum results
+    """
+    return get_state().search_index.search(q, limit)
 
 
 @app.get("/api/medicines/{medicine_id}")
-async def get_medicine_detail(medicine_id: int):
+async def get_medicine_detail(medicine_id: int, response: Response):
     """Get detailed information for a single medicine"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    snapshot = get_snapshot(response)
+    engine = snapshot.state.engine
+    
+    rows = medicine_rows(snapshot)
+    risks = risks_by_medicine(snapshot)
     
     # Get medicine info
-    medicine_info = engine.medicines_df[engine.medicines_df['medicine_id'] == medicine_id]
-    if medicine_info.empty:
+    medicine_info = rows["medicines"].get(medicine_id)
+    if medicine_info is None:
         raise HTTPException(status_code=404, detail="Medicine not found")
     
-    medicine = medicine_info.iloc[0].to_dict()
+    medicine = engine.medicines_df.iloc[medicine_info[0]].to_dict()
     
     # Get all batches for this medicine
-    batches = engine.inventory_df[engine.inventory_df['medicine_id'] == medicine_id]
+    batches = engine.inventory_df.iloc[rows["inventory"].get(medicine_id, NO_ROWS)]
     batches_list = batches.to_dict(orient='records')
     
     # Get consumption stats
-    stats = engine.daily_consumption[engine.daily_consumption['medicine_id'] == medicine_id]
-    consumption_stats = stats.iloc[0].to_dict() if not stats.empty else {}
+    stats = rows["consumption_stats"].get(medicine_id)
+    consumption_stats = engine.daily_consumption.iloc[stats[0]].to_dict() if stats is not None else {}
     
     # Get consumption history (last 90 days)
-    consumption_history = engine.consumption_df[
-        engine.consumption_df['medicine_id'] == medicine_id
-    ].sort_values('date', ascending=False).head(90)
+    history = rows["consumption"].get(medicine_id, NO_ROWS)[:90]
+    consumption_history = engine.consumption_df.iloc[history]
     
     # Calculate totals
     total_stock = batches['quantity'].sum()
     total_value = (batches['quantity'] * batches['unit_cost_inr']).sum()
     
     # Get risk info
-    expiry_risks = [r for r in engine.calculate_expiry_risks() if r.medicine_id == medicine_id]
-    stockout_risks = [r for r in engine.calculate_stockout_risks() if r.medicine_id == medicine_id]
+    expiry_risks = risks["expiry"].get(medicine_id, [])
+    stockout_risk = risks["stockout"].get(medicine_id)
     
     return {
         "medicine": medicine,
@@ -457,54 +1442,124 @@ async def get_medicine_detail(medicine_id: int):
             for r in expiry_risks
         ],
         "stockout_risk": {
-            "days_until_stockout": stockout_risks[0].days_until_stockout if stockout_risks else None,
-            "risk_level": stockout_risks[0].risk_level if stockout_risks else "LOW",
-            "recommended_order": stockout_risks[0].recommended_order if stockout_risks else 0
+            "days_until_stockout": stockout_risk.days_until_stockout if stockout_risk else None,
+            "risk_level": stockout_risk.risk_level if stockout_risk else "LOW",
+            "recommended_order": stockout_risk.recommended_order if stockout_risk else 0
         }
     }
 
 
 @app.get("/api/inventory")
-async def get_inventory(
+def get_inventory(
+    response: Response,
     category: Optional[str] = None,
     risk_level: Optional[str] = None,
-    expiring_within_days: Optional[int] = None
+    expiring_within_days: Optional[int] = None,
+    sort_by: str = "expiry",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    response_format: str = Query("json", alias="format")
 ):
-    """Get full inventory with batch details"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    inventory = engine.inventory_df.copy()
-    inventory['expiry_date'] = pd.to_datetime(inventory['expiry_date'])
-    inventory['days_to_expiry'] = (inventory['expiry_date'] - datetime.now()).dt.days
-    
-    # Apply filters
-    if category:
-        inventory = inventory[inventory['category'] == category]
+    """
+    Get full inventory with batch details
     
+    Args:
+        category: Filter by category
+        risk_level: Filter by expiry risk level
+        expiring_within_days: Only batches expiring within N days
+        sort_by: Sort order (expiry, risk, quantity, name)
+        limit: Page size (default: all matching batches)
+        cursor: X-Next-Cursor value from the previous page
+        format: json (default), columnar, msgpack or arrow
+    """
+    fmt = validate_format(response_format)
+    snapshot = get_snapshot(response)
+    table = inventory_table(snapshot)
+    index = inventory_index(snapshot)
+    
+    filters = {
+        "category": category or None,
+        "risk_level": risk_level.upper() if risk_level else None
+    }
+    perm = index.permutation(sort_by, filters)
     if expiring_within_days:
-        inventory = inventory[inventory['days_to_expiry'] <= expiring_within_days]
-    
-    # Add risk levels from expiry risks
-    expiry_risks = {(r.medicine_id, r.batch_no): r.risk_level for r in engine.calculate_expiry_risks()}
-    inventory['risk_level'] = inventory.apply(
-        lambda row: expiry_risks.get((row['medicine_id'], row['batch_no']), 'LOW'),
-        axis=1
-    )
-    
-    if risk_level:
-        inventory = inventory[inventory['risk_level'] == risk_level.upper()]
+        # Batches are kept sorted by expiry, so the cutoff is a binary search
+        by_expiry = index.permutation("expiry", filters)
+        cutoff = np.searchsorted(index.sorted_values("expiry", filters), expiring_within_days, side="right")
+        if sort_by == "expiry":
+            perm = by_expiry[:cutoff]
+        else:
+            within = np.zeros(index.size, dtype=bool)
+            within[by_expiry[:cutoff]] = True
+            perm = perm[within[perm]]
+    
+    rows, next_cursor, total = index.page(sort_by, limit, cursor, filters=filters, perm=perm)
+    set_page_headers(response, next_cursor, total)
+    
+    totals = {
+        "total_batches": total,
+        "total_value": round(float(index.columns["total_value_inr"][perm].sum()), 2)
+    }
+    if fmt != "json":
+        return columnar_response(public_columns(index, rows), fmt, extra=totals, headers=dict(response.headers))
     
-    # Sort by days to expiry
-    inventory = inventory.sort_values('days_to_expiry')
+    return {
+        **totals,
+        "batches": table.iloc[rows].to_dict(orient='records')
+    }
+
+
+@app.get("/api/inventory/expiry-calendar")
+async def get_expiry_calendar(
+    response: Response,
+    category: Optional[str] = None,
+    weeks: int = Query(12, ge=1, le=104)
+):
+    """
+    Batches, quantity and value expiring per calendar week (Monday to Sunday)
     
-    # Format dates for JSON
-    inventory['expiry_date'] = inventory['expiry_date'].dt.strftime('%Y-%m-%d')
+    Args:
+        category: Filter by category
+        weeks: Number of weeks, starting with the current one
+    """
+    snapshot = get_snapshot(response)
+    index = inventory_index(snapshot)
+    filters = {"category": category or None}
+    perm = index.permutation("expiry", filters)
+    days_to_expiry = index.sorted_values("expiry", filters)
+    
+    # Week edges as days_to_expiry values, located in the expiry-sorted batches
+    reference = snapshot.reference_date
+    today = pd.Timestamp(reference.date())
+    week_starts = today - pd.Timedelta(days=today.weekday()) + pd.to_timedelta(np.arange(weeks + 1) * 7, unit='D')
+    edges = np.concatenate([[(today - reference).days], (week_starts[1:] - reference).days])
+    bounds = np.searchsorted(days_to_expiry, edges, side="left")
+    
+    window = perm[bounds[0]:bounds[-1]]
+    offsets = bounds - bounds[0]
+    quantity = np.concatenate([[0], np.cumsum(index.columns["quantity"][window])])
+    value = np.concatenate([[0.0], np.cumsum(index.columns["total_value_inr"][window])])
+    
+    def bucket(rows: np.ndarray) -> Dict[str, Any]:
+        return {
+            "batch_count": int(len(rows)),
+            "quantity": int(index.columns["quantity"][rows].sum()),
+            "total_value": round(float(index.columns["total_value_inr"][rows].sum()), 2)
+        }
     
     return {
-        "total_batches": len(inventory),
-        "total_value": round(inventory['total_value_inr'].sum(), 2),
-        "batches": inventory.to_dict(orient='records')
+        "reference_date": today.strftime('%Y-%m-%d'),
+        "expired": bucket(perm[:bounds[0]]),
+        "weeks": [
+            {
+                "week_start": week_starts[i].strftime('%Y-%m-%d'),
+                "batch_count": int(offsets[i + 1] - offsets[i]),
+                "quantity": int(quantity[offsets[i + 1]] - quantity[offsets[i]]),
+                "total_value": round(float(value[offsets[i + 1]] - value[offsets[i]]), 2)
+            }
+            for i in range(weeks)
+        ],
+        "later": bucket(perm[bounds[-1]:])
     }
 
 
@@ -514,60 +1569,21 @@ async def get_consumption_trends(
     category: Optional[str] = None,
     days: int = 90
 ):
-    """Get consumption trends over time"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    consumption = engine.consumption_df.copy()
-    consumption['date'] = pd.to_datetime(consumption['date'])
-    
-    # Filter by date range
-    end_date = consumption['date'].max()
-    start_date = end_date - pd.Timedelta(days=days)
-    consumption = consumption[consumption['date'] >= start_date]
-    
-    # Apply filters
-    if medicine_id:
-        consumption = consumption[consumption['medicine_id'] == medicine_id]
-    
-    if category:
-        # Get medicine IDs for this category
-        category_meds = engine.medicines_df[engine.medicines_df['category'] == category]['medicine_id'].tolist()
-        consumption = consumption[consumption['medicine_id'].isin(category_meds)]
-    
-    # Aggregate by date
-    daily_totals = consumption.groupby('date').agg({
-        'quantity_dispensed': 'sum',
-        'patient_count': 'sum'
-    }).reset_index()
-    
-    daily_totals['date'] = daily_totals['date'].dt.strftime('%Y-%m-%d')
-    
-    # Weekly aggregation
-    consumption['week'] = consumption['date'].dt.to_period('W').dt.start_time
-    weekly_totals = consumption.groupby('week').agg({
-        'quantity_dispensed': 'sum',
-        'patient_count': 'sum'
-    }).reset_index()
-    weekly_totals['week'] = weekly_totals['week'].dt.strftime('%Y-%m-%d')
+    """
+    Get consumption trends over time
     
-    return {
-        "daily": daily_totals.to_dict(orient='records'),
-        "weekly": weekly_totals.to_dict(orient='records'),
-        "summary": {
-            "total_dispensed": int(consumption['quantity_dispensed'].sum()),
-            "total_patients": int(consumption['patient_count'].sum()),
-            "avg_daily_dispensed": round(consumption.groupby('date')['quantity_dispensed'].sum().mean(), 1),
-            "avg_daily_patients": round(consumption.groupby('date')['patient_count'].sum().mean(), 1)
-        }
-    }
+    Args:
+        medicine_id: Only this medicine
+        category: Only medicines of this category
+        days: Window length, ending at the last logged date
+    """
+    return get_state().consumption_index.trends(days, medicine_id or None, category or None)
 
 
 @app.get("/api/categories")
 async def get_categories():
     """Get list of all medicine categories with stats"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
+    engine = get_state().engine
     
     categories = engine.inventory_df.groupby('category').agg({
         'medicine_id': 'nunique',
@@ -581,13 +1597,11 @@ async def get_categories():
 
 
 @app.get("/api/recommendations")
-async def get_recommendations():
+async def get_recommendations(response: Response):
     """Get actionable recommendations based on current risks"""
-    if engine is None:
-        raise HTTPException(status_code=500, detail="Data not loaded")
-    
-    expiry_risks = engine.calculate_expiry_risks()
-    stockout_risks = engine.calculate_stockout_risks()
+    snapshot = get_snapshot(response)
+    expiry_risks = snapshot.expiry_risks
+    stockout_risks = snapshot.stockout_risks
     
     recommendations = []
     
@@ -704,19 +1718,227 @@ async def get_recommendations():
     }
 
 
+# ============================================================================
+# STREAMING EXPORTS (NDJSON / CSV)
+# ============================================================================
+
+@app.get("/api/export/inventory")
+async def export_inventory(
+    response: Response,
+    category: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format")
+):
+    """
+    Stream all inventory batches with days to expiry and risk level
+    
+    Args:
+        category: Filter by category
+        format: ndjson (default) or csv
+    """
+    fmt = validate_export_format(export_format)
+    index = inventory_index(get_snapshot(response))
+    columns = {name: values for name, values in index.columns.items() if name != "risk_order"}
+    
+    chunk_filter = (lambda chunk: chunk["category"] == category) if category else None
+    return export_response(columns, fmt, "inventory", chunk_filter, headers=dict(response.headers))
+
+
+@app.get("/api/export/expiry-risks")
+async def export_expiry_risks(
+    response: Response,
+    risk_level: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format")
+):
+    """
+    Stream expiry risk assessments for every batch
+    
+    Args:
+        risk_level: Filter by risk level (CRITICAL, HIGH, MEDIUM, LOW)
+        format: ndjson (default) or csv
+    """
+    fmt = validate_export_format(export_format)
+    columns = expiry_risk_columns(get_snapshot(response))
+    
+    level = risk_level.upper() if risk_level else None
+    chunk_filter = (lambda chunk: chunk["risk_level"] == level) if level else None
+    return export_response(columns, fmt, "expiry_risks", chunk_filter, headers=dict(response.headers))
+
+
+@app.get("/api/export/consumption")
+async def export_consumption(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    medicine_id: Optional[int] = None,
+    export_format: str = Query("ndjson", alias="format")
+):
+    """
+    Stream raw consumption log rows over a date range
+    
+    Args:
+        start_date: First date to include (YYYY-MM-DD, default: start of log)
+        end_date: Last date to include (YYYY-MM-DD, default: end of log)
+        medicine_id: Optional - filter by specific medicine
+        format: ndjson (default) or csv
+    """
+    state = get_state()
+    engine = state.engine
+    fmt = validate_export_format(export_format)
+    
+    try:
+        start = np.datetime64(pd.Timestamp(start_date)) if start_date else None
+        end = np.datetime64(pd.Timestamp(end_date)) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be formatted as YYYY-MM-DD")
+    
+    # Views over the engine's arrays - nothing is copied up front. A date-ordered
+    # log is narrowed to the window's rows by binary search before chunking.
+    consumption = engine.consumption_df
+    rows = slice(None)
+    if state.consumption_index is not None and (start is not None or end is not None):
+        row_range = state.consumption_index.row_range(start, end)
+        if row_range is not None:
+            rows = slice(*row_range)
+    columns = {name: consumption[name].to_numpy()[rows] for name in consumption.columns}
+    
+    def chunk_filter(chunk):
+        mask = np.ones(len(chunk["date"]), dtype=bool)
+        if start is not None:
+            mask &= chunk["date"] >= start
+        if end is not None:
+            mask &= chunk["date"] <= end
+        if medicine_id:
+            mask &= chunk["medicine_id"] == medicine_id
+        return mask
+    
+    return export_response(columns, fmt, "consumption", chunk_filter)
+
+
+# ============================================================================
+# BATCH REQUESTS
+# ============================================================================
+@app.post("/api/batch")
+async def batch_requests(batch: BatchRequest, request: Request):
+    """
+    Run several GET endpoints in one round trip against one risk snapshot
+    
+    Body: {"requests": [{"id": "summary", "path": "/api/dashboard/summary", "params": {}}, ...]}
+    Each result carries the sub-request's id, path, status and JSON body.
+    """
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_REQUESTS} requests per batch"
+        )
+    
+    snapshot_headers = Response()
+    snapshot = get_snapshot(snapshot_headers)
+    token = pinned_snapshot.set(snapshot)
+    try:
+        items = []
+        for sub in batch.requests:
+            error = validate_sub_request(sub)
+            if error is not None:
+                items.append(batch_item(sub, 400, error=error))
+                continue
+            with span("subrequest"):
+                status, headers, body = await dispatch_get(request.app, sub.path, sub.params)
+            if not headers.get("content-type", "").startswith("application/json"):
+                items.append(batch_item(sub, 406, error="Only JSON responses can be batched"))
+                continue
+            items.append(batch_item(sub, status, body, etag=headers.get("etag")))
+    finally:
+        pinned_snapshot.reset(token)
+    
+    body = b'{"data_version":%d,"results":[%s]}' % (snapshot.data_version, b",".join(items))
+    headers = {k: v for k, v in snapshot_headers.headers.items() if k.startswith("x-snapshot-")}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# ============================================================================
+# INVENTORY UPLOAD
+# ============================================================================
+# Serializes inventory deltas with each other
+inventory_lock = threading.Lock()
+
+
+def apply_inventory_delta(delta: pd.DataFrame) -> Dict[str, Any]:
+    """Publish engines with the validated rows applied and update the risk snapshot"""
+    with inventory_lock:
+        snapshot = scheduler.snapshot
+        started = time.time()
+        previous, state, affected = data_store.apply_inventory_delta(delta)
+        if not affected:
+            return {"medicines_updated": 0, "snapshot": "unchanged"}
+        medicines_cache.clear()
+        
+        # Patch the current snapshot when it is up to date; otherwise rebuild it all
+        if (snapshot is not None and snapshot.data_version == previous.version
+                and snapshot.reference_date.date() == datetime.now().date()):
+            scheduler.install(build_incremental_snapshot(snapshot, affected, state))
+            snapshot_update = "incremental"
+        else:
+            scheduler.request_refresh()
+            snapshot_update = "full"
+        
+        return {
+            "medicines_updated": len(affected),
+            "snapshot": snapshot_update,
+            "apply_seconds": round(time.time() - started, 3)
+        }
+
+
+@app.post("/api/inventory/upload")
+async def upload_inventory(request: Request, dry_run: bool = False):
+    """
+    Upload inventory batches as CSV and apply them to the live data
+    
+    Send the CSV as the raw request body (Content-Type: text/csv). Required
+    columns: medicine_id, batch_no, quantity, expiry_date (YYYY-MM-DD).
+    Optional: medicine_name, category, unit, received_date, unit_cost_inr.
+    Rows are upserted by (medicine_id, batch_no); quantity 0 removes a batch.
+    Invalid rows are skipped and reported.
+    
+    Args:
+        dry_run: Validate only, without applying anything
+    """
+    engine = get_state().engine
+    
+    known_medicine_ids = set(engine.medicines_df['medicine_id'].tolist())
+    upload = await read_inventory_upload(request.stream(), known_medicine_ids)
+    
+    result = {
+        "status": "validated" if dry_run else "success",
+        "rows_read": upload.rows_read,
+        "rows_accepted": len(upload.delta),
+        "rows_rejected": upload.rows_rejected,
+        "errors": upload.errors
+    }
+    if dry_run or upload.delta.empty:
+        return result
+    
+    result.update(await run_in_threadpool(apply_inventory_delta, upload.delta))
+    return result
+
+
 @app.post("/api/reload-data")
 async def reload_data():
-    """Reload data from CSV files"""
-    success = load_data()
-    if success:
-        # Clear all caches when data is reloaded
-        expiry_cache.clear()
-        stockout_cache.clear()
-        summary_cache.clear()
+    """Reload data from CSV files
+    
+    The new engines are built in a worker thread while requests keep being
+    served from the current ones, then swapped in as one version.
+    """
+    result = await run_in_threadpool(load_data)
+    if result is None:
+        raise HTTPException(status_code=500, detail="Failed to reload data")
+    
+    if result["reparsed"] or result["rebuilt"]:
+        # Clear all caches and recompute risk snapshots in the background
         medicines_cache.clear()
-        return {"status": "success", "message": "Data reloaded successfully"}
+        scheduler.request_refresh()
+        message = "Data reloaded successfully"
     else:
-        raise HTTPException(status_code=500, detail="Failed to reload data")
+        message = "Data files unchanged"
+    return {"status": "success", "message": message, **result}
 
 
 # ============================================================================
@@ -726,18 +1948,45 @@ async def reload_data():
 # NOTE: /api/forecast/summary MUST be defined BEFORE /api/forecast/{medicine_id}
 # Otherwise FastAPI will match "summary" as a medicine_id
 
+FORECAST_FIELDS = [
+    "medicine_id", "medicine_name", "forecast_days", "predicted_quantity",
+    "lower_bound", "upper_bound", "confidence", "trend", "growth_rate",
+    "seasonality_factor", "anomalies_detected"
+]
+
 @app.get("/api/forecast/summary")
-async def get_forecast_summary(days: int = 30, confidence_level: float = 0.9):
+def get_forecast_summary(
+    response: Response,
+    days: int = 30,
+    confidence_level: float = 0.9,
+    response_format: str = Query("json", alias="format")
+):
     """Get forecast summary for all medicines
     
     Args:
         days: Days to forecast (default: 30)
         confidence_level: Confidence level for intervals (default: 0.9)
+        format: json (default), columnar, msgpack or arrow
     """
-    if advanced_engine is None:
-        raise HTTPException(status_code=500, detail="Advanced engine not loaded")
+    fmt = validate_format(response_format)
+    advanced_engine = get_advanced_engine()
     
-    summary = advanced_engine.get_forecast_summary(days)
+    # The default horizon is precomputed in the background snapshot
+    snapshot = get_snapshot(response) if days == SNAPSHOT_FORECAST_DAYS else None
+    if snapshot is not None and snapshot.forecast_summary is not None:
+        summary = snapshot.forecast_summary
+    else:
+        summary = advanced_engine.get_forecast_summary(days)
+    
+    if fmt != "json":
+        columns = records_to_columns(summary.get('forecasts', []), FORECAST_FIELDS)
+        confidences = columns["confidence"]
+        return columnar_response(columns, fmt, extra={
+            "total_medicines_forecasted": int(summary.get('total_medicines_analyzed', 0)),
+            "total_predicted_quantity": int(summary.get('total_predicted_consumption', 0)),
+            "avg_confidence": round(float(confidences.mean()), 2) if len(confidences) else 0,
+            "trend_summary": summary.get('trend_summary', {})
+        }, headers=dict(response.headers))
     
     # Convert to JSON-serializable format
     forecasts = []
@@ -765,8 +2014,72 @@ async def get_forecast_summary(days: int = 30, confidence_level: float = 0.9):
     }
 
 
+# Bulk forecast limits
+FORECAST_BATCH_MAX_MEDICINES = 10000
+FORECAST_BATCH_MAX_HORIZONS = 10
+FORECAST_BATCH_MAX_LEVELS = 10
+# Results larger than this are streamed as NDJSON unless a format is given
+FORECAST_BATCH_STREAM_ROWS = 5000
+
+
+class ForecastBatchRequest(BaseModel):
+    medicine_ids: Optional[List[int]] = None
+    horizons: List[int] = [30]
+    confidence_levels: List[float] = [0.95]
+    format: Optional[str] = None
+
+
+@app.post("/api/forecast/batch")
+def forecast_batch(request: ForecastBatchRequest):
+    """
+    Forecast many medicines x horizons x confidence levels in one call
+    
+    Args:
+        medicine_ids: Medicines to forecast (omit for all)
+        horizons: Forecast lengths in days (1-365)
+        confidence_levels: Interval confidence levels (between 0 and 1)
+        format: json, ndjson (streamed), columnar, msgpack or arrow.
+            Defaults to json, or ndjson for more than 5000 result rows.
+    """
+    advanced_engine = get_advanced_engine()
+    
+    if request.medicine_ids is not None and len(request.medicine_ids) > FORECAST_BATCH_MAX_MEDICINES:
+        raise HTTPException(status_code=400, detail=f"At most {FORECAST_BATCH_MAX_MEDICINES} medicine_ids per request")
+    if not request.horizons or len(request.horizons) > FORECAST_BATCH_MAX_HORIZONS:
+        raise HTTPException(status_code=400, detail=f"Give 1-{FORECAST_BATCH_MAX_HORIZONS} horizons")
+    if not request.confidence_levels or len(request.confidence_levels) > FORECAST_BATCH_MAX_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Give 1-{FORECAST_BATCH_MAX_LEVELS} confidence_levels")
+    if any(not 1 <= days <= 365 for days in request.horizons):
+        raise HTTPException(status_code=400, detail="Horizons must be between 1 and 365 days")
+    if any(not 0 < level < 1 for level in request.confidence_levels):
+        raise HTTPException(status_code=400, detail="Confidence levels must be between 0 and 1")
+    
+    forecasts = advanced_engine.forecast_batch(
+        request.medicine_ids, tuple(request.horizons), tuple(request.confidence_levels)
+    )
+    
+    fmt = (request.format or "").lower()
+    if not fmt:
+        fmt = "ndjson" if len(forecasts) > FORECAST_BATCH_STREAM_ROWS else "json"
+    if fmt == "ndjson":
+        return ndjson_response(frame_to_columns(forecasts))
+    fmt = validate_format(fmt)
+    
+    forecasted_ids = set(forecasts['medicine_id'].unique().tolist())
+    missing = [m for m in dict.fromkeys(request.medicine_ids or []) if m not in forecasted_ids]
+    
+    if fmt != "json":
+        return columnar_response(frame_to_columns(forecasts), fmt, extra={"missing_medicine_ids": missing})
+    
+    return {
+        "count": len(forecasts),
+        "missing_medicine_ids": missing,
+        "forecasts": forecasts.to_dict(orient='records')
+    }
+
+
 @app.get("/api/forecast/{medicine_id}")
-async def get_forecast(medicine_id: int, days: int = 30):
+def get_forecast(medicine_id: int, days: int = 30):
     """
     Get demand forecast for a specific medicine
     
@@ -774,8 +2087,7 @@ async def get_forecast(medicine_id: int, days: int = 30):
         medicine_id: Medicine to forecast
         days: Number of days to forecast (default: 30)
     """
-    if advanced_engine is None:
-        raise HTTPException(status_code=500, detail="Advanced engine not loaded")
+    advanced_engine = get_advanced_engine()
     
     forecast = advanced_engine.forecast(medicine_id, days)
     
@@ -798,7 +2110,8 @@ async def get_forecast(medicine_id: int, days: int = 30):
 
 
 @app.get("/api/anomalies")
-async def get_anomalies(
+def get_anomalies(
+    response: Response,
     days: int = 30,
     min_severity: str = "medium",
     medicine_id: Optional[int] = None
@@ -811,11 +2124,20 @@ async def get_anomalies(
         min_severity: Minimum severity to include (low, medium, high)
         medicine_id: Optional - filter by specific medicine
     """
-    if advanced_engine is None:
-        raise HTTPException(status_code=500, detail="Advanced engine not loaded")
+    advanced_engine = get_advanced_engine()
+    
+    severity_order = {"low": 0, "medium": 1, "high": 2}
+    snapshot = get_snapshot(response) if not medicine_id and days == SNAPSHOT_ANOMALY_DAYS else None
     
     if medicine_id:
         anomalies = advanced_engine.detect_anomalies(medicine_id, days)
+    elif snapshot is not None and snapshot.anomalies is not None:
+        # Snapshot holds all severities, already sorted by severity and date
+        min_severity_value = severity_order.get(min_severity, 1)
+        anomalies = [
+            a for a in snapshot.anomalies
+            if severity_order.get(a.severity, 0) >= min_severity_value
+        ]
     else:
         anomalies = advanced_engine.detect_all_anomalies(days, min_severity)
     
@@ -838,15 +2160,14 @@ async def get_anomalies(
 
 
 @app.get("/api/trends/{medicine_id}")
-async def get_trends(medicine_id: int):
+def get_trends(medicine_id: int):
     """
     Get detailed trend analysis for a medicine
     
     Args:
         medicine_id: Medicine to analyze
     """
-    if advanced_engine is None:
-        raise HTTPException(status_code=500, detail="Advanced engine not loaded")
+    advanced_engine = get_advanced_engine()
     
     trend_data = advanced_engine.get_trend_analysis(medicine_id)
     
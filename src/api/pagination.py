@@ -0,0 +1,210 @@
+"""
+MedPredict AI - Sorted Indexes & Cursor Pagination
+
+List endpoints keep one prebuilt row permutation per supported ordering
+(and per filter combination actually requested), so fetching a page is a
+slice of an existing index instead of a filter + sort of the full result set.
+
+Cursors are opaque tokens holding the ordering, the position after the last
+returned row and that row's key. The key keeps pagination stable when the
+index is rebuilt between pages (e.g. after a snapshot refresh).
+"""
+
+import base64
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from src.api.formats import Columns, column_count
+from src.ml.timing import span
+
+
+# Filter combinations cached per index; beyond this pages are still served,
+# just without caching the filtered permutation
+MAX_CACHED_PERMUTATIONS = 64
+
+
+@dataclass(frozen=True)
+class Ordering:
+    """A sort order over one column (ties keep the source row order)"""
+    column: str
+    descending: bool = False
+
+
+def encode_cursor(sort: str, position: int, key: str) -> str:
+    payload = json.dumps({"s": sort, "p": position, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {"s": str(payload["s"]), "p": int(payload["p"]), "k": str(payload["k"])}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class SortedIndex:
+    """
+    Prebuilt sort permutations over a columnar result set
+
+    Args:
+        columns: One array per field (row i is columns[name][i])
+        key_columns: Columns that together identify a row uniquely
+        orderings: Supported orderings by name
+    """
+
+    def __init__(self, columns: Columns, key_columns: Sequence[str],
+                 orderings: Dict[str, Ordering]):
+        self.columns = columns
+        self.orderings = orderings
+        self.size = column_count(columns)
+        self.row_keys = np.asarray([
+            ":".join(str(part) for part in parts)
+            for parts in zip(*(columns[name].tolist() for name in key_columns))
+        ], dtype=object)
+
+        self._permutations: Dict[Tuple, np.ndarray] = {}
+        self._positions: Dict[Tuple, Dict[str, int]] = {}
+        self._sorted_values: Dict[Tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Permutations
+    # ------------------------------------------------------------------
+    def _sort_permutation(self, sort: str) -> np.ndarray:
+        ordering = self.orderings[sort]
+        values = self.columns[ordering.column]
+        # Dense ranks make strings and numbers sort the same way, and allow a
+        # stable descending order by negating the rank
+        _, ranks = np.unique(values, return_inverse=True)
+        keys = -ranks.reshape(-1) if ordering.descending else ranks.reshape(-1)
+        if values.dtype.kind == "f":
+            # Missing values go last in either direction
+            missing = np.isnan(values)
+            if missing.any():
+                keys = keys.copy()
+                keys[missing] = keys.max() + 1
+        return np.argsort(keys, kind="stable")
+
+    @staticmethod
+    def _cache_key(sort: str, filters: Optional[Dict[str, Any]]) -> Tuple:
+        return (sort, tuple(sorted((k, v) for k, v in (filters or {}).items() if v is not None)))
+
+    def permutation(self, sort: str, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Row positions in `sort` order, restricted to rows matching all filters
+
+        Args:
+            sort: Ordering name
+            filters: Column -> required value (equality)
+        """
+        if sort not in self.orderings:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown sort '{sort}'. Use one of: {', '.join(self.orderings)}"
+            )
+        cache_key = self._cache_key(sort, filters)
+        filters = dict(cache_key[1])
+        cached = self._permutations.get(cache_key)
+        if cached is not None:
+            return cached
+
+        base_key = (sort, ())
+        base = self._permutations.get(base_key)
+        if base is None:
+            base = self._sort_permutation(sort)
+            with self._lock:
+                self._permutations[base_key] = base
+        if not filters:
+            return base
+
+        mask = np.ones(self.size, dtype=bool)
+        for column, value in filters.items():
+            mask &= self.columns[column] == value
+        perm = base[mask[base]]
+
+        with self._lock:
+            if len(self._permutations) < MAX_CACHED_PERMUTATIONS:
+                self._permutations[cache_key] = perm
+        return perm
+
+    def sorted_values(self, sort: str, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Values of the ordering's column in permutation order
+
+        For ascending orderings these are sorted, so value ranges can be
+        located with np.searchsorted instead of a scan.
+        """
+        perm = self.permutation(sort, filters)
+        cache_key = self._cache_key(sort, filters)
+        values = self._sorted_values.get(cache_key)
+        if values is None:
+            values = self.columns[self.orderings[sort].column][perm]
+            with self._lock:
+                if len(self._sorted_values) < MAX_CACHED_PERMUTATIONS:
+                    self._sorted_values[cache_key] = values
+        return values
+
+    def _position_of(self, cache_key: Optional[Tuple], perm: np.ndarray, key: str) -> Optional[int]:
+        if cache_key is None:
+            found = np.flatnonzero(self.row_keys[perm] == key)
+            return int(found[0]) if len(found) else None
+        positions = self._positions.get(cache_key)
+        if positions is None:
+            positions = {k: i for i, k in enumerate(self.row_keys[perm].tolist())}
+            with self._lock:
+                if len(self._positions) < MAX_CACHED_PERMUTATIONS:
+                    self._positions[cache_key] = positions
+        return positions.get(key)
+
+    # ------------------------------------------------------------------
+    # Paging
+    # ------------------------------------------------------------------
+    @span("filter_page")
+    def page(self, sort: str, limit: Optional[int], cursor: Optional[str] = None,
+             filters: Optional[Dict[str, Any]] = None,
+             perm: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[str], int]:
+        """
+        Get one page of row positions
+
+        Args:
+            sort: Ordering name
+            limit: Page size (None for all remaining rows)
+            cursor: Cursor returned with the previous page
+            filters: Column -> required value (equality)
+            perm: Precomputed (e.g. search-restricted) permutation to page through
+
+        Returns:
+            Tuple of (row positions, next cursor or None, total matching rows)
+        """
+        cache_key = None
+        if perm is None:
+            perm = self.permutation(sort, filters)
+            cache_key = self._cache_key(sort, filters)
+        total = len(perm)
+
+        start = 0
+        if cursor:
+            state = decode_cursor(cursor)
+            if state["s"] != sort:
+                raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+            position = state["p"]
+            if not (0 < position <= total and self.row_keys[perm[position - 1]] == state["k"]):
+                # Index changed since the cursor was issued: resume after the same row
+                found = self._position_of(cache_key, perm, state["k"])
+                position = found + 1 if found is not None else max(0, min(position, total))
+            start = position
+
+        end = total if limit is None else min(total, start + max(0, limit))
+        rows = perm[start:end]
+
+        next_cursor = None
+        if end < total and len(rows):
+            next_cursor = encode_cursor(sort, end, self.row_keys[rows[-1]])
+        return rows, next_cursor, total
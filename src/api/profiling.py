@@ -0,0 +1,262 @@
+"""
+MedPredict AI - On-Demand Profiling
+
+Two admin-only tools for finding out why something is slow in production:
+
+- Per-request profiles: a request sent with `X-Profile: 1` (or `?profile=1`)
+  runs under cProfile. Endpoints that run in the thread pool (plain `def`)
+  are profiled in their worker thread too, and the profiles merged. The result is kept in memory and summarized as the
+  hottest functions, with the service's own code (src/ml/*, src/api/main.py)
+  listed separately.
+- A continuous sampling profiler that snapshots every thread's stack a few
+  times per second and aggregates them as folded stacks, the input format of
+  flamegraph.pl and speedscope.
+"""
+
+import cProfile
+import functools
+import hmac
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Files whose functions are reported as the service's own hot spots
+PROJECT_HOT_PATHS = ("src/ml/", "src/api/main.py")
+
+# Completed request profiles kept in memory (oldest dropped first)
+MAX_STORED_PROFILES = 20
+
+# Distinct stacks the sampler keeps; further new stacks are counted as "[other]"
+MAX_SAMPLED_STACKS = 10000
+
+
+# Set while a request is profiled: profiles of its work in worker threads
+_thread_profiles: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar("thread_profiles", default=None)
+
+
+def profile_in_thread(func: Callable) -> Callable:
+    """
+    Wrap a function run in the thread pool so that, within a profiled
+    request, it runs under its own cProfile in the worker thread (the request
+    profile only sees the event loop thread)
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiles = _thread_profiles.get()
+        if profiles is None:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is active in this thread
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            profiles.append(profile)
+    return wrapper
+
+
+def check_admin_token(configured: str, supplied: Optional[str]):
+    """Raise 403 unless admin access is configured and the token matches"""
+    if not configured:
+        raise HTTPException(status_code=403, detail="Admin access is not configured")
+    if not supplied or not hmac.compare_digest(configured, supplied):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@lru_cache(maxsize=4096)
+def _relative_path(filename: str) -> str:
+    try:
+        return Path(filename).resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return filename
+
+
+def _function_rows(stats: pstats.Stats) -> List[Dict]:
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        path = _relative_path(filename)
+        rows.append({
+            "function": f"{path}:{line}({name})" if line else name,
+            "file": path,
+            "calls": calls,
+            "total_seconds": round(total, 6),
+            "cumulative_seconds": round(cumulative, 6),
+        })
+    rows.sort(key=lambda r: r["cumulative_seconds"], reverse=True)
+    return rows
+
+
+class RequestProfiler:
+    """Runs single requests under cProfile and keeps the recent results"""
+
+    def __init__(self, max_profiles: int = MAX_STORED_PROFILES):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        # cProfile hooks the whole event loop thread, so one profile at a time
+        self._active = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Begin profiling, or return None if another request is being profiled"""
+        if not self._active.acquire(blocking=False):
+            return None
+        _thread_profiles.set([])
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, method: str, path: str, query: str,
+               status: int, elapsed: float) -> str:
+        """Stop profiling and store the result; returns the profile id"""
+        profile.disable()
+        self._active.release()
+        stats = pstats.Stats(profile)
+        for thread_profile in _thread_profiles.get() or []:
+            stats.add(thread_profile)
+        _thread_profiles.set(None)
+
+        profile_id = uuid.uuid4().hex[:12]
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "query": query,
+            "status": status,
+            "elapsed_seconds": round(elapsed, 6),
+            "profiled_at": time.time(),
+            "stats": stats,
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        return profile_id
+
+    def list(self) -> List[Dict]:
+        return [
+            {k: v for k, v in entry.items() if k != "stats"}
+            for entry in reversed(self._profiles.values())
+        ]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        return self._profiles.get(profile_id)
+
+    def summary(self, profile_id: str, top: int = 25) -> Optional[Dict]:
+        """Profile details with the hottest functions by cumulative time"""
+        entry = self._profiles.get(profile_id)
+        if entry is None:
+            return None
+        rows = _function_rows(entry["stats"])
+        result = {k: v for k, v in entry.items() if k != "stats"}
+        result["project_functions"] = [
+            r for r in rows if r["file"].startswith(PROJECT_HOT_PATHS)
+        ][:top]
+        result["top_functions"] = rows[:top]
+        return result
+
+    def pstats_dump(self, profile_id: str) -> Optional[bytes]:
+        """Raw profile in the format written by pstats.Stats.dump_stats()"""
+        entry = self._profiles.get(profile_id)
+        if entry is None:
+            return None
+        return marshal.dumps(entry["stats"].stats)
+
+
+class SamplingProfiler:
+    """
+    Low-rate stack sampler for continuous profiling
+
+    Args:
+        hz: Samples per second (every thread is sampled each time)
+    """
+
+    def __init__(self, hz: float = 10.0):
+        self.hz = hz
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, hz: Optional[float] = None):
+        if hz is not None:
+            self.hz = hz
+        if self.running:
+            return
+        self._stopped.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def _sample(self, own_ident: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        folded = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{_relative_path(code.co_filename)}:{code.co_qualname}")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            folded.append(";".join(reversed(stack)))
+
+        with self._lock:
+            for stack in folded:
+                if stack in self._stacks or len(self._stacks) < MAX_SAMPLED_STACKS:
+                    self._stacks[stack] += 1
+                else:
+                    self._stacks["[other]"] += 1
+            self.samples += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stopped.wait(1.0 / self.hz):
+            self._sample(own_ident)
+
+    def status(self) -> Dict:
+        with self._lock:
+            distinct = len(self._stacks)
+        return {
+            "running": self.running,
+            "hz": self.hz,
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "started_at": self.started_at,
+        }
+
+    def folded_stacks(self) -> str:
+        """Aggregated samples as "frame;frame;frame count" lines"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
@@ -0,0 +1,105 @@
+"""
+MedPredict AI - Background Startup
+
+Loads the data files and computes the first risk snapshot in a background
+thread, so the server accepts connections (and answers liveness probes)
+immediately. Progress is read from the spans the loading phases record.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.ml.timing import Trace, span, start_trace
+
+
+# Top-level loading phases, in the order they run
+STARTUP_STEPS = (
+    "parse_consumption",
+    "parse_inventory",
+    "parse_medicines",
+    "engine_init",
+    "advanced_engine_init",
+    "snapshot",
+)
+
+
+class StartupLoader:
+    """
+    Runs the startup work off the server's critical path
+
+    Args:
+        load_fn: Loads the data (returns None on failure)
+        snapshot_fn: Computes the first risk snapshot
+        on_complete: Called with the startup trace once loading finished
+    """
+
+    def __init__(self, load_fn: Callable[[], Optional[Dict]],
+                 snapshot_fn: Callable[[], object],
+                 on_complete: Optional[Callable[[Trace], None]] = None):
+        self._load_fn = load_fn
+        self._snapshot_fn = snapshot_fn
+        self._on_complete = on_complete
+        self._thread: Optional[threading.Thread] = None
+
+        self.phase = "starting"
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.trace: Optional[Trace] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    @property
+    def loading(self) -> bool:
+        return self.phase in ("starting", "loading_data", "computing_snapshot")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="startup-loader", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading finished (for scripts and tests)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.loading
+
+    def _run(self):
+        with start_trace("startup") as trace:
+            self.trace = trace
+            self.phase = "loading_data"
+            if self._load_fn() is None:
+                self.phase = "failed"
+                self.error = "Data loading failed"
+            else:
+                self.phase = "computing_snapshot"
+                with span("snapshot"):
+                    self._snapshot_fn()
+                self.phase = "ready"
+        self.finished_at = time.time()
+        if self._on_complete is not None:
+            self._on_complete(trace)
+
+    def completed_steps(self) -> List[str]:
+        trace = self.trace
+        if trace is None:
+            return []
+        done = {path.rsplit(".", 1)[-1] for path, _, _ in list(trace.spans)}
+        return [step for step in STARTUP_STEPS if step in done]
+
+    def status(self) -> Dict:
+        completed = self.completed_steps()
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "progress": round(len(completed) / len(STARTUP_STEPS), 2),
+            "completed_steps": completed,
+            "elapsed_seconds": round(end - self.started_at, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,150 @@
+"""
+MedPredict AI - Encoded Response Cache
+
+Final response bytes of hot GET endpoints, keyed by the request's ETag (which
+already covers route, query parameters and data identity). A hit skips the
+endpoint, its Pydantic models and JSON encoding: the stored body is written
+as is. Compressed variants are made once, when the entry is stored:
+
+- gzip: always
+- br:   when the 'brotli' package is installed
+
+Clients get the best variant their Accept-Encoding allows. Bodies smaller
+than MIN_COMPRESS_BYTES are only kept uncompressed.
+"""
+
+import gzip
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Smallest body worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content codings in order of preference
+ENCODINGS = ("br", "gzip")
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def negotiate(accept_encoding: Optional[str], available: List[str]) -> Optional[str]:
+    """
+    Pick a content coding for a request
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+        available: Codings the response exists in
+
+    Returns:
+        The preferred acceptable coding, or None for the uncompressed body
+    """
+    if not accept_encoding or not available:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+@dataclass
+class CachedResponse:
+    """A response body with its headers and compressed variants"""
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, status_code: int, headers: Dict[str, str], body: bytes) -> "CachedResponse":
+        variants = _compress(body) if len(body) >= MIN_COMPRESS_BYTES else {}
+        # Keep only variants that are actually smaller
+        variants = {name: data for name, data in variants.items() if len(data) < len(body)}
+        return cls(status_code, headers, body, variants)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.variants.values())
+
+    def encoded(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """(coding or None, body) for a request's Accept-Encoding"""
+        encoding = negotiate(accept_encoding, list(self.variants))
+        return encoding, self.variants[encoding] if encoding else self.body
+
+
+class ResponseCache:
+    """
+    Least recently used cache of encoded responses, bounded by total bytes
+
+    Args:
+        name: Label for the cache metrics
+        max_bytes: Budget for bodies and their variants (0 disables the cache)
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.cache: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, entry: CachedResponse):
+        if entry.size > self.max_bytes:
+            return
+        previous = self.cache.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.size
+        self.cache[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def clear(self):
+        self.evictions += len(self.cache)
+        self.cache.clear()
+        self.bytes = 0
@@ -0,0 +1,210 @@
+"""
+MedPredict AI - Background Precompute Scheduler
+
+Keeps the latest risk snapshot (expiry risks, stockout risks, dashboard
+summary, forecast summary and anomalies) computed off the request path.
+Endpoints serve the last completed snapshot immediately and a refresh runs in
+the background when it goes stale (stale-while-revalidate).
+
+Refreshes are triggered:
+- on a fixed interval
+- on demand (e.g. after /api/reload-data)
+- at day rollover, since days-to-expiry depends on the reference date
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from src.ml.predictor import ExpiryRisk, StockoutRisk
+from src.ml.timing import span
+from src.api.data_state import DataState
+
+
+@dataclass
+class RiskSnapshot:
+    """Precomputed risk and forecast results for one data version"""
+    data_version: int
+    reference_date: datetime
+    computed_at: float
+    compute_seconds: float
+    expiry_risks: List[ExpiryRisk]
+    stockout_risks: List[StockoutRisk]
+    dashboard: Dict
+    forecast_days: int
+    forecast_summary: Optional[Dict]
+    anomaly_days: int
+    anomalies: Optional[List]
+    # Engines the snapshot was computed from
+    state: Optional[DataState] = field(default=None, repr=False)
+    # Structures derived from the results above, built on first use
+    derived: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.computed_at)
+
+    def get_derived(self, key: str, build: Callable[["RiskSnapshot"], Any]) -> Any:
+        """Build a derived structure once per snapshot and reuse it"""
+        value = self.derived.get(key)
+        if value is None:
+            with span(f"build_{key}"):
+                value = build(self)
+            self.derived[key] = value
+        return value
+
+
+class SnapshotScheduler:
+    """
+    Recomputes risk snapshots in a background thread
+
+    The build function is supplied by the API module so the scheduler does not
+    need to know how engines are loaded.
+    """
+
+    def __init__(self, build_fn: Callable[[], Optional[RiskSnapshot]],
+                 version_fn: Callable[[], int],
+                 interval_seconds: int = 300):
+        """
+        Args:
+            build_fn: Computes a fresh snapshot (returns None if data is not loaded)
+            version_fn: Returns the current data version
+            interval_seconds: Maximum snapshot age before a scheduled refresh
+        """
+        self._build_fn = build_fn
+        self._version_fn = version_fn
+        self.interval = interval_seconds
+
+        self._snapshot: Optional[RiskSnapshot] = None
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.refresh_count = 0
+        self.last_error: Optional[str] = None
+        # Called with each snapshot that starts being served
+        self._listeners: List[Callable[[RiskSnapshot], None]] = []
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Start the background thread and compute the first snapshot"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._wakeup.set()  # compute immediately
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self._seconds_until_next_run())
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            if self.is_stale(self._snapshot):
+                self.refresh()
+
+    def _seconds_until_next_run(self) -> float:
+        """Sleep until the interval elapses or the day rolls over, whichever is first"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        until_midnight = (midnight - now).total_seconds() + 1
+        snapshot = self._snapshot
+        if snapshot is None:
+            return min(self.interval, until_midnight)
+        until_expiry = self.interval - snapshot.age_seconds
+        return max(1.0, min(until_expiry, until_midnight))
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+    def is_stale(self, snapshot: Optional[RiskSnapshot]) -> bool:
+        if snapshot is None:
+            return True
+        if snapshot.data_version != self._version_fn():
+            return True
+        if snapshot.reference_date.date() != datetime.now().date():
+            return True
+        return snapshot.age_seconds >= self.interval
+
+    def refresh(self) -> Optional[RiskSnapshot]:
+        """Compute a new snapshot synchronously (one refresh at a time)"""
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if not self.is_stale(self._snapshot):
+                return self._snapshot
+            try:
+                snapshot = self._build_fn()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error computing risk snapshot: {e}")
+                return self._snapshot
+            if snapshot is not None:
+                self._snapshot = snapshot
+                self.refresh_count += 1
+                self.last_error = None
+                self._notify(snapshot)
+            return self._snapshot
+
+    def request_refresh(self):
+        """Ask the background thread to recompute without waiting for it"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._wakeup.set()
+
+    def install(self, snapshot: RiskSnapshot):
+        """Serve a snapshot computed elsewhere (e.g. an incremental update)"""
+        with self._refresh_lock:
+            self._snapshot = snapshot
+            self._notify(snapshot)
+
+    def add_listener(self, listener: Callable[[RiskSnapshot], None]):
+        """
+        Call `listener` with every new snapshot, on the thread that built it
+
+        Listeners run while the refresh lock is held, in publication order;
+        they should hand work off rather than block.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, snapshot: RiskSnapshot):
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Error in snapshot listener: {e}")
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+    def get(self) -> Optional[RiskSnapshot]:
+        """
+        Get the latest completed snapshot
+
+        Returns immediately with the current snapshot, even if stale, and
+        schedules a background refresh. Only blocks when no snapshot exists yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if self.is_stale(snapshot):
+            self.request_refresh()
+        return snapshot
+
+    @property
+    def snapshot(self) -> Optional[RiskSnapshot]:
+        return self._snapshot
@@ -0,0 +1,119 @@
+"""
+MedPredict AI - Dataset Schemas
+
+Column types of the data files, applied when they are read instead of
+pandas' defaults (int64 everywhere, strings for dates and labels):
+
+- ids and counts: int32
+- repeated labels of the medicine master (category, unit): category. The
+  inventory keeps plain strings: uploads add batches whose labels may not
+  be among the existing categories.
+- dates the engines compute with: parsed at read time
+- prices and values: kept float64, so risk and loss figures are unchanged
+
+memory_report() shows what each loaded frame costs, column by column.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Dataset name -> (column dtypes, date columns parsed at read time)
+DATASET_SCHEMAS: Dict[str, Tuple[Dict[str, str], Tuple[str, ...]]] = {
+    "consumption": (
+        {
+            "medicine_id": "int32",
+            "quantity_dispensed": "int32",
+            "patient_count": "int32",
+        },
+        ("date",),
+    ),
+    "inventory": (
+        {
+            "medicine_id": "int32",
+            "quantity": "int32",
+            "unit_cost_inr": "float64",
+            "total_value_inr": "float64",
+        },
+        ("expiry_date",),
+    ),
+    "medicines": (
+        {
+            "medicine_id": "int32",
+            "category": "category",
+            "unit": "category",
+            "reorder_level": "int32",
+            "shelf_life_days": "int32",
+            "unit_cost_inr": "float64",
+        },
+        (),
+    ),
+}
+
+
+def read_dataset_csv(name: str, path: Path) -> pd.DataFrame:
+    """Read a data file with its declared schema (unknown datasets use pandas' defaults)"""
+    dtypes, dates = DATASET_SCHEMAS.get(name, ({}, ()))
+    frame = pd.read_csv(path, dtype=dtypes)
+    for column in dates:
+        if column in frame.columns:
+            frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+def iter_dataset_csv(name: str, path: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read a data file with its declared schema, `chunksize` rows at a time"""
+    dtypes, dates = DATASET_SCHEMAS.get(name, ({}, ()))
+    for frame in pd.read_csv(path, dtype=dtypes, chunksize=chunksize):
+        for column in dates:
+            if column in frame.columns:
+                frame[column] = pd.to_datetime(frame[column])
+        yield frame
+
+
+def _is_shared(values) -> bool:
+    """Whether a column's data is a memory-mapped file (shared between processes)"""
+    base = getattr(values, "_ndarray", values)
+    while isinstance(base, np.ndarray) and base.base is not None:
+        if isinstance(base.base, np.memmap):
+            return True
+        base = base.base
+    return isinstance(base, np.memmap)
+
+
+def memory_report(frames: List[Tuple[str, str, pd.DataFrame]]) -> List[Dict]:
+    """
+    Memory per frame and column
+
+    Args:
+        frames: (owner, dataset name, frame) for each frame to report
+
+    Returns:
+        One dict per frame with rows, total bytes, bytes in shared memory-mapped
+        columns, and each column's dtype and bytes
+    """
+    report = []
+    for owner, name, frame in frames:
+        columns = []
+        for column in frame.columns:
+            series = frame[column]
+            columns.append({
+                "column": column,
+                "dtype": str(series.dtype),
+                "bytes": int(series.memory_usage(index=False, deep=True)),
+                "shared": _is_shared(series.array),
+            })
+        total = sum(c["bytes"] for c in columns)
+        report.append({
+            "owner": owner,
+            "dataset": name,
+            "rows": len(frame),
+            "bytes": total,
+            "shared_bytes": sum(c["bytes"] for c in columns if c["shared"]),
+            "bytes_per_row": round(total / len(frame), 1) if len(frame) else 0.0,
+            "columns": columns,
+        })
+    return report
@@ -0,0 +1,236 @@
+"""
+MedPredict AI - Medicine Search Index
+
+Built once per data load over the medicine master. Names hold both the
+generic and the strength ("Paracetamol 650mg"), so they are split into
+normalized tokens, including the number and unit of a strength on their own.
+
+- prefix trie over tokens: typeahead ("para 65")
+- trigram postings over whole names: substring queries ("cetamol")
+- trigram postings over tokens + bounded edit distance: typos ("paracetmol")
+
+Fuzzy matches are only returned when nothing matches exactly.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+
+# Score of a query word matching a name token
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.5
+FUZZY_PENALTY = 0.1  # per edit
+
+# Bonuses for the whole query matching the name
+NAME_PREFIX_BONUS = 0.5
+SUBSTRING_BONUS = 0.25
+
+# Shortest query word matched with typos
+MIN_FUZZY_LENGTH = 4
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_ALNUM_PARTS = re.compile(r"[0-9]+|[a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII words separated by single spaces"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(word for word in _NON_ALNUM.split(text.lower()) if word)
+
+
+def name_tokens(normalized: str) -> List[str]:
+    """Words of a name plus the number and unit parts of words like "500mg\""""
+    tokens = []
+    for word in normalized.split():
+        tokens.append(word)
+        parts = _ALNUM_PARTS.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count as one), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Documents with a token starting with the path to this node
+        self.ids: Set[int] = set()
+
+
+class PrefixTrie:
+    """Token prefix -> documents"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, token: str, doc: int):
+        node = self.root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            node.ids.add(doc)
+
+    def prefixed(self, prefix: str) -> Set[int]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+
+class MedicineSearchIndex:
+    """
+    Ranked medicine name search
+
+    Args:
+        medicines_df: Medicine master (medicine_id, name, category)
+    """
+
+    def __init__(self, medicines_df: pd.DataFrame):
+        self.medicine_ids: List[int] = medicines_df['medicine_id'].astype(int).tolist()
+        self.names: List[str] = [normalize(n) for n in medicines_df['name'].tolist()]
+        self.display_names: List[str] = medicines_df['name'].astype(str).tolist()
+        self.categories: List[str] = medicines_df['category'].astype(str).tolist()
+
+        self.trie = PrefixTrie()
+        # token -> documents containing it
+        self.token_docs: Dict[str, Set[int]] = {}
+        # name trigram -> documents (substring search)
+        self.name_trigrams: Dict[str, Set[int]] = {}
+        # padded token trigram -> tokens (typo candidates)
+        self.token_trigrams: Dict[str, Set[str]] = {}
+
+        for doc, name in enumerate(self.names):
+            for token in name_tokens(name):
+                self.trie.insert(token, doc)
+                self.token_docs.setdefault(token, set()).add(doc)
+            for gram in trigrams(name):
+                self.name_trigrams.setdefault(gram, set()).add(doc)
+        for token in self.token_docs:
+            for gram in trigrams(f"${token}$"):
+                self.token_trigrams.setdefault(gram, set()).add(token)
+
+    def __len__(self) -> int:
+        return len(self.medicine_ids)
+
+    def _substring_docs(self, query: str) -> Set[int]:
+        if len(query) < 3:
+            return {doc for doc, name in enumerate(self.names) if query in name}
+        grams = sorted(trigrams(query), key=lambda g: len(self.name_trigrams.get(g, ())))
+        candidates = set(self.name_trigrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            candidates &= self.name_trigrams.get(gram, set())
+            if not candidates:
+                break
+        return {doc for doc in candidates if query in self.names[doc]}
+
+    def _exact_scores(self, word: str) -> Dict[int, float]:
+        scores = {doc: PREFIX_SCORE for doc in self.trie.prefixed(word)}
+        for doc in self.token_docs.get(word, ()):
+            scores[doc] = EXACT_SCORE
+        return scores
+
+    def _fuzzy_scores(self, word: str) -> Dict[int, float]:
+        scores = self._exact_scores(word)
+        if len(word) < MIN_FUZZY_LENGTH:
+            return scores
+        limit = 1 if len(word) <= 6 else 2
+        candidates: Set[str] = set()
+        for gram in trigrams(f"${word}"):
+            candidates |= self.token_trigrams.get(gram, set())
+        for token in candidates:
+            # Compare against the whole token and against prefixes of about
+            # the query's length, so partially typed words with a typo match
+            distance = edit_distance(word, token, limit)
+            for length in (len(word) - 1, len(word), len(word) + 1):
+                if length < len(token):
+                    distance = min(distance, edit_distance(word, token[:length], limit))
+            if distance > limit:
+                continue
+            score = FUZZY_SCORE - FUZZY_PENALTY * distance
+            for doc in self.token_docs[token]:
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = score
+        return scores
+
+    def _rank(self, query: str, word_scores: List[Dict[int, float]],
+              substring: Set[int]) -> Dict[int, float]:
+        docs = set(substring)
+        if word_scores:
+            docs |= set.intersection(*(set(s) for s in word_scores))
+        ranked = {}
+        for doc in docs:
+            score = sum(s.get(doc, 0.0) for s in word_scores) / max(1, len(word_scores))
+            if doc in substring:
+                score += SUBSTRING_BONUS
+                if self.names[doc].startswith(query):
+                    score += NAME_PREFIX_BONUS
+            ranked[doc] = score
+        return ranked
+
+    def _search(self, query: str) -> List[Tuple[int, float]]:
+        query = normalize(query)
+        if not query:
+            return []
+        words = query.split()
+
+        substring = self._substring_docs(query)
+        ranked = self._rank(query, [self._exact_scores(w) for w in words], substring)
+        if not ranked:
+            ranked = self._rank(query, [self._fuzzy_scores(w) for w in words], set())
+
+        order = sorted(ranked, key=lambda doc: (-ranked[doc], self.names[doc], self.medicine_ids[doc]))
+        return [(doc, round(ranked[doc], 4)) for doc in order]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Medicines matching a query, best first
+
+        A medicine matches when every query word is a prefix of one of its
+        name tokens or the whole query occurs in its name. If none do, words
+        may match with typos instead.
+
+        Returns:
+            List of {medicine_id, name, category, score}
+        """
+        return [
+            {
+                "medicine_id": self.medicine_ids[doc],
+                "name": self.display_names[doc],
+                "category": self.categories[doc],
+                "score": score,
+            }
+            for doc, score in self._search(query)[:limit]
+        ]
+
+    def matching_ids(self, query: str) -> List[int]:
+        """Ids of all matching medicines, best first"""
+        return [self.medicine_ids[doc] for doc, _ in self._search(query)]
@@ -0,0 +1,138 @@
+"""
+MedPredict AI - Request Tracing
+
+Every request runs inside a trace (see src/ml/timing.py). Besides the spans
+the engines and endpoints record themselves, TracedRoute splits each route
+into its FastAPI phases:
+
+- request: parameter parsing and validation
+- endpoint: the endpoint function
+- serialize: response model validation and JSON encoding
+
+The spans are returned in a Server-Timing header and can also be appended
+to a JSON-lines span log.
+"""
+
+import asyncio
+import functools
+import json
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.ml.timing import Trace, current_trace, span, span_path
+
+
+# Span entries in a Server-Timing header (the slowest ones are kept)
+SERVER_TIMING_MAX_ENTRIES = 20
+
+_INVALID_METRIC_CHARS = re.compile(r"[^A-Za-z0-9_.\-]")
+
+
+def server_timing_header(trace: Trace, total_seconds: float,
+                         max_entries: int = SERVER_TIMING_MAX_ENTRIES) -> str:
+    """
+    Format a trace as a Server-Timing header value
+
+    Repeated spans are summed into one entry whose description holds the
+    call count. Entries keep the order in which the spans first started.
+    """
+    spans = trace.aggregate()
+    if len(spans) > max_entries:
+        slowest = set(sorted(spans, key=lambda s: s[1], reverse=True)[:max_entries])
+        spans = [s for s in spans if s in slowest]
+
+    entries = [f"total;dur={total_seconds * 1000:.1f}"]
+    for path, seconds, count in spans:
+        name = _INVALID_METRIC_CHARS.sub("_", path)
+        desc = f';desc="{count} calls"' if count > 1 else ""
+        entries.append(f"{name}{desc};dur={seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class SpanLog:
+    """Appends one JSON line per finished trace to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+
+    def write(self, trace: Trace, **fields):
+        record = {"timestamp": time.time(), **fields, **trace.to_dict()}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _traced_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint function in an "endpoint" span, keeping its signature"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def traced(*args, **kwargs):
+            with span("endpoint"):
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def traced(*args, **kwargs):
+            with span("endpoint"):
+                return endpoint(*args, **kwargs)
+    return traced
+
+
+class TracedRoute(APIRoute):
+    """APIRoute recording request / endpoint / serialize spans"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _traced_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            trace = current_trace()
+            if trace is None:
+                return await handler(request)
+            start = time.perf_counter()
+            first_span = len(trace.spans)
+            response = await handler(request)
+            end = time.perf_counter()
+
+            endpoint_path = span_path("endpoint")
+            endpoint_span = next(
+                (s for s in trace.spans[first_span:] if s[0] == endpoint_path), None
+            )
+            if endpoint_span is not None:
+                trace.record(span_path("request"), start, endpoint_span[1])
+                trace.record(span_path("serialize"), endpoint_span[2], end)
+            return response
+
+        return traced_handler
+
+
+def request_trace_name(request: Request) -> str:
+    return f"{request.method} {request.url.path}"
+
+
+def finish_request_trace(trace: Trace, response: Response, span_log: Optional[SpanLog],
+                         request: Request):
+    """Add the Server-Timing header and log the trace"""
+    total = trace.elapsed()
+    response.headers["Server-Timing"] = server_timing_header(trace, total)
+    if span_log is not None:
+        span_log.write(
+            trace,
+            method=request.method,
+            path=request.url.path,
+            query=request.url.query,
+            status=response.status_code
+        )
@@ -13,8 +13,10 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-from scipy import stats as scipy_stats
-from sklearn.ensemble import IsolationForest
+
+from src.ml.predictor import as_datetime
+from src.ml.storage import ConsumptionRows
+from src.ml.timing import span, timed
 
 
 @dataclass
@@ -58,33 +60,64 @@ class AdvancedPredictor:
     - Confidence intervals
     """
     
-    def __init__(self, consumption_df: pd.DataFrame, medicines_df: pd.DataFrame):
+    @timed("advanced_engine_init")
+    def __init__(self, consumption_df: pd.DataFrame, medicines_df: pd.DataFrame,
+                 storage: Optional[ConsumptionRows] = None):
         """
         Initialize the advanced predictor
         
         Args:
             consumption_df: Historical consumption data
             medicines_df: Medicine master data
+            storage: The same consumption data in a SQLite backend; per-medicine
+                history and monthly averages are then read from it
         """
-        self.consumption_df = consumption_df.copy()
-        self.medicines_df = medicines_df.copy()
+        self.storage = storage
+        # Shallow copies, as in MedPredictEngine (the data may be read-only shared columns)
+        self.consumption_df = consumption_df.copy(deep=False)
+        self.medicines_df = medicines_df.copy(deep=False)
         
         # Convert date column
-        self.consumption_df['date'] = pd.to_datetime(self.consumption_df['date'])
+        with span("date_conversion"):
+            self.consumption_df['date'] = as_datetime(self.consumption_df['date'])
         
         # Pre-compute statistics
         self._compute_statistics()
+        
+        # Lazily built inputs for forecast_batch and memoized recent anomaly counts
+        self._forecast_inputs: Optional[pd.DataFrame] = None
+        self._anomaly_counts: Dict[int, int] = {}
     
-    def _compute_statistics(self):
-        """Pre-compute statistical measures for each medicine"""
-        self.medicine_stats = {}
-        
-        for med_id in self.consumption_df['medicine_id'].unique():
-            med_data = self.consumption_df[
-                self.consumption_df['medicine_id'] == med_id
-            ].sort_values('date')
+    @timed("_compute_statistics")
+    def _compute_statistics(self, medicine_ids: Optional[List[int]] = None):
+        """
+        Pre-compute statistical measures for each medicine
+        
+        Args:
+            medicine_ids: Only recompute these medicines, keeping the rest
+        """
+        # scipy is slow to import; load it when statistics are first computed
+        from scipy import stats as scipy_stats
+        
+        if self.storage is not None:
+            all_ids = self.storage.medicine_ids()
+            monthly_averages = self.storage.monthly_averages(medicine_ids)
+        else:
+            all_ids = self.consumption_df['medicine_id'].unique()
+            monthly_averages = None
+        if medicine_ids is None:
+            self.medicine_stats = {}
+            med_ids = all_ids
+        else:
+            # New dict, so a copy of this predictor never shares its stats
+            self.medicine_stats = dict(self.medicine_stats)
+            med_ids = medicine_ids
+        
+        for med_id in med_ids:
+            med_data = self._medicine_history(med_id)
             
             if len(med_data) < 30:  # Need minimum data points
+                self.medicine_stats.pop(med_id, None)
                 continue
             
             quantities = med_data['quantity_dispensed'].values
@@ -114,9 +147,12 @@ class AdvancedPredictor:
                 annual_growth = 0
             
             # Seasonal patterns (by month)
-            med_data_copy = med_data.copy()
-            med_data_copy['month'] = med_data_copy['date'].dt.month
-            monthly_avg = med_data_copy.groupby('month')['quantity_dispensed'].mean()
+            if monthly_averages is not None:
+                monthly_avg = monthly_averages[int(med_id)]
+            else:
+                med_data_copy = med_data.copy()
+                med_data_copy['month'] = med_data_copy['date'].dt.month
+                monthly_avg = med_data_copy.groupby('month')['quantity_dispensed'].mean()
             overall_avg = mean_qty
             
             seasonal_factors = {}
@@ -136,7 +172,51 @@ class AdvancedPredictor:
                 'r_squared': r_value ** 2,
                 'data_points': len(quantities)
             }
+        
+        if medicine_ids is not None:
+            # Keep first-appearance order, as a full computation would
+            self.medicine_stats = {
+                med_id: self.medicine_stats[med_id] for med_id in all_ids if med_id in self.medicine_stats
+            }
+    
+    def _medicine_history(self, medicine_id: int) -> pd.DataFrame:
+        """One medicine's consumption rows ordered by date"""
+        if self.storage is not None:
+            return self.storage.history(medicine_id)
+        return self.consumption_df[
+            self.consumption_df['medicine_id'] == medicine_id
+        ].sort_values('date')
     
+    def append_consumption(self, rows: pd.DataFrame,
+                           storage: Optional[ConsumptionRows] = None) -> List[int]:
+        """
+        Add new consumption log rows, recomputing only the medicines they touch
+        
+        Attributes are replaced rather than modified in place, so a shallow
+        copy of the predictor can be updated while the original keeps serving.
+        
+        Args:
+            rows: New consumption log rows (same columns as the log)
+            storage: The storage backend's data including the new rows (None
+                reads consumption_df from now on)
+            
+        Returns:
+            Sorted ids of medicines with new consumption
+        """
+        self.storage = storage
+        rows = rows.copy()
+        rows['date'] = pd.to_datetime(rows['date'])
+        self.consumption_df = pd.concat([self.consumption_df, rows], ignore_index=True)
+        
+        affected = sorted(int(m) for m in rows['medicine_id'].unique())
+        self._compute_statistics(affected)
+        self._anomaly_counts = {
+            med_id: count for med_id, count in self._anomaly_counts.items() if med_id not in affected
+        }
+        self._forecast_inputs = None
+        return affected
+    
+    @timed("forecast")
     def forecast(self, medicine_id: int, days: int = 30, 
                  confidence_level: float = 0.95) -> Optional[ForecastResult]:
         """
@@ -150,6 +230,8 @@ class AdvancedPredictor:
         Returns:
             ForecastResult with prediction and intervals
         """
+        from scipy import stats as scipy_stats
+        
         if medicine_id not in self.medicine_stats:
             return None
         
@@ -185,9 +267,6 @@ class AdvancedPredictor:
         # Confidence score based on data quality
         confidence = min(0.95, med_stats['r_squared'] * 0.5 + 0.5 * (med_stats['data_points'] / 365))
         
-        # Detect anomalies in recent data
-        anomalies = self.detect_anomalies(medicine_id, days=30)
-        
         return ForecastResult(
             medicine_id=medicine_id,
             medicine_name=medicine_name,
@@ -199,9 +278,100 @@ class AdvancedPredictor:
             trend=med_stats['trend'],
             growth_rate=round(med_stats['growth_rate'], 1),
             seasonality_factor=round(seasonal_factor, 2),
-            anomalies_detected=len(anomalies)
+            anomalies_detected=self._recent_anomaly_count(medicine_id)
         )
     
+    def _recent_anomaly_count(self, medicine_id: int) -> int:
+        """Anomalies in the last 30 days of data (fixed per dataset, so memoized)"""
+        count = self._anomaly_counts.get(medicine_id)
+        if count is None:
+            count = len(self.detect_anomalies(medicine_id, days=30))
+            self._anomaly_counts[medicine_id] = count
+        return count
+    
+    def _get_forecast_inputs(self) -> pd.DataFrame:
+        """Per-medicine forecast statistics as one frame (medicines in the master only)"""
+        if self._forecast_inputs is None:
+            rows = []
+            for med_id, med_stats in self.medicine_stats.items():
+                row = {
+                    'medicine_id': med_id,
+                    'mean': med_stats['mean'],
+                    'std': med_stats['std'],
+                    'slope': med_stats['slope'],
+                    'trend': med_stats['trend'],
+                    'growth_rate': round(med_stats['growth_rate'], 1),
+                    'confidence': round(min(0.95, med_stats['r_squared'] * 0.5 + 0.5 * (med_stats['data_points'] / 365)), 2),
+                }
+                for month in range(1, 13):
+                    row[f'season_{month}'] = med_stats['seasonal_factors'][month]
+                rows.append(row)
+            
+            names = self.medicines_df[['medicine_id', 'name']].drop_duplicates('medicine_id')
+            inputs = pd.DataFrame(rows).merge(names, on='medicine_id', how='inner')
+            self._forecast_inputs = inputs.rename(columns={'name': 'medicine_name'}).set_index('medicine_id')
+        return self._forecast_inputs
+    
+    def forecast_batch(self, medicine_ids: Optional[List[int]] = None,
+                       horizons: Tuple[int, ...] = (30,),
+                       confidence_levels: Tuple[float, ...] = (0.95,)) -> pd.DataFrame:
+        """
+        Forecast many medicines, horizons and confidence levels at once
+        
+        Uses the same model as forecast(), evaluated with NumPy broadcasting over
+        the (medicine, horizon, confidence level) grid.
+        
+        Args:
+            medicine_ids: Medicines to forecast (None for all with enough history)
+            horizons: Forecast lengths in days
+            confidence_levels: Confidence levels for intervals (0.0-1.0)
+            
+        Returns:
+            DataFrame with one row per combination, medicine-major. Medicines
+            that cannot be forecast are left out.
+        """
+        from scipy import stats as scipy_stats
+        
+        inputs = self._get_forecast_inputs()
+        if medicine_ids is not None:
+            positions = inputs.index.get_indexer(pd.Index(medicine_ids))
+            inputs = inputs.iloc[positions[positions >= 0]]
+        
+        days = np.asarray(horizons, dtype=float)
+        levels = np.asarray(confidence_levels, dtype=float)
+        n_meds, n_days, n_levels = len(inputs), len(days), len(levels)
+        
+        mean = inputs['mean'].to_numpy()[:, None]
+        slope = inputs['slope'].to_numpy()[:, None]
+        std = inputs['std'].to_numpy()[:, None, None]
+        seasonal = inputs[f'season_{datetime.now().month}'].to_numpy()
+        
+        # (medicines, horizons)
+        predicted = np.maximum(0, np.trunc((mean * days + slope * days * (days / 2)) * seasonal[:, None]))
+        # (medicines, horizons, levels)
+        z_scores = scipy_stats.norm.ppf((1 + levels) / 2)
+        margin = z_scores * std * np.sqrt(days)[None, :, None]
+        lower = np.maximum(0, np.trunc(predicted[:, :, None] - margin))
+        upper = np.trunc(predicted[:, :, None] + margin)
+        
+        per_medicine = n_days * n_levels
+        anomalies = np.array([self._recent_anomaly_count(med_id) for med_id in inputs.index], dtype=int)
+        
+        return pd.DataFrame({
+            'medicine_id': np.repeat(inputs.index.to_numpy(), per_medicine),
+            'medicine_name': np.repeat(inputs['medicine_name'].to_numpy(), per_medicine),
+            'forecast_days': np.tile(np.repeat(days.astype(int), n_levels), n_meds),
+            'confidence_level': np.tile(levels, n_meds * n_days),
+            'predicted_quantity': np.repeat(predicted.reshape(-1), n_levels).astype(int),
+            'lower_bound': lower.reshape(-1).astype(int),
+            'upper_bound': upper.reshape(-1).astype(int),
+            'confidence': np.repeat(inputs['confidence'].to_numpy(), per_medicine),
+            'trend': np.repeat(inputs['trend'].to_numpy(), per_medicine),
+            'growth_rate': np.repeat(inputs['growth_rate'].to_numpy(), per_medicine),
+            'seasonality_factor': np.repeat([round(f, 2) for f in seasonal.tolist()], per_medicine),
+            'anomalies_detected': np.repeat(anomalies, per_medicine),
+        })
+    
     def detect_anomalies(self, medicine_id: int, days: int = 90,
                          threshold: float = 2.5) -> List[AnomalyResult]:
         """
@@ -215,9 +385,7 @@ class AdvancedPredictor:
         Returns:
             List of detected anomalies
         """
-        med_data = self.consumption_df[
-            self.consumption_df['medicine_id'] == medicine_id
-        ].sort_values('date')
+        med_data = self._medicine_history(medicine_id)
         
         if len(med_data) < 30:
             return []
@@ -305,9 +473,7 @@ class AdvancedPredictor:
             return None
         
         # Get consumption history for visualization
-        med_data = self.consumption_df[
-            self.consumption_df['medicine_id'] == medicine_id
-        ].sort_values('date')
+        med_data = self._medicine_history(medicine_id)
         
         # Weekly aggregation
         med_data_copy = med_data.copy()
@@ -10,9 +10,23 @@ This module provides:
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from dataclasses import dataclass
 
+from src.ml.storage import ConsumptionRows
+from src.ml.timing import span, timed
+
+
+# Days of history behind the average daily consumption
+RECENT_DAYS = 90
+
+
+def as_datetime(values: pd.Series) -> pd.Series:
+    """Parse a date column (columns that are already dates are returned as they are)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values)
+
 
 @dataclass
 class ExpiryRisk:
@@ -56,8 +70,9 @@ class MedPredictEngine:
     - Identifies stockout risks
     """
     
+    @timed("engine_init")
     def __init__(self, consumption_df: pd.DataFrame, inventory_df: pd.DataFrame, 
-                 medicines_df: pd.DataFrame):
+                 medicines_df: pd.DataFrame, storage: Optional[ConsumptionRows] = None):
         """
         Initialize the prediction engine
         
@@ -65,41 +80,41 @@ class MedPredictEngine:
             consumption_df: Historical consumption log
             inventory_df: Current inventory snapshot
             medicines_df: Medicine master data
+            storage: The same consumption log in a SQLite backend; aggregates
+                are then computed by SQL instead of from consumption_df
         """
-        self.consumption_df = consumption_df.copy()
-        self.inventory_df = inventory_df.copy()
-        self.medicines_df = medicines_df.copy()
+        self.storage = storage
+        # Shallow copies: the frames may be read-only memory-mapped columns
+        # shared with other workers. Columns are replaced, never written in place.
+        self.consumption_df = consumption_df.copy(deep=False)
+        self.inventory_df = inventory_df.copy(deep=False)
+        self.medicines_df = medicines_df.copy(deep=False)
         
         # Convert date columns
-        self.consumption_df['date'] = pd.to_datetime(self.consumption_df['date'])
-        self.inventory_df['expiry_date'] = pd.to_datetime(self.inventory_df['expiry_date'])
+        with span("date_conversion"):
+            self.consumption_df['date'] = as_datetime(self.consumption_df['date'])
+            self.inventory_df['expiry_date'] = as_datetime(self.inventory_df['expiry_date'])
         
         # Calculate consumption statistics
-        self._calculate_consumption_stats()
+        with span("consumption_stats"):
+            self._calculate_consumption_stats()
     
     def _calculate_consumption_stats(self):
         """Calculate consumption statistics for each medicine"""
-        # Get last 90 days of data for recent trends
-        max_date = self.consumption_df['date'].max()
-        recent_cutoff = max_date - timedelta(days=90)
-        recent_data = self.consumption_df[self.consumption_df['date'] >= recent_cutoff]
+        if self.storage is not None:
+            recent_stats, monthly_data = self.storage.window_aggregates(RECENT_DAYS)
+        else:
+            recent_stats, monthly_data = self._window_aggregates(RECENT_DAYS)
         
         # Calculate daily averages
-        self.daily_consumption = recent_data.groupby('medicine_id').agg({
-            'quantity_dispensed': ['mean', 'std', 'sum', 'count']
-        }).round(2)
+        self.daily_consumption = recent_stats.round(2)
         self.daily_consumption.columns = ['avg_daily', 'std_daily', 'total_90d', 'days_with_data']
         self.daily_consumption = self.daily_consumption.reset_index()
         
         # Calculate weekly consumption
         self.daily_consumption['avg_weekly'] = (self.daily_consumption['avg_daily'] * 7).round(0)
         
-        # Get seasonal patterns (current month)
-        current_month = max_date.month
-        monthly_data = self.consumption_df[
-            self.consumption_df['date'].dt.month == current_month
-        ].groupby('medicine_id')['quantity_dispensed'].mean()
-        
+        # Seasonal patterns (current month)
         self.daily_consumption = self.daily_consumption.merge(
             monthly_data.reset_index().rename(columns={'quantity_dispensed': 'seasonal_avg'}),
             on='medicine_id',
@@ -111,6 +126,64 @@ class MedPredictEngine:
             self.daily_consumption['seasonal_avg'] / self.daily_consumption['avg_daily']
         ).fillna(1.0).clip(0.5, 2.0)
     
+    def _window_aggregates(self, days: int) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Mean, std, sum and count of each medicine's consumption over the last
+        `days` days, and its mean in the current month across all years
+        """
+        # Get the most recent data for recent trends
+        max_date = self.consumption_df['date'].max()
+        recent_cutoff = max_date - timedelta(days=days)
+        recent_data = self.consumption_df[self.consumption_df['date'] >= recent_cutoff]
+        recent_stats = recent_data.groupby('medicine_id')['quantity_dispensed'].agg(
+            ['mean', 'std', 'sum', 'count']
+        )
+        
+        # Get seasonal patterns (current month)
+        current_month = max_date.month
+        monthly_data = self.consumption_df[
+            self.consumption_df['date'].dt.month == current_month
+        ].groupby('medicine_id')['quantity_dispensed'].mean()
+        return recent_stats, monthly_data
+    
+    def append_consumption(self, rows: pd.DataFrame, storage: Optional[ConsumptionRows] = None):
+        """
+        Add new consumption log rows and recompute consumption statistics
+        
+        Args:
+            rows: New consumption log rows (same columns as the log)
+            storage: The storage backend's log including the new rows (None
+                reads consumption_df from now on)
+        """
+        self.storage = storage
+        rows = rows.copy()
+        rows['date'] = pd.to_datetime(rows['date'])
+        self.consumption_df = pd.concat([self.consumption_df, rows], ignore_index=True)
+        self._calculate_consumption_stats()
+    
+    def replace_inventory(self, inventory_df: pd.DataFrame) -> List[int]:
+        """
+        Swap in a new inventory snapshot without touching consumption data
+        
+        Args:
+            inventory_df: Full inventory (same columns as current_inventory.csv)
+            
+        Returns:
+            Sorted ids of medicines whose batches differ from the previous inventory
+        """
+        inventory_df = inventory_df.copy()
+        inventory_df['expiry_date'] = pd.to_datetime(inventory_df['expiry_date'])
+        
+        old, new = self.inventory_df, inventory_df
+        if list(old.columns) == list(new.columns):
+            merged = old.merge(new, how='outer', indicator=True)
+            affected = merged.loc[merged['_merge'] != 'both', 'medicine_id'].unique()
+        else:
+            affected = pd.concat([old['medicine_id'], new['medicine_id']]).unique()
+        
+        self.inventory_df = inventory_df
+        return sorted(int(m) for m in affected)
+    
     def predict_consumption(self, medicine_id: int, days: int = 30) -> Tuple[int, float]:
         """
         Predict consumption for a medicine over specified days
@@ -143,13 +216,16 @@ class MedPredictEngine:
         
         return predicted, confidence
     
+    @timed("calculate_expiry_risks")
     def calculate_expiry_risks(self, 
-                               reference_date: Optional[datetime] = None) -> List[ExpiryRisk]:
+                               reference_date: Optional[datetime] = None,
+                               medicine_ids: Optional[Iterable[int]] = None) -> List[ExpiryRisk]:
         """
         Calculate expiry risk for all inventory batches
         
         Args:
             reference_date: Date to calculate from (defaults to today)
+            medicine_ids: Only calculate for these medicines (defaults to all)
             
         Returns:
             List of ExpiryRisk objects sorted by risk score
@@ -157,9 +233,13 @@ class MedPredictEngine:
         if reference_date is None:
             reference_date = datetime.now()
         
+        inventory = self.inventory_df
+        if medicine_ids is not None:
+            inventory = inventory[inventory['medicine_id'].isin(list(medicine_ids))]
+        
         risks = []
         
-        for _, batch in self.inventory_df.iterrows():
+        for _, batch in inventory.iterrows():
             medicine_id = batch['medicine_id']
             medicine_name = batch['medicine_name']
             batch_no = batch['batch_no']
@@ -244,13 +324,16 @@ class MedPredictEngine:
         else:
             return "Stock level healthy. Continue normal dispensing."
     
+    @timed("calculate_stockout_risks")
     def calculate_stockout_risks(self, 
-                                 reference_date: Optional[datetime] = None) -> List[StockoutRisk]:
+                                 reference_date: Optional[datetime] = None,
+                                 medicine_ids: Optional[Iterable[int]] = None) -> List[StockoutRisk]:
         """
         Calculate stockout risk for all medicines
         
         Args:
             reference_date: Date to calculate from
+            medicine_ids: Only calculate for these medicines (defaults to all)
             
         Returns:
             List of StockoutRisk objects sorted by days until stockout
@@ -258,10 +341,14 @@ class MedPredictEngine:
         if reference_date is None:
             reference_date = datetime.now()
         
+        inventory = self.inventory_df
+        if medicine_ids is not None:
+            inventory = inventory[inventory['medicine_id'].isin(list(medicine_ids))]
+        
         risks = []
         
         # Aggregate current stock by medicine
-        current_stock = self.inventory_df.groupby('medicine_id').agg({
+        current_stock = inventory.groupby('medicine_id').agg({
             'quantity': 'sum',
             'medicine_name': 'first'
         }).reset_index()
@@ -323,18 +410,74 @@ class MedPredictEngine:
         risks.sort(key=lambda x: x.days_until_stockout)
         return risks
     
-    def get_dashboard_summary(self, reference_date: Optional[datetime] = None) -> Dict:
+    def apply_inventory_delta(self, delta: pd.DataFrame) -> List[int]:
+        """
+        Upsert inventory batches keyed by (medicine_id, batch_no)
+        
+        Updated batches keep their position, new batches are appended and rows
+        with quantity 0 remove the batch. Columns missing from the delta are
+        taken from the existing batch, then from the medicine master. The
+        inventory frame is replaced rather than modified in place, so callers
+        still holding the previous frame are unaffected.
+        
+        Args:
+            delta: Rows with at least medicine_id, batch_no, quantity, expiry_date
+            
+        Returns:
+            Sorted ids of medicines whose inventory changed
+        """
+        if delta.empty:
+            return []
+        
+        key = ['medicine_id', 'batch_no']
+        current = self.inventory_df.set_index(key)
+        delta = delta.drop_duplicates(key, keep='last').set_index(key)
+        
+        master = self.medicines_df.rename(columns={'name': 'medicine_name'}).set_index('medicine_id')
+        master = master[[c for c in ('medicine_name', 'category', 'unit', 'unit_cost_inr') if c in master.columns]]
+        from_master = master.reindex(delta.index.get_level_values('medicine_id'))
+        from_master.index = delta.index
+        
+        rows = delta.reindex(columns=current.columns)
+        rows = rows.fillna(current.reindex(delta.index)).fillna(from_master)
+        if 'received_date' in rows.columns:
+            rows['received_date'] = rows['received_date'].fillna(datetime.now().strftime('%Y-%m-%d'))
+        if 'total_value_inr' in rows.columns:
+            rows['total_value_inr'] = (rows['quantity'] * rows['unit_cost_inr']).round(2)
+        rows = rows.astype(current.dtypes.to_dict())
+        
+        existing = rows.index.isin(current.index)
+        updated = current.copy()
+        updated.loc[rows.index[existing]] = rows[existing]
+        updated = pd.concat([updated, rows[~existing]])
+        
+        removed = rows.index[rows['quantity'] == 0]
+        updated = updated.drop(index=removed, errors='ignore')
+        
+        self.inventory_df = updated.reset_index()[self.inventory_df.columns]
+        return sorted(int(m) for m in delta.index.get_level_values('medicine_id').unique())
+    
+    def get_dashboard_summary(self, reference_date: Optional[datetime] = None,
+                              expiry_risks: Optional[List[ExpiryRisk]] = None,
+                              stockout_risks: Optional[List[StockoutRisk]] = None) -> Dict:
         """
         Get summary statistics for dashboard
         
+        Args:
+            reference_date: Date to calculate from (defaults to today)
+            expiry_risks: Precomputed expiry risks (calculated if not given)
+            stockout_risks: Precomputed stockout risks (calculated if not given)
+        
         Returns:
             Dictionary with key metrics
         """
         if reference_date is None:
             reference_date = datetime.now()
         
-        expiry_risks = self.calculate_expiry_risks(reference_date)
-        stockout_risks = self.calculate_stockout_risks(reference_date)
+        if expiry_risks is None:
+            expiry_risks = self.calculate_expiry_risks(reference_date)
+        if stockout_risks is None:
+            stockout_risks = self.calculate_stockout_risks(reference_date)
         
         # Expiry summary
         total_at_risk_value = sum(r.potential_loss for r in expiry_risks)
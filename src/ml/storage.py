@@ -0,0 +1,472 @@
+"""
+MedPredict AI - SQLite Storage Backend
+
+An embedded SQLite file holding the consumption log, indexed on
+(medicine_id, date). The engines can read through it instead of scanning
+their frames:
+
+- 90-day window aggregates and the current month's averages (MedPredictEngine)
+- per-medicine history and monthly averages (AdvancedPredictor)
+
+Inventory and the medicine master stay in memory only: they are small, and
+inventory uploads create new in-memory versions that a table would have to
+track.
+
+Rows are bulk-inserted, one transaction per load. Consumption rows are
+never updated: every load or append covers a range of row ids, and a
+ConsumptionRows view only reads its own range, so an engine keeps seeing the
+data it was built from while newer rows are added or a new version of the
+log is loaded next to it. Each process leases the ranges its views read; rows
+of older versions are deleted once no live process holds a lease on them.
+Each dataset records the content digest of the file it came from, so
+processes sharing the file load it once, and an append is applied once
+however many of them see it.
+
+The backend moves the aggregate work into SQL; it does not replace the
+frames. DataStore still loads every file in full for the API's in-memory
+indexes, exports and detail views, so memory use does not go down.
+
+Build a database from the CSV files with migrate_to_sqlite.py.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Dataset name -> (table, [(column, SQL type)], date columns)
+TABLES: Dict[str, Tuple[str, List[Tuple[str, str]], Tuple[str, ...]]] = {
+    "consumption": ("consumption", [
+        ("date", "TEXT NOT NULL"),
+        ("medicine_id", "INTEGER NOT NULL"),
+        ("quantity_dispensed", "INTEGER NOT NULL"),
+        ("patient_count", "INTEGER"),
+    ], ("date",)),
+}
+
+# Dataset name -> [(index name, columns)]
+INDEXES: Dict[str, List[Tuple[str, str]]] = {
+    "consumption": [("consumption_medicine_date", "medicine_id, date")],
+}
+
+# Rows per executemany call during bulk inserts
+INSERT_BATCH_ROWS = 50_000
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class StorageConflict(Exception):
+    """The stored data is not the version an append was based on"""
+
+
+def _sql_values(frame: pd.DataFrame, columns: List[str], dates: Tuple[str, ...]) -> List[list]:
+    """Columns as lists of Python values (dates as ISO strings, missing as None)"""
+    values = []
+    for column in columns:
+        if column not in frame.columns:
+            values.append([None] * len(frame))
+            continue
+        series = frame[column]
+        if column in dates:
+            series = pd.to_datetime(series).dt.strftime(DATE_FORMAT)
+        series = series.astype(object).where(series.notna(), None)
+        values.append(series.tolist())
+    return values
+
+
+class SQLiteStorage:
+    """
+    The consumption log in one SQLite file
+
+    Args:
+        path: Database file (created with its tables if missing)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Leases: this instance's id, ranges leased in the database, live views
+        # per range, and ranges of views that were garbage collected
+        self._owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._leased: Set[Tuple[int, int]] = set()
+        self._views: Dict[Tuple[int, int], int] = {}
+        self._dropped: Deque[Tuple[int, int]] = deque()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS dataset_meta ("
+                "name TEXT PRIMARY KEY, digest TEXT, first_id INTEGER, last_id INTEGER, "
+                "rows INTEGER, loaded_at REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS range_leases ("
+                "owner TEXT NOT NULL, pid INTEGER NOT NULL, first_id INTEGER NOT NULL, "
+                "last_id INTEGER NOT NULL, PRIMARY KEY (owner, first_id, last_id))"
+            )
+            for name, (table, columns, _) in TABLES.items():
+                definition = ", ".join(f"{column} {kind}" for column, kind in columns)
+                db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {definition})"
+                )
+                self._create_indexes(db, name)
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (SQLite connections are not shared between threads)"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def _create_indexes(db: sqlite3.Connection, name: str):
+        table = TABLES[name][0]
+        for index, columns in INDEXES[name]:
+            db.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})")
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, name: str, frame: pd.DataFrame) -> int:
+        table, columns, dates = TABLES[name]
+        names = [column for column, _ in columns]
+        statement = (
+            f"INSERT INTO {table} ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+        for start in range(0, len(frame), INSERT_BATCH_ROWS):
+            chunk = frame.iloc[start:start + INSERT_BATCH_ROWS]
+            db.executemany(statement, zip(*_sql_values(chunk, names, dates)))
+        return len(frame)
+
+    @staticmethod
+    def _meta(db: sqlite3.Connection, name: str) -> Optional[Tuple[str, int, int]]:
+        return db.execute(
+            "SELECT digest, first_id, last_id FROM dataset_meta WHERE name = ?", (name,)
+        ).fetchone()
+
+    @staticmethod
+    def _last_id(db: sqlite3.Connection, table: str) -> int:
+        return db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    def _record(self, db: sqlite3.Connection, name: str, digest: str, first_id: int, last_id: int):
+        rows = db.execute(
+            f"SELECT COUNT(*) FROM {TABLES[name][0]} WHERE id BETWEEN ? AND ?", (first_id, last_id)
+        ).fetchone()[0]
+        db.execute(
+            "INSERT OR REPLACE INTO dataset_meta VALUES (?, ?, ?, ?, ?, ?)",
+            (name, digest, first_id, last_id, rows, time.time())
+        )
+
+    def digest(self, name: str) -> Optional[str]:
+        """Content digest of the file a dataset was last loaded from"""
+        meta = self._meta(self._connection(), name)
+        return meta[0] if meta is not None else None
+
+    def replace(self, name: str, chunks: Iterable[pd.DataFrame], digest: str) -> Tuple[int, int]:
+        """
+        Load a new version of a dataset next to the old one (bulk insert,
+        indexes rebuilt once at the end)
+
+        Args:
+            name: Dataset name ("consumption")
+            chunks: The new rows, in one or more frames
+            digest: Content digest of the source file
+
+        Returns:
+            (first, last) row ids of the new rows
+        """
+        with self._transaction() as db:
+            return self._replace(db, name, chunks, digest)
+
+    def _replace(self, db: sqlite3.Connection, name: str, chunks: Iterable[pd.DataFrame],
+                 digest: str) -> Tuple[int, int]:
+        table = TABLES[name][0]
+        for index, _ in INDEXES[name]:
+            db.execute(f"DROP INDEX IF EXISTS {index}")
+        # Ids are never reused (AUTOINCREMENT): the new rows follow every older range
+        sequence = db.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        first_id = (sequence[0] if sequence else 0) + 1
+        for chunk in chunks:
+            self._insert(db, name, chunk)
+        self._create_indexes(db, name)
+        last_id = self._last_id(db, table)
+        if last_id < first_id:
+            last_id = first_id - 1
+        self._record(db, name, digest, first_id, last_id)
+        return self._settle(db, name, first_id, last_id)
+
+    def _settle(self, db: sqlite3.Connection, name: str, first_id: int, last_id: int) -> Tuple[int, int]:
+        """
+        Lease the range a write returns and delete rows no live lease covers
+        (inside the write's transaction, so no other process can delete the
+        range before it is leased)
+        """
+        self._release_dropped(db)
+        self._lease(db, (first_id, last_id))
+        self._collect(db, name, first_id)
+        return first_id, last_id
+
+    def _lease(self, db: sqlite3.Connection, rows: Tuple[int, int]):
+        with self._lock:
+            if rows in self._leased:
+                return
+            self._leased.add(rows)
+        db.execute("INSERT OR IGNORE INTO range_leases VALUES (?, ?, ?, ?)",
+                   (self._owner, os.getpid(), *rows))
+
+    def _release_dropped(self, db: sqlite3.Connection):
+        """Give up the leases of ranges whose views were all garbage collected"""
+        released = []
+        with self._lock:
+            while self._dropped:
+                rows = self._dropped.popleft()
+                self._views[rows] -= 1
+                if self._views[rows] == 0:
+                    del self._views[rows]
+                    self._leased.discard(rows)
+                    released.append(rows)
+        for first_id, last_id in released:
+            db.execute("DELETE FROM range_leases WHERE owner = ? AND first_id = ? AND last_id = ?",
+                       (self._owner, first_id, last_id))
+
+    @staticmethod
+    def _collect(db: sqlite3.Connection, name: str, current_first_id: int):
+        """Delete rows of older versions that no live process still reads"""
+        table = TABLES[name][0]
+        oldest = db.execute(f"SELECT MIN(id) FROM {table}").fetchone()[0]
+        if oldest is None or oldest >= current_first_id:
+            return
+        for pid, in db.execute("SELECT DISTINCT pid FROM range_leases").fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                db.execute("DELETE FROM range_leases WHERE pid = ?", (pid,))
+            except OSError:
+                pass  # alive, owned by another user
+        db.execute(
+            f"DELETE FROM {table} WHERE id < ? AND NOT EXISTS ("
+            f"SELECT 1 FROM range_leases l WHERE {table}.id BETWEEN l.first_id AND l.last_id)",
+            (current_first_id,)
+        )
+
+    def load(self, name: str, frame: pd.DataFrame, digest: str) -> Tuple[int, int]:
+        """
+        Make a dataset hold `frame`, unless it already holds this file version
+
+        Returns:
+            (first, last) row ids of the dataset
+        """
+        with self._transaction() as db:
+            meta = self._meta(db, name)
+            if meta is not None and meta[0] == digest:
+                return self._settle(db, name, meta[1], meta[2])
+            return self._replace(db, name, [frame], digest)
+
+    def append(self, name: str, rows: pd.DataFrame, previous_digest: str, digest: str) -> Tuple[int, int]:
+        """
+        Append rows that grew the source file from `previous_digest` to `digest`
+
+        Rows already appended (by another process) are not inserted again.
+
+        Returns:
+            (first, last) row ids of the dataset after the append
+
+        Raises:
+            StorageConflict: The dataset holds neither version of the file
+        """
+        table = TABLES[name][0]
+        with self._transaction() as db:
+            meta = self._meta(db, name)
+            if meta is not None and meta[0] == digest:
+                return self._settle(db, name, meta[1], meta[2])
+            if meta is None or meta[0] != previous_digest:
+                raise StorageConflict(f"{name} is not at the version the rows were appended to")
+            self._insert(db, name, rows)
+            last_id = self._last_id(db, table)
+            self._record(db, name, digest, meta[1], last_id)
+            return self._settle(db, name, meta[1], last_id)
+
+    def collect(self):
+        """Release the leases of collected views and delete rows no live lease covers"""
+        with self._transaction() as db:
+            self._release_dropped(db)
+            meta = self._meta(db, "consumption")
+            if meta is not None:
+                self._collect(db, "consumption", meta[1])
+
+    def consumption(self, first_id: Optional[int] = None, last_id: Optional[int] = None) -> "ConsumptionRows":
+        """
+        View of the consumption log (by default, its current rows)
+
+        The range stays leased, so its rows are kept, until the view and every
+        other view of the same range have been garbage collected.
+        """
+        rows = (first_id, last_id)
+        if first_id is None or last_id is None or rows not in self._leased:
+            with self._transaction() as db:
+                if first_id is None or last_id is None:
+                    meta = self._meta(db, "consumption")
+                    first_id, last_id = (meta[1], meta[2]) if meta is not None else (1, 0)
+                    rows = (first_id, last_id)
+                self._lease(db, rows)
+        view = ConsumptionRows(self, first_id, last_id)
+        with self._lock:
+            self._views[rows] = self._views.get(rows, 0) + 1
+        weakref.finalize(view, self._dropped.append, rows)
+        return view
+
+    def query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        return self._connection().execute(sql, parameters).fetchall()
+
+    def row_counts(self) -> Dict[str, int]:
+        return {name: rows for name, rows in self.query("SELECT name, rows FROM dataset_meta")
+                if name in TABLES}
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error), so concurrent writers queue up"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
+
+
+@dataclass(frozen=True)
+class ConsumptionRows:
+    """
+    The consumption log rows with ids first_id..last_id
+
+    What an engine built from a given version of the log reads; rows appended
+    later are outside the range.
+    """
+    storage: SQLiteStorage
+    first_id: int
+    last_id: int
+
+    @property
+    def _range(self) -> Tuple[int, int]:
+        return self.first_id, self.last_id
+
+    def max_date(self) -> Optional[pd.Timestamp]:
+        row = self.storage.query(
+            "SELECT MAX(date) FROM consumption WHERE id BETWEEN ? AND ?", self._range
+        )[0]
+        return pd.Timestamp(row[0]) if row[0] is not None else None
+
+    def window_aggregates(self, days: int) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Per medicine aggregates for MedPredictEngine
+
+        Returns:
+            - mean, std (sample), sum and count of quantity_dispensed over the
+              last `days` days of the log, indexed by medicine_id
+            - mean quantity in the calendar month of the last logged day, over
+              all years
+        """
+        max_date = self.max_date()
+        if max_date is None:
+            empty = pd.DataFrame(columns=["mean", "std", "sum", "count"], index=pd.Index([], name="medicine_id"))
+            return empty, pd.Series(dtype=float, name="quantity_dispensed")
+        cutoff = (max_date - timedelta(days=days)).strftime(DATE_FORMAT)
+        # Two passes (mean, then squared deviations), as pandas computes std
+        rows = self.storage.query(
+            "WITH recent AS ("
+            "  SELECT medicine_id, quantity_dispensed AS q FROM consumption"
+            "  WHERE id BETWEEN ? AND ? AND date >= ?"
+            "), totals AS ("
+            "  SELECT medicine_id, AVG(q) AS mean, SUM(q) AS total, COUNT(*) AS n"
+            "  FROM recent GROUP BY medicine_id"
+            ") "
+            "SELECT t.medicine_id, t.mean, SUM((r.q - t.mean) * (r.q - t.mean)), t.total, t.n "
+            "FROM recent r JOIN totals t ON r.medicine_id = t.medicine_id "
+            "GROUP BY t.medicine_id ORDER BY t.medicine_id",
+            (*self._range, cutoff)
+        )
+        window = pd.DataFrame(
+            [(m, mean, math.sqrt(squares / (n - 1)) if n > 1 else np.nan, total, n)
+             for m, mean, squares, total, n in rows],
+            columns=["medicine_id", "mean", "std", "sum", "count"]
+        ).astype({"medicine_id": "int32", "sum": "int64", "count": "int64"}).set_index("medicine_id")
+
+        monthly = self.storage.query(
+            "SELECT medicine_id, AVG(quantity_dispensed) FROM consumption "
+            "WHERE id BETWEEN ? AND ? AND CAST(substr(date, 6, 2) AS INTEGER) = ? "
+            "GROUP BY medicine_id ORDER BY medicine_id",
+            (*self._range, max_date.month)
+        )
+        month_avg = pd.Series(
+            [avg for _, avg in monthly],
+            index=pd.Index([m for m, _ in monthly], dtype="int32", name="medicine_id"),
+            name="quantity_dispensed", dtype=float
+        )
+        return window, month_avg
+
+    def medicine_ids(self) -> np.ndarray:
+        """Medicines in the log, in order of first appearance"""
+        rows = self.storage.query(
+            "SELECT medicine_id FROM consumption WHERE id BETWEEN ? AND ? "
+            "GROUP BY medicine_id ORDER BY MIN(id)",
+            self._range
+        )
+        return np.array([m for m, in rows], dtype=np.int32)
+
+    def monthly_averages(self, medicine_ids: Optional[Iterable[int]] = None) -> Dict[int, pd.Series]:
+        """Mean quantity per calendar month (1-12), by medicine"""
+        sql = (
+            "SELECT medicine_id, CAST(substr(date, 6, 2) AS INTEGER) AS month, AVG(quantity_dispensed) "
+            "FROM consumption WHERE id BETWEEN ? AND ?"
+        )
+        parameters: tuple = self._range
+        if medicine_ids is not None:
+            ids = [int(m) for m in medicine_ids]
+            sql += f" AND medicine_id IN ({', '.join('?' for _ in ids)})"
+            parameters += tuple(ids)
+        averages: Dict[int, Dict[int, float]] = {}
+        for medicine_id, month, avg in self.storage.query(sql + " GROUP BY medicine_id, month", parameters):
+            averages.setdefault(medicine_id, {})[month] = avg
+        return {
+            medicine_id: pd.Series(months, name="quantity_dispensed").sort_index()
+            for medicine_id, months in averages.items()
+        }
+
+    def history(self, medicine_id: int) -> pd.DataFrame:
+        """One medicine's log rows ordered by date (a range scan of the (medicine_id, date) index)"""
+        rows = self.storage.query(
+            "SELECT date, medicine_id, quantity_dispensed, patient_count FROM consumption "
+            "WHERE medicine_id = ? AND id BETWEEN ? AND ? ORDER BY date, id",
+            (int(medicine_id), *self._range)
+        )
+        frame = pd.DataFrame(rows, columns=["date", "medicine_id", "quantity_dispensed", "patient_count"])
+        frame["date"] = pd.to_datetime(frame["date"])
+        return frame
@@ -0,0 +1,135 @@
+"""
+MedPredict AI - Timing Hooks
+
+Lightweight instrumentation for engine methods and request phases.
+
+- `timed` reports the duration of every call to the registered observers
+  (e.g. the API's metrics registry). With no observers it costs two clock
+  reads per call.
+- `span` marks a phase inside the active trace. Spans nest, so a phase is
+  named after the spans it runs in ("load_data.engine_init.date_conversion").
+  Outside a trace (background threads, scripts) a span does nothing.
+  `timed` functions are spans as well.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Called as observer(name, seconds) after each timed call
+TimingObserver = Callable[[str, float], None]
+
+_observers: List[TimingObserver] = []
+
+
+class Trace:
+    """Spans recorded while handling one request (or one startup)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        # (dotted span path, start, end) in perf_counter seconds
+        self.spans: List[Tuple[str, float, float]] = []
+
+    def record(self, path: str, start: float, end: float):
+        # list.append is atomic, so threads sharing the trace need no lock
+        self.spans.append((path, start, end))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def aggregate(self) -> List[Tuple[str, float, int]]:
+        """Total seconds and call count per span path, in order of first start"""
+        totals: Dict[str, List] = {}
+        for path, start, end in sorted(self.spans, key=lambda s: s[1]):
+            entry = totals.setdefault(path, [0.0, 0])
+            entry[0] += end - start
+            entry[1] += 1
+        return [(path, seconds, count) for path, (seconds, count) in totals.items()]
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "duration_ms": round(self.elapsed() * 1000, 3),
+            "spans": [
+                {
+                    "name": path,
+                    "start_ms": round((start - self.started) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                }
+                for path, start, end in sorted(self.spans, key=lambda s: s[1])
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("medpredict_trace", default=None)
+_current_span: ContextVar[str] = ContextVar("medpredict_span", default="")
+
+
+def add_timing_observer(observer: TimingObserver):
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def remove_timing_observer(observer: TimingObserver):
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def span_path(name: str) -> str:
+    """Full path a span called `name` would get here"""
+    parent = _current_span.get()
+    return f"{parent}.{name}" if parent else name
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Trace]:
+    """Collect the spans of everything run in this context (and threads it hands off to)"""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set("")
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a phase of the active trace"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    path = span_path(name)
+    token = _current_span.set(path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(path, start, time.perf_counter())
+        _current_span.reset(token)
+
+
+def timed(name: str):
+    """Decorator reporting each call's wall time under `name` (and as a span)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    for observer in _observers:
+                        observer(name, elapsed)
+        return wrapper
+    return decorator